@@ -1,2 +1,9 @@
-from .material_list import MaterialList
-from .structure_parser import NBTFile
+def __getattr__(name):
+    # Imported on first access, so light modules (like the daemon client) don't load the parsers
+    if name == 'MaterialList':
+        from .material_list import MaterialList
+        return MaterialList
+    if name == 'NBTFile':
+        from .structure_parser import NBTFile
+        return NBTFile
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import BinaryIO, Callable
+
+from litematica_tools.material_list import MaterialList, MatConfig
+from litematica_tools.storage.shared_storage import Structure
+from litematica_tools.structure_parser import NBTFile
+from litematica_tools.utils import ItemCounter
+
+
+class AsyncLoader:
+    """
+    Runs structure loading and material counting in an executor, so asyncio code doesn't block the event loop.
+
+    Cancelling an awaiting task returns control immediately. Jobs that haven't started are dropped,
+    jobs that are already running finish in the background and keep their concurrency slot until then.
+    """
+
+    def __init__(self, max_concurrency: int = None, executor: Executor = None):
+        """
+        :param max_concurrency: Maximum amount of jobs submitted to the executor at once.
+        Defaults to the amount of CPUs.
+        :param executor: Custom executor. Process pools only accept picklable sources (paths and bytes).
+        By default, a thread pool of max_concurrency workers is created.
+        """
+        if max_concurrency is None:
+            max_concurrency = os.cpu_count() or 1
+        self.max_concurrency = max_concurrency
+        self._own_executor = executor is None
+        self._executor = executor
+        # Semaphores belong to one event loop, so a loader reused across asyncio.run() calls gets one per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    def shutdown(self, wait: bool = False):
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """
+        Run a blocking callable in the executor, respecting the concurrency limit.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix='litematica_tools')
+
+        await semaphore.acquire()
+        try:
+            future = self._executor.submit(partial(func, *args, **kwargs))
+        except BaseException:
+            semaphore.release()
+            raise
+
+        # Release the slot once the job actually stops, not when the awaiting task gets cancelled.
+        # A job may outlive its loop, nothing is left to release then.
+        def release(_):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(semaphore.release)
+
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future, loop=loop)
+
+    async def load(self, source: str | os.PathLike | bytes | BinaryIO, file_format: str = None,
+                   unpack: bool = True, init: bool = True, name: str = None) -> Structure:
+        """
+        Load a structure without blocking the event loop.
+        :param source: Path, buffer with file contents or binary file-like object.
+        :param file_format: Optional file extension to skip format detection.
+        :return: Structure object.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            return await self.run(NBTFile, os.fspath(source), unpack, init)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return await self.run(NBTFile.from_bytes, source, file_format=file_format, unpack=unpack, init=init,
+                                  name=name)
+        return await self.run(NBTFile.from_fileobj, source, file_format=file_format, unpack=unpack, init=init,
+                              name=name)
+
+    async def material_list(self, source: str | os.PathLike | bytes | BinaryIO | Structure, file_format: str = None,
+                            config: MatConfig = None, name: str = None) -> 'AsyncMaterialList':
+        """
+        Load a structure (unless given one) and wrap it into an AsyncMaterialList.
+        """
+        if not isinstance(source, Structure):
+            source = await self.load(source, file_format, name=name)
+        return AsyncMaterialList(source, config, loader=self)
+
+
+class AsyncMaterialList:
+    """
+    Awaitable counterpart of MaterialList. Counting runs in the loader's executor, which has to be a thread pool
+    since the results are cached on the wrapped MaterialList.
+    Without a loader, one is created and shut down by close() or when leaving the async with block.
+    """
+
+    def __init__(self, structure: Structure, config: MatConfig = None, loader: AsyncLoader = None):
+        self._own_loader = loader is None
+        self.loader = AsyncLoader() if loader is None else loader
+        self.sync = MaterialList(structure) if config is None else MaterialList(structure, config)
+
+    def close(self):
+        if self._own_loader:
+            self.loader.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def structure(self) -> Structure:
+        return self.sync.structure
+
+    async def block_count(self) -> ItemCounter:
+        return await self.loader.run(lambda: self.sync.block_count)
+
+    async def item_count(self) -> ItemCounter:
+        return await self.loader.run(lambda: self.sync.item_count)
+
+    async def entity_count(self) -> ItemCounter:
+        return await self.loader.run(lambda: self.sync.entity_count)
+
+    async def total_count(self) -> ItemCounter:
+        return await self.loader.run(lambda: self.sync.total_count)
+
+    async def composite_list(self, blocks: bool, items: bool, entities: bool) -> ItemCounter:
+        return await self.loader.run(self.sync.composite_list, blocks, items, entities)
+
+
+async def load(*args, **kwargs) -> Structure:
+    """
+    Shortcut for AsyncLoader().load() with a one-off executor.
+    """
+    async with AsyncLoader() as loader:
+        return await loader.load(*args, **kwargs)
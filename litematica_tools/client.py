@@ -0,0 +1,95 @@
+import json
+import os
+import socket
+
+from litematica_tools.errors import DaemonException
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 48165
+DEFAULT_ADDRESS = f'{DEFAULT_HOST}:{DEFAULT_PORT}'
+# Request parameters holding file paths, sent as absolute paths since the daemon has its own working directory
+PATH_PARAMS = ('file',)
+
+
+def parse_address(address: str) -> tuple[int, str | tuple[str, int]]:
+    """
+    :param address: 'unix:/path/to/socket', 'host:port' or ':port'.
+    :return: Socket family and address for socket.connect() / bind().
+    """
+    if address.startswith('unix:'):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise DaemonException('Unix domain sockets are not supported on this platform')
+        return socket.AF_UNIX, address[5:]
+    host, _, port = address.rpartition(':')
+    if not port.isdigit():
+        raise DaemonException(f'Invalid daemon address: {address}')
+    return socket.AF_INET, (host or DEFAULT_HOST, int(port))
+
+
+class DaemonClient:
+    """
+    Connection to a running daemon (see litematica_tools.daemon).
+    Only uses the standard library, so scripts talking to the daemon start quickly.
+
+    Protocol: one JSON object per line in both directions.
+    Requests have a 'command' key and command parameters,
+    responses are {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+    The connection stays open, so many requests can be sent without reconnecting.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: float = None):
+        self.address = address
+        self.timeout = timeout
+        self._socket = None
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def connect(self):
+        family, address = parse_address(self.address)
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        self._socket.settimeout(self.timeout)
+        try:
+            self._socket.connect(address)
+        except OSError as e:
+            self.close()
+            raise DaemonException(f'Unable to connect to the daemon at {self.address}: {e}')
+        if family == socket.AF_INET:
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile('rwb')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def request(self, command: str, **params):
+        """
+        :param command: Daemon command, e.g. 'list', 'metadata', 'stats', 'ping' or 'shutdown'.
+        :param params: Command parameters.
+        :return: Result of the command.
+        """
+        if self._file is None:
+            self.connect()
+        for i in PATH_PARAMS:
+            if params.get(i) is not None:
+                params[i] = os.path.abspath(params[i])
+
+        self._file.write(json.dumps({'command': command, **params}).encode() + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            self.close()
+            raise DaemonException('Daemon closed the connection')
+
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise DaemonException(response.get('error', 'Unknown daemon error'))
+        return response.get('result')
@@ -0,0 +1,249 @@
+import gzip
+import os
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+import numpy as np
+from nbtlib import ByteArray, Compound, Double, File, Int, IntArray, List, Short, String
+
+from litematica_tools.errors import FileException
+from litematica_tools.litematic_writer import save_litematic, to_tag
+from litematica_tools.storage import (Structure, Litematic, LitematicMetadata, LitematicRegion, Schem, Nbt,
+                                      BlockState, TileEntity, Entity, Vec3d)
+from litematica_tools.storage.bit_array import compact_indices, encode_varint_array
+from litematica_tools.storage.global_palette import GlobalPalette, region_blocks
+
+SCHEM_VERSION = 2
+# Tags holding the position and id of (tile) entities in each format, replaced on conversion
+_TILE_ENTITY_TAGS = {Litematic: ('x', 'y', 'z', 'id'), Schem: ('Pos', 'Id'), Nbt: ('id',)}
+_ENTITY_TAGS = {Litematic: ('Pos', 'id'), Schem: ('Pos', 'Id'), Nbt: ('Pos', 'id')}
+
+
+@dataclass
+class FlatStructure:
+    """
+    Format independent structure with all regions merged into a single volume.
+
+    - palette: list (BlockState() objects, air is always first)
+    - blocks: np.ndarray (palette indices, shaped as y, z, x)
+    - tile_entities: list (TileEntity() objects, positions relative to the volume, nbt without position and id)
+    - entities: list (Entity() objects, same as tile_entities)
+    """
+    palette: list = field(default=None)
+    blocks: np.ndarray = field(default=None)
+    tile_entities: list = field(default_factory=list)
+    entities: list = field(default_factory=list)
+    name: str = field(default=None)
+    author: str = field(default=None)
+    data_version: int = field(default=None)
+
+    @property
+    def size(self) -> Vec3d:
+        return Vec3d(self.blocks.shape[2], self.blocks.shape[0], self.blocks.shape[1])
+
+
+def _strip(nbt: dict, tags: tuple) -> dict:
+    return {k: v for k, v in (nbt or {}).items() if k not in tags}
+
+
+def flatten(structure: Structure) -> FlatStructure:
+    """
+    Merges all regions of a structure into one volume with a shared palette.
+    Later regions overwrite earlier ones where they have non-air blocks, like pasting in Litematica.
+    """
+    regions = list(structure.regions.values())
+    for r in regions:
+        if r.palette is None:
+            r.parse_metadata()
+            r.parse_block_data()
+            r.parse_tile_entities()
+            r.parse_entities()
+
+    bounds = [r.get_bounds() for r in regions]
+    low = Vec3d(*(min(i) for i in zip(*(b[0] for b in bounds))))
+    high = Vec3d(*(max(i) for i in zip(*(b[1] for b in bounds))))
+    size = Vec3d(*(b - a + 1 for a, b in zip(low, high)))
+
+    palette = GlobalPalette()
+    blocks = np.zeros((size.y, size.z, size.x), np.uint32)
+    tile_entities, entities = [], []
+    te_tags = _TILE_ENTITY_TAGS[type(structure)]
+    entity_tags = _ENTITY_TAGS[type(structure)]
+
+    for r, (r_low, _) in zip(regions, bounds):
+        remap = palette.remap(r.palette)
+
+        offset = r_low - low
+        r_size = abs(r.size)
+        target = blocks[offset.y:offset.y + r_size.y,
+                        offset.z:offset.z + r_size.z,
+                        offset.x:offset.x + r_size.x]
+        if r.sections is not None:
+            # Sections filled with air are skipped without touching their blocks
+            r.sections.paste(target, remap)
+        else:
+            local = region_blocks(r, remap)
+            placed = local != 0
+            target[placed] = local[placed]
+
+        for te in r.tile_entities:
+            temp = TileEntity()
+            temp.nbt = _strip(te.nbt, te_tags)
+            temp.position = te.position + offset
+            temp.id = te.nbt.get('id', te.nbt.get('Id', te.id))
+            tile_entities.append(temp)
+        for e in r.entities:
+            temp = Entity()
+            temp.nbt = _strip(e.nbt, entity_tags)
+            temp.position = e.position + offset
+            temp.id = e.id
+            entities.append(temp)
+
+    indices, kept = compact_indices(blocks.ravel(), len(palette), keep=(0,))
+    return FlatStructure(palette=[palette.palette[i] for i in kept],
+                         blocks=indices.reshape(blocks.shape),
+                         tile_entities=tile_entities,
+                         entities=entities,
+                         name=structure.metadata.name or structure.name,
+                         author=structure.metadata.author,
+                         data_version=structure.metadata.data_version)
+
+
+def _schem_palette_name(block_state: BlockState) -> str:
+    if not block_state.properties:
+        return block_state.name
+    return block_state.name + '[' + ','.join(f'{k}={v}' for k, v in block_state.properties.items()) + ']'
+
+
+def _pos_list(position: Vec3d) -> List:
+    return List[Double]([Double(i) for i in position])
+
+
+def to_litematic(flat: FlatStructure, region_name: str = None) -> Litematic:
+    """
+    Builds a single region Litematic from a flattened structure.
+    """
+    size = flat.size
+    region = LitematicRegion()
+    region.palette = flat.palette
+    region.position = Vec3d(0, 0, 0)
+    region.size = size
+    region.volume = size.x * size.y * size.z
+    region.set_block_array(flat.blocks.ravel())
+    region.tile_entities = flat.tile_entities
+    region.entities = flat.entities
+    region.region_nbt = {
+        'TileEntities': [{**i.nbt, 'id': String(i.id), 'x': Int(i.position.x), 'y': Int(i.position.y),
+                          'z': Int(i.position.z)} for i in flat.tile_entities],
+        'Entities': [{**i.nbt, 'id': String(i.id), 'Pos': _pos_list(i.position)} for i in flat.entities],
+        'PendingBlockTicks': [],
+        'PendingFluidTicks': [],
+    }
+
+    temp = Litematic()
+    temp.raw_nbt = {}
+    temp.name = flat.name
+    temp.metadata = LitematicMetadata(name=flat.name, author=flat.author, data_version=flat.data_version)
+    temp.regions = {region_name or flat.name or 'Main': region}
+    return temp
+
+
+def save_schem(flat: FlatStructure, target: str | os.PathLike | BinaryIO, compresslevel: int = 6):
+    """
+    Writes a flattened structure as a Sponge schematic (version 2).
+    """
+    size = flat.size
+    nbt = File({
+        'Version': Int(SCHEM_VERSION),
+        'DataVersion': Int(flat.data_version or 0),
+        'Width': Short(size.x),
+        'Height': Short(size.y),
+        'Length': Short(size.z),
+        'Offset': IntArray([0, 0, 0]),
+        'PaletteMax': Int(len(flat.palette)),
+        'Palette': Compound({_schem_palette_name(b): Int(i) for i, b in enumerate(flat.palette)}),
+        'BlockData': ByteArray(encode_varint_array(flat.blocks.ravel())),
+        'BlockEntities': List[Compound]([to_tag({**i.nbt, 'Id': String(i.id), 'Pos': IntArray(list(i.position))})
+                                         for i in flat.tile_entities]),
+        'Entities': List[Compound]([to_tag({**i.nbt, 'Id': String(i.id), 'Pos': _pos_list(i.position)})
+                                    for i in flat.entities]),
+    }, root_name='Schematic')
+    _save_gzipped(nbt, target, compresslevel)
+
+
+def save_nbt(flat: FlatStructure, target: str | os.PathLike | BinaryIO, include_air: bool = False,
+             compresslevel: int = 6):
+    """
+    Writes a flattened structure in the vanilla structure block format.
+    The format stores one compound per block, so this is the only writer that builds per-block objects.
+
+    :param include_air: Store air blocks explicitly (they replace existing blocks when placed),
+    otherwise they are left out as structure voids.
+    """
+    size = flat.size
+    if include_air:
+        y, z, x = np.indices(flat.blocks.shape).reshape(3, -1)
+    else:
+        y, z, x = np.nonzero(flat.blocks)
+    states = flat.blocks[y, z, x]
+    tile_entities = {tuple(i.position): i for i in flat.tile_entities}
+
+    block_list = []
+    for bx, by, bz, state in zip(x.tolist(), y.tolist(), z.tolist(), states.tolist()):
+        entry = Compound({'pos': List[Int]([Int(bx), Int(by), Int(bz)]), 'state': Int(state)})
+        if (bx, by, bz) in tile_entities:
+            te = tile_entities[(bx, by, bz)]
+            entry['nbt'] = to_tag({**te.nbt, 'id': String(te.id)})
+        block_list.append(entry)
+
+    nbt = File({
+        'DataVersion': Int(flat.data_version or 0),
+        'size': List[Int]([Int(size.x), Int(size.y), Int(size.z)]),
+        'palette': List[Compound]([to_tag({'Name': String(b.name)} | (
+            {'Properties': {k: String(v) for k, v in b.properties.items()}} if b.properties else {}))
+                                   for b in flat.palette]),
+        'blocks': List[Compound](block_list),
+        'entities': List[Compound]([Compound({
+            'pos': _pos_list(i.position),
+            'blockPos': List[Int]([Int(int(v // 1)) for v in i.position]),
+            'nbt': to_tag({**i.nbt, 'id': String(i.id), 'Pos': _pos_list(i.position)}),
+        }) for i in flat.entities]),
+    })
+    _save_gzipped(nbt, target, compresslevel)
+
+
+def _save_gzipped(nbt: File, target: str | os.PathLike | BinaryIO, compresslevel: int):
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, 'wb') as f:
+            return _save_gzipped(nbt, f, compresslevel)
+    with gzip.GzipFile(fileobj=target, mode='wb', compresslevel=compresslevel) as gz:
+        nbt.write(gz)
+
+
+def convert(structure: Structure, target: str | os.PathLike | BinaryIO, file_format: str = None, **kwargs):
+    """
+    Saves a structure of any supported format as another one.
+    Load the source with unpack=False to keep exact NBT tag types of (tile) entities.
+
+    :param structure: Source structure.
+    :param target: File path or writable binary file-like object.
+    :param file_format: Output format ('litematic', 'schem' or 'nbt'). Defaults to the target file extension.
+    :param kwargs: Passed to the writer of the output format.
+    """
+    if file_format is None:
+        if not isinstance(target, (str, os.PathLike)):
+            raise FileException('Output format is required when writing to a file object')
+        file_format = os.path.splitext(target)[1]
+    file_format = file_format.lstrip('.')
+
+    match file_format:
+        case 'litematic':
+            if not isinstance(structure, Litematic):
+                structure = to_litematic(flatten(structure))
+            save_litematic(structure, target, **kwargs)
+        case 'schem':
+            save_schem(flatten(structure), target, **kwargs)
+        case 'nbt':
+            save_nbt(flatten(structure), target, **kwargs)
+        case _:
+            raise FileException(f'Provided not supported file format: .{file_format}')
@@ -0,0 +1,248 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable
+
+from litematica_tools.client import DEFAULT_ADDRESS, parse_address
+from litematica_tools.errors import DaemonException
+from litematica_tools.material_list import MaterialList, MatConfig
+from litematica_tools.storage import Structure, BlockState
+from litematica_tools.storage.global_palette import block_key
+from litematica_tools.structure_parser import NBTFile
+
+
+@dataclass
+class CacheEntry:
+    """
+    Loaded structure with results computed from it.
+    Stays valid while the file keeps its modification time and size.
+    """
+    stamp: tuple = field(default=None)
+    structure: Structure = field(default=None)
+    results: dict = field(default_factory=dict)
+
+
+class StructureCache:
+    """
+    Least recently used cache of loaded structures, keyed by absolute file path. Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = 32, load: Callable[[str], Structure] = NBTFile):
+        """
+        :param load: Loads the structure of a file path.
+        """
+        self.max_entries = max_entries
+        self.load = load
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, file_path: str) -> CacheEntry:
+        """
+        :return: Cache entry of the file, loading it if it isn't cached or changed on disk.
+        """
+        stat = os.stat(file_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and entry.stamp == stamp:
+                self.hits += 1
+                self._entries.move_to_end(file_path)
+                return entry
+            self.misses += 1
+
+        # Loading happens outside the lock, so it doesn't hold up requests for other files
+        entry = CacheEntry(stamp=stamp, structure=self.load(file_path))
+        with self._lock:
+            current = self._entries.get(file_path)
+            if current is not None and current.stamp == stamp:
+                # Loaded by another request in the meantime
+                entry = current
+            self._entries[file_path] = entry
+            self._entries.move_to_end(file_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, file_path: str = None):
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(file_path, None)
+
+
+class Daemon:
+    """
+    Long-running request handler keeping configs, the item registry and loaded structures warm,
+    so repeated requests skip interpreter startup and file parsing.
+
+    Requests are dicts with a 'command' key, see handle(). Connections are handled concurrently,
+    only the structure cache and the request counter are locked.
+
+    Palettes of loaded structures are interned: equal block states of all cached files share one BlockState,
+    so a warm cache of similar files keeps a single copy of each. The table only references them weakly,
+    entries go away with the last cached structure using them.
+    """
+
+    def __init__(self, config: MatConfig = None, max_structures: int = 32):
+        self.config = config or MatConfig()
+        self.cache = StructureCache(max_structures, self._load)
+        self.started = time.time()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._block_states: weakref.WeakValueDictionary[tuple, BlockState] = weakref.WeakValueDictionary()
+        self._intern_lock = threading.Lock()
+
+    def _load(self, file_path: str) -> Structure:
+        structure = NBTFile(file_path)
+        # Unlike dict.setdefault, the weak dict's isn't atomic
+        with self._intern_lock:
+            for r in structure.regions.values():
+                r.palette = [self._block_states.setdefault(block_key(b), b) for b in r.palette]
+        return structure
+
+    def handle(self, request: dict):
+        """
+        Commands:
+        - ping: returns 'pong'
+        - list: material list of 'file', parameters 'blocks', 'items', 'entities' (booleans)
+        - metadata: structure and region information of 'file'
+        - invalidate: drops 'file' (or everything) from the cache
+        - stats: cache and request counters
+        - shutdown: stops the server after responding
+
+        :return: JSON serializable result.
+        """
+        command = request.get('command')
+        with self._lock:
+            self.requests += 1
+        match command:
+            case 'ping':
+                return 'pong'
+            case 'list':
+                return self._list(request)
+            case 'metadata':
+                return self._metadata(self._file(request))
+            case 'invalidate':
+                self.cache.invalidate(request.get('file'))
+                return None
+            case 'stats':
+                return {'uptime': time.time() - self.started, 'requests': self.requests,
+                        'cached_structures': len(self.cache), 'hits': self.cache.hits,
+                        'misses': self.cache.misses, 'interned_block_states': len(self._block_states)}
+            case 'shutdown':
+                # The server stops once the response is sent, see _RequestHandler
+                return None
+            case _:
+                raise DaemonException(f'Unknown command: {command}')
+
+    @staticmethod
+    def _file(request: dict) -> str:
+        if not request.get('file'):
+            raise DaemonException('Missing "file" parameter')
+        return os.path.abspath(request['file'])
+
+    def _list(self, request: dict) -> dict[str, int]:
+        entry = self.cache.get(self._file(request))
+        blocks, items, entities = (bool(request.get(i, False)) for i in ('blocks', 'items', 'entities'))
+        if not (blocks or items or entities):
+            blocks = True
+
+        key = ('list', blocks, items, entities)
+        # Concurrent requests may compute the same list twice, it is only stored once complete
+        if key not in entry.results:
+            mat_list = MaterialList(entry.structure, self.config)
+            entry.results[key] = dict(mat_list.composite_list(blocks=blocks, items=items, entities=entities).sort())
+        return entry.results[key]
+
+    def _metadata(self, file_path: str) -> dict:
+        entry = self.cache.get(file_path)
+        if 'metadata' not in entry.results:
+            structure = entry.structure
+            metadata = structure.metadata
+            entry.results['metadata'] = {
+                'format': type(structure).__name__.lower(),
+                'name': metadata.name,
+                'author': metadata.author,
+                'data_version': metadata.data_version,
+                'size': list(metadata.size) if metadata.size is not None else None,
+                'region_count': len(structure.regions),
+                'regions': {name: {
+                    'position': list(r.position) if r.position is not None else None,
+                    'size': list(r.size),
+                    'palette_size': len(r.palette),
+                } for name, r in structure.regions.items()},
+            }
+        return entry.results['metadata']
+
+    def serve(self, address: str = DEFAULT_ADDRESS):
+        """
+        Serves requests until a shutdown command or KeyboardInterrupt.
+        :param address: 'unix:/path/to/socket' or 'host:port'. TCP servers should only listen on localhost,
+        the protocol has no authentication.
+        """
+        family, bind_address = parse_address(address)
+        if family == socket.AF_INET:
+            server_class = _TCPServer
+        else:
+            server_class = socketserver.ThreadingUnixStreamServer
+            if os.path.exists(bind_address):
+                os.remove(bind_address)
+
+        with server_class(bind_address, _RequestHandler) as server:
+            server.daemon_threads = True
+            server.daemon = self
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                if family != socket.AF_INET and os.path.exists(bind_address):
+                    os.remove(bind_address)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        if self.server.address_family == socket.AF_INET:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            request = None
+            try:
+                request = json.loads(line)
+                response = {'ok': True, 'result': self.server.daemon.handle(request)}
+            except Exception as e:
+                response = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+
+            if response['ok'] and request.get('command') == 'shutdown':
+                # shutdown() waits for serve_forever() to return, so it can't block the handler thread
+                threading.Thread(target=self.server.shutdown).start()
+                return
+
+
+def serve(address: str = DEFAULT_ADDRESS, config: MatConfig = None, max_structures: int = 32):
+    """
+    Shortcut for Daemon(config, max_structures).serve(address).
+    """
+    Daemon(config, max_structures).serve(address)
@@ -0,0 +1,137 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from litematica_tools.material_list import MaterialList, MatConfig
+from litematica_tools.storage import Structure, Region, BlockState, Vec3d
+from litematica_tools.storage.global_palette import GlobalPalette, region_blocks
+from litematica_tools.utils import ItemCounter
+
+# Positions of the schematic that may hold anything
+STRUCTURE_VOID = 'minecraft:structure_void'
+
+
+@dataclass
+class MaterialDelta:
+    """
+    Difference between a schematic and the current state of its build.
+
+    - remaining: ItemCounter (materials still needed for missing and wrong blocks)
+    - wrong: ItemCounter (blocks of the build that differ from the schematic and have to be removed)
+    - required: int (schematic blocks that have to be placed, ignored blocks and structure voids excluded)
+    - placed: int (required blocks already matching the build)
+    """
+    remaining: ItemCounter = field(default=None)
+    wrong: ItemCounter = field(default=None)
+    required: int = field(default=0)
+    placed: int = field(default=0)
+
+    @property
+    def missing(self) -> int:
+        return self.required - self.placed
+
+    @property
+    def completion(self) -> float:
+        return self.placed / self.required if self.required else 1.0
+
+
+def _parsed(structure: Structure) -> list[Region]:
+    regions = list(structure.regions.values())
+    for r in regions:
+        if r.palette is None:
+            r.parse_metadata()
+            r.parse_block_data()
+    return regions
+
+
+def _overlap(low: Vec3d, high: Vec3d, other_low: Vec3d, other_high: Vec3d) -> tuple[tuple, tuple] | None:
+    """
+    :return: Slices (y, z, x) of the boxes' overlap, relative to the first box and to the other one. None if disjoint.
+    """
+    o_low = Vec3d(*map(max, low, other_low))
+    o_high = Vec3d(*map(min, high, other_high))
+    if any(a > b for a, b in zip(o_low, o_high)):
+        return None
+    return (tuple(slice(o_low[i] - low[i], o_high[i] - low[i] + 1) for i in (1, 2, 0)),
+            tuple(slice(o_low[i] - other_low[i], o_high[i] - other_low[i] + 1) for i in (1, 2, 0)))
+
+
+def _merge(low: Vec3d, high: Vec3d, regions: list[tuple[Vec3d, Vec3d, np.ndarray]], fill: int,
+           void_index: int) -> np.ndarray:
+    """
+    Blocks of all regions inside a box, in the global palette, like Structure pasting in Litematica:
+    later regions overwrite earlier ones with their non-air blocks.
+    Air only fills positions no region has set yet (still fill), structure voids never overwrite.
+    """
+    out = np.full((high.y - low.y + 1, high.z - low.z + 1, high.x - low.x + 1), fill, np.uint32)
+    for r_low, r_high, blocks in regions:
+        overlap = _overlap(low, high, r_low, r_high)
+        if overlap is None:
+            continue
+        dst, src = out[overlap[0]], blocks[overlap[1]]
+        placed = ((src != 0) & (src != void_index)) | ((src == 0) & (dst == fill))
+        dst[placed] = src[placed]
+    return out
+
+
+def material_delta(schematic: Structure, build: Structure, offset: Vec3d | tuple = (0, 0, 0),
+                   match_properties: bool = False, config: MatConfig = None) -> MaterialDelta:
+    """
+    Compares a schematic with a capture of its build (another schematic of the same area),
+    returning what is still missing.
+
+    Regions are aligned by their positions and decoded once into a shared palette.
+    Both structures are then merged into a volume per schematic region, which are compared as whole arrays.
+    Overlapping regions are merged like pasting in Litematica and every position is counted once.
+    Parts of the schematic not covered by any build region count as empty.
+
+    :param offset: Added to build positions, for captures saved with another origin than the schematic.
+    :param match_properties: Compare whole block states. By default, blocks with the right id and other
+    properties (e.g. rotated stairs) count as placed, since they need no new materials.
+    :param config: Material list config used for the resulting counters.
+    """
+    config = config if config is not None else MatConfig()
+    offset = Vec3d(*offset)
+    palette = GlobalPalette()
+    # Positions missing from .nbt regions are structure voids (anything goes) in the schematic and air in the build
+    void_index = int(palette.remap([BlockState(name=STRUCTURE_VOID)])[0])
+
+    expected = []
+    for r in _parsed(schematic):
+        low, high = r.get_bounds()
+        expected.append((low, high, region_blocks(r, palette.remap(r.palette), void_index)))
+    built = []
+    for r in _parsed(build):
+        low, high = r.get_bounds()
+        built.append((low + offset, high + offset, region_blocks(r, palette.remap(r.palette))))
+
+    keys = palette.comparison_keys(match_properties)
+    ignored = palette.name_mask(config.ignored_blocks)
+    void = palette.name_mask([STRUCTURE_VOID])
+    remaining = np.zeros(len(palette), np.int64)
+    wrong = np.zeros(len(palette), np.int64)
+    out = MaterialDelta()
+
+    for i, (low, high, _) in enumerate(expected):
+        target = _merge(low, high, expected, void_index, void_index)
+        current = _merge(low, high, built, 0, void_index)
+        # Positions inside earlier schematic regions were already counted there
+        counted = np.zeros(target.shape, bool)
+        for e_low, e_high, _ in expected[:i]:
+            overlap = _overlap(low, high, e_low, e_high)
+            if overlap is not None:
+                counted[overlap[0]] = True
+
+        # Palettes are small, so masks are looked up per entry and indexed by the volumes
+        considered = ~void[target] & ~counted
+        differs = (keys[target] != keys[current]) & considered
+        required = considered & ~ignored[target]
+        out.required += int(np.count_nonzero(required))
+        out.placed += int(np.count_nonzero(required & ~differs))
+        remaining += np.bincount(target[required & differs], minlength=len(remaining))
+        wrong += np.bincount(current[differs & ~ignored[current] & ~void[current]], minlength=len(wrong))
+
+    mat_list = MaterialList(schematic, config)
+    out.remaining = mat_list.count_histogram(palette.palette, remaining, ItemCounter()).sort()
+    out.wrong = mat_list.count_histogram(palette.palette, wrong, ItemCounter()).sort()
+    return out
@@ -14,3 +14,21 @@ class BlockOutOfBounds(Exception):
 
     def __str__(self):
         return self.message
+
+
+class DaemonException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class OperationCancelled(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
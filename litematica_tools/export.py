@@ -0,0 +1,204 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+from typing import BinaryIO, TextIO, Iterator
+
+# basic, json, csv and ascii only need the standard library.
+# Stack sizes and names of jsonl and npz come from the item registry, imported by their first write.
+
+ITEM_NAME = 'Item'
+TOTAL_NAME = 'Total'
+SOURCE_NAME = 'Source'
+
+
+class ListWriter(ABC):
+    """
+    Writes material lists (item -> amount) row by row, without building the whole output in memory first.
+    Use as a context manager, or call close() after the last write().
+    """
+
+    def __init__(self, stream: TextIO, multiple: bool = False):
+        """
+        :param stream: Output text stream.
+        :param multiple: Several lists will be written. json and csv then label each list with its source,
+        so the output stays a single valid document.
+        """
+        self.stream = stream
+        self.multiple = multiple
+
+    @abstractmethod
+    def write(self, mat_list: dict, source: str = None):
+        """
+        :param mat_list: Item ids and amounts, in output order.
+        :param source: File the list comes from, stored by the jsonl and npz writers and with multiple lists.
+        basic and ascii write several lists one after another.
+        """
+        pass
+
+    def close(self):
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class BasicWriter(ListWriter):
+    def write(self, mat_list: dict, source: str = None):
+        for k, v in mat_list.items():
+            self.stream.write(f'{k}: {v}\n')
+
+
+class JsonWriter(ListWriter):
+    """
+    Same output as json.dumps(mat_list, indent=4).
+    Multiple lists are written as one object of lists keyed by source, the same as json.dumps({source: mat_list}).
+    """
+
+    def __init__(self, stream: TextIO, multiple: bool = False):
+        super().__init__(stream, multiple)
+        self._written = 0
+
+    def _write_object(self, mat_list: dict, indent: str):
+        self.stream.write('{')
+        separator = f'\n{indent}    '
+        for k, v in mat_list.items():
+            self.stream.write(f'{separator}{json.dumps(k)}: {json.dumps(v)}')
+            separator = f',\n{indent}    '
+        self.stream.write(f'\n{indent}}}' if mat_list else '}')
+
+    def write(self, mat_list: dict, source: str = None):
+        if not self.multiple:
+            self._write_object(mat_list, '')
+            self.stream.write('\n')
+            return
+        self.stream.write(f'{"," if self._written else "{"}\n    {json.dumps(source)}: ')
+        self._write_object(mat_list, '    ')
+        self._written += 1
+
+    def close(self):
+        if self.multiple:
+            self.stream.write('\n}\n' if self._written else '{}\n')
+        super().close()
+
+
+class CsvWriter(ListWriter):
+    """
+    Header row once, then a row per item. Multiple lists get a leading source column.
+    """
+
+    def __init__(self, stream: TextIO, multiple: bool = False):
+        super().__init__(stream, multiple)
+        self._writer = csv.writer(stream, quoting=csv.QUOTE_NONNUMERIC)
+        self._writer.writerow((SOURCE_NAME, ITEM_NAME, TOTAL_NAME) if multiple else (ITEM_NAME, TOTAL_NAME))
+
+    def write(self, mat_list: dict, source: str = None):
+        if self.multiple:
+            self._writer.writerows((source, k, v) for k, v in mat_list.items())
+        else:
+            self._writer.writerows(mat_list.items())
+
+
+class AsciiWriter(ListWriter):
+    def write(self, mat_list: dict, source: str = None):
+        # Column widths need one pass over the list before the first row
+        name_len = max((len(i) for i in mat_list), default=0)
+        name_len = max(name_len, len(ITEM_NAME))
+        amount_len = max((len(str(i)) for i in mat_list.values()), default=0)
+        amount_len = max(amount_len, len(TOTAL_NAME))
+
+        divider = f'+{"-" * (name_len + 2)}+{"-" * (amount_len + 2)}+\n'
+        header = f'{divider}| {ITEM_NAME:<{name_len}} | {TOTAL_NAME:<{amount_len}} |\n{divider}'
+        self.stream.write(header)
+        for k, v in mat_list.items():
+            self.stream.write(f'| {k:<{name_len}} | {str(v):<{amount_len}} |\n')
+        self.stream.write(header)
+
+
+def _detailed_rows(mat_list: dict) -> Iterator[tuple[str, int, tuple, str]]:
+    """
+    :return: Item id, amount, stacks (shulker boxes, stacks, items) and localized name of each row.
+    """
+    from litematica_tools.utils import ItemCounter
+
+    for k, v in mat_list.items():
+        yield k, v, ItemCounter.get_stacks(k, v), ItemCounter.localise(k)
+
+
+class JsonLinesWriter(ListWriter):
+    """
+    One JSON object per item: {"source", "item", "count", "stacks", "name"}, source only when given.
+    """
+
+    def write(self, mat_list: dict, source: str = None):
+        for item, count, stacks, name in _detailed_rows(mat_list):
+            row = {'item': item, 'count': count, 'stacks': stacks, 'name': name}
+            if source is not None:
+                row = {'source': source} | row
+            self.stream.write(json.dumps(row) + '\n')
+
+
+class NpzWriter(ListWriter):
+    """
+    Columnar numpy archive, written on close():
+
+    - item: str array (item ids)
+    - count: int64 array
+    - stacks: int64 array shaped (rows, 3) (shulker boxes, stacks, items)
+    - name: str array (localized names)
+    - source: str array (file of each row, only present when sources were given)
+
+    Load with numpy.load(), no pickling involved.
+    """
+
+    def __init__(self, stream: str | BinaryIO, multiple: bool = False):
+        """
+        :param stream: File path or binary stream.
+        """
+        super().__init__(stream, multiple)
+        self._columns = {'source': [], 'item': [], 'count': [], 'stacks': [], 'name': []}
+
+    def write(self, mat_list: dict, source: str = None):
+        for item, count, stacks, name in _detailed_rows(mat_list):
+            self._columns['source'].append(source or '')
+            self._columns['item'].append(item)
+            self._columns['count'].append(count)
+            self._columns['stacks'].append(stacks)
+            self._columns['name'].append(name)
+
+    def close(self):
+        import numpy as np
+
+        columns = self._columns
+        arrays = {
+            'item': np.array(columns['item'], dtype=str),
+            'count': np.array(columns['count'], dtype=np.int64),
+            'stacks': np.array(columns['stacks'], dtype=np.int64).reshape(-1, 3),
+            'name': np.array(columns['name'], dtype=str),
+        }
+        if any(columns['source']):
+            arrays['source'] = np.array(columns['source'], dtype=str)
+        np.savez_compressed(self.stream, **arrays)
+
+
+WRITERS: dict[str, type[ListWriter]] = {
+    'basic': BasicWriter,
+    'json': JsonWriter,
+    'csv': CsvWriter,
+    'ascii': AsciiWriter,
+    'jsonl': JsonLinesWriter,
+    'npz': NpzWriter,
+}
+
+
+def get_writer(formatting: str, stream: TextIO | BinaryIO | str, multiple: bool = False) -> ListWriter:
+    """
+    :param formatting: Key of WRITERS.
+    :param stream: Text stream, or a binary stream or file path for npz.
+    :param multiple: Several lists will be written, see ListWriter.
+    """
+    if formatting not in WRITERS:
+        raise ValueError(f'Unknown output format: {formatting}')
+    return WRITERS[formatting](stream, multiple)
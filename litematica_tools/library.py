@@ -0,0 +1,193 @@
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+from typing import Iterable
+
+import numpy as np
+
+from litematica_tools.material_list import MaterialList, MatConfig
+from litematica_tools.storage import Region
+from litematica_tools.structure_parser import NBTFile, find_structure_files
+from litematica_tools.utils import ItemCounter
+
+INDEX_FILE = 'index.json'
+
+
+def region_digest(region: Region, salt: bytes = b'') -> str:
+    """
+    Content hash of the region's size, palette and block data, as stored in the file (packed for litematics).
+    Regions with equal digests have equal block counts.
+
+    :param salt: Extra data mixed into the hash, e.g. a config fingerprint.
+    :return: Hex digest.
+    """
+    if region.palette is None:
+        region.parse_metadata()
+        region.parse_block_data()
+
+    h = hashlib.blake2b(salt, digest_size=20)
+    h.update(type(region).__name__.encode())
+    # Regions of another shape and the same volume (e.g. 2x1x1 and 1x1x2) can have equal block data
+    h.update(f'{tuple(region.size)};'.encode())
+    for i in region.palette:
+        properties = ','.join(f'{k}={v}' for k, v in sorted((i.properties or {}).items()))
+        h.update(f'{i.name}[{properties}];'.encode())
+
+    data = region.block_states if isinstance(region.block_states, np.ndarray) else region.get_block_array()
+    data = np.asarray(data)
+    # nbtlib arrays are big endian, parsed ones native, both hash the same
+    data = np.ascontiguousarray(data, dtype=data.dtype.newbyteorder('<'))
+    h.update(f'{data.dtype.str}{data.shape}'.encode())
+    h.update(memoryview(data).cast('B'))
+    return h.hexdigest()
+
+
+def config_fingerprint(config: MatConfig) -> bytes:
+    """
+    :return: Stable hash of the config, so results computed with other settings aren't reused.
+    """
+    data = json.dumps(dataclasses.asdict(config), sort_keys=True, default=str)
+    return hashlib.blake2b(data.encode(), digest_size=20).digest()
+
+
+class MaterialStore:
+    """
+    Content-addressed store of per-region block counts.
+    Kept in memory, or in a directory with one JSON file per digest when a path is given.
+    """
+
+    def __init__(self, path: str | os.PathLike = None):
+        self.path = path
+        self._memory: dict[str, dict] = {}
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def _file(self, digest: str) -> str:
+        return os.path.join(self.path, digest[:2], digest + '.json')
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._memory or (self.path is not None and os.path.exists(self._file(digest)))
+
+    def get(self, digest: str) -> dict | None:
+        if digest in self._memory:
+            return self._memory[digest]
+        if self.path is None or not os.path.exists(self._file(digest)):
+            return None
+        with open(self._file(digest), 'r') as f:
+            self._memory[digest] = json.load(f)
+        return self._memory[digest]
+
+    def put(self, digest: str, result: dict):
+        self._memory[digest] = result
+        if self.path is not None:
+            _write_json(self._file(digest), result)
+
+
+def _write_json(file_path: str, data):
+    # Written to a temporary file first, so an interrupted run never leaves a broken entry
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp = file_path + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp, file_path)
+
+
+class RegionLibrary:
+    """
+    Block counts for a library of schematics, computed once per unique region.
+
+    Every region is identified by region_digest(), its counts are kept in a MaterialStore,
+    so copies of the same region in other files (or unchanged files on later runs) reuse them.
+    Files whose modification time and size didn't change aren't read again at all.
+    Only blocks are counted, inventories and entities depend on NBT outside the digest.
+    """
+
+    def __init__(self, store: str | os.PathLike | MaterialStore = None, config: MatConfig = None):
+        """
+        :param store: Directory to persist results in, or a MaterialStore. By default, results are kept in memory.
+        :param config: Material list config used for counting.
+        """
+        self.store = store if isinstance(store, MaterialStore) else MaterialStore(store)
+        self.config = config or MatConfig()
+        self.computed = 0
+        self.reused = 0
+        # Files index() couldn't read
+        self.failed = 0
+        self._salt = config_fingerprint(self.config)
+        # file path -> {'stamp': [mtime, size, config fingerprint], 'regions': {region name: digest}}
+        self._files: dict[str, dict] = {}
+        if self.store.path is not None and os.path.exists(self._index_path):
+            with open(self._index_path, 'r') as f:
+                self._files = json.load(f)
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.store.path, INDEX_FILE)
+
+    def index_file(self, file_path: str | os.PathLike) -> dict[str, str]:
+        """
+        Counts blocks of regions not in the store yet.
+        :return: Digest of each region of the file.
+        """
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        stamp = [stat.st_mtime_ns, stat.st_size, self._salt.hex()]
+        known = self._files.get(file_path)
+        if known is not None and known['stamp'] == stamp and all(i in self.store for i in known['regions'].values()):
+            self.reused += len(known['regions'])
+            return known['regions']
+
+        structure = NBTFile(file_path, init=False)
+        mat_list = MaterialList(structure, self.config)
+        digests = {}
+        for name, region in structure.regions.items():
+            digest = region_digest(region, self._salt)
+            if digest in self.store:
+                self.reused += 1
+            else:
+                self.store.put(digest, dict(mat_list.list_blocks(region)))
+                self.computed += 1
+            digests[str(name)] = digest
+
+        self._files[file_path] = {'stamp': stamp, 'regions': digests}
+        return digests
+
+    def index(self, paths: Iterable[str | os.PathLike]) -> dict[str, dict[str, str]]:
+        """
+        Runs index_file() on every structure file under the given paths and saves the file index.
+        Files that can't be read or parsed are logged and skipped, see failed.
+        :return: Region digests of each file.
+        """
+        out = {}
+        for i in find_structure_files(paths):
+            try:
+                out[i] = self.index_file(i)
+            except Exception as e:
+                # Missing, unreadable or corrupt, the rest of the library is still reported
+                logging.warning(f'Unable to index {i}: {e}')
+                self.failed += 1
+        self.save()
+        return out
+
+    def save(self):
+        if self.store.path is not None:
+            _write_json(self._index_path, self._files)
+
+    def file_counts(self, file_path: str | os.PathLike) -> ItemCounter:
+        out = ItemCounter()
+        for digest in self.index_file(file_path).values():
+            out.extend(self.store.get(digest))
+        return out
+
+    def report(self, paths: Iterable[str | os.PathLike]) -> ItemCounter:
+        """
+        :param paths: Files and directories of the library.
+        :return: Total block counts of all files.
+        """
+        out = ItemCounter()
+        for digests in self.index(paths).values():
+            for digest in digests.values():
+                out.extend(self.store.get(digest))
+        return out.sort()
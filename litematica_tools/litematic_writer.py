@@ -0,0 +1,177 @@
+import gzip
+import io
+import os
+import time
+from typing import BinaryIO, Iterable
+
+import numpy as np
+from nbtlib import Base, Byte, ByteArray, Compound, Double, Int, IntArray, List, Long, LongArray, String
+from nbtlib.tag import BYTE, INT, write_numeric, write_string
+
+from litematica_tools.storage import Litematic, Region, BlockState, Vec3d
+from litematica_tools.storage.bit_array import required_bits, pack_long_array, compact_indices
+
+AIR = 'minecraft:air'
+LITEMATIC_VERSION = 6
+# Region tags that are rebuilt from the decoded block data instead of being copied
+_BLOCK_TAGS = ('Position', 'Size', 'BlockStatePalette', 'BlockStates')
+_END = 0
+
+
+def to_tag(value) -> Base:
+    """
+    Converts unpacked NBT back to nbtlib tags.
+    Numbers get the widest common type (Int/Long, Double), so structures loaded with unpack=False
+    are preferred when exact tag types matter.
+    """
+    if isinstance(value, Base):
+        return value
+    if isinstance(value, dict):
+        return Compound({k: to_tag(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return List([to_tag(i) for i in value])
+    if isinstance(value, np.ndarray):
+        return {1: ByteArray, 4: IntArray}.get(value.dtype.itemsize, LongArray)(value)
+    if isinstance(value, bool):
+        return Byte(value)
+    if isinstance(value, int):
+        return Int(value) if -1 << 31 <= value < 1 << 31 else Long(value)
+    if isinstance(value, float):
+        return Double(value)
+    if isinstance(value, str):
+        return String(value)
+    raise TypeError(f'Unable to convert {type(value).__name__} to NBT')
+
+
+def _write_named(fileobj: BinaryIO, name: str, tag: Base):
+    write_numeric(BYTE, tag.tag_id, fileobj)
+    write_string(name, fileobj)
+    tag.write(fileobj)
+
+
+def _write_compound_start(fileobj: BinaryIO, name: str):
+    write_numeric(BYTE, Compound.tag_id, fileobj)
+    write_string(name, fileobj)
+
+
+def _write_long_array(fileobj: BinaryIO, name: str, data: np.ndarray):
+    write_numeric(BYTE, LongArray.tag_id, fileobj)
+    write_string(name, fileobj)
+    write_numeric(INT, len(data), fileobj)
+    fileobj.write(data.astype('>i8').tobytes())
+
+
+def _palette_tag(palette: list[BlockState]) -> List:
+    out = []
+    for b in palette:
+        entry = Compound({'Name': String(b.name)})
+        if b.properties:
+            entry['Properties'] = Compound({k: String(v) for k, v in b.properties.items()})
+        out.append(entry)
+    return List[Compound](out)
+
+
+def encode_region(region: Region) -> tuple[list[BlockState], np.ndarray, int, int]:
+    """
+    Drops unused palette entries and repacks block data with the minimal bit span.
+    :return: New palette, packed block states, bit span and amount of non-air blocks.
+    """
+    indices = region.get_block_array()
+    counts = np.bincount(indices, minlength=len(region.palette))
+    # Litematica expects air to stay at index 0
+    indices, kept = compact_indices(indices, len(region.palette), keep=(0,))
+    palette = [region.palette[i] for i in kept]
+    bit_span = required_bits(len(palette))
+    block_states = pack_long_array(indices, bit_span)
+    total_blocks = int(sum(c for b, c in zip(region.palette, counts.tolist()) if b.name != AIR))
+    return palette, block_states, bit_span, total_blocks
+
+
+def save_litematic(structure: Litematic, target: str | os.PathLike | BinaryIO, regions: Iterable[str] = None,
+                   skip_empty: bool = False, compresslevel: int = 6):
+    """
+    Writes the structure as a .litematic file. Regions are encoded and streamed into the gzip output
+    one at a time, without building an nbtlib tree of the whole file.
+
+    :param structure: Litematic to save.
+    :param target: File path or writable binary file-like object.
+    :param regions: Names of regions to keep. Defaults to all regions.
+    :param skip_empty: Drop regions that contain only air and no entities.
+    :param compresslevel: Gzip compression level.
+    """
+    if regions is None:
+        regions = structure.regions.keys()
+    selected = {i: structure.regions[i] for i in regions}
+    for r in selected.values():
+        if r.palette is None:
+            r.parse_metadata()
+            r.parse_block_data()
+
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, 'wb') as f:
+            return save_litematic(structure, f, selected.keys(), skip_empty, compresslevel)
+
+    with gzip.GzipFile(fileobj=target, mode='wb', compresslevel=compresslevel) as gz, \
+            io.BufferedWriter(gz) as f:
+        raw_nbt = structure.raw_nbt or {}
+        _write_compound_start(f, '')
+        for k, v in raw_nbt.items():
+            if k not in ('Metadata', 'Regions'):
+                _write_named(f, k, to_tag(v))
+        if 'Version' not in raw_nbt:
+            _write_named(f, 'Version', Int(LITEMATIC_VERSION))
+        if 'MinecraftDataVersion' not in raw_nbt and structure.metadata.data_version is not None:
+            _write_named(f, 'MinecraftDataVersion', Int(structure.metadata.data_version))
+
+        # Regions go first, so the metadata totals are known once they are written.
+        # Tag order doesn't matter to NBT readers.
+        totals = {'blocks': 0, 'volume': 0, 'count': 0}
+        corners = []
+        _write_compound_start(f, 'Regions')
+        for name, r in selected.items():
+            palette, block_states, _, total_blocks = encode_region(r)
+            if skip_empty and total_blocks == 0 and not r.entities and not r.tile_entities:
+                continue
+            totals['blocks'] += total_blocks
+            totals['volume'] += r.volume
+            totals['count'] += 1
+            corners.extend(r.get_bounds())
+
+            region_nbt = r.region_nbt or {}
+            _write_compound_start(f, name)
+            _write_named(f, 'Position', Compound({k: Int(v) for k, v in r.position._asdict().items()}))
+            _write_named(f, 'Size', Compound({k: Int(v) for k, v in r.size._asdict().items()}))
+            _write_named(f, 'BlockStatePalette', _palette_tag(palette))
+            _write_long_array(f, 'BlockStates', block_states)
+            # Released regions (see Structure.release_nbt()) only have the parsed (tile) entities left
+            parsed = {'TileEntities': r.tile_entities, 'Entities': r.entities}
+            for k in ('TileEntities', 'Entities', 'PendingBlockTicks', 'PendingFluidTicks'):
+                if k not in region_nbt:
+                    _write_named(f, k, List[Compound]([to_tag(i.nbt) for i in parsed.get(k) or []]))
+            for k, v in region_nbt.items():
+                if k not in _BLOCK_TAGS:
+                    _write_named(f, k, to_tag(v))
+            write_numeric(BYTE, _END, f)
+        write_numeric(BYTE, _END, f)
+
+        if corners:
+            low = Vec3d(*map(min, *corners))
+            high = Vec3d(*map(max, *corners))
+            enclosing = Vec3d(*(b - a + 1 for a, b in zip(low, high)))
+        else:
+            enclosing = Vec3d(0, 0, 0)
+        md = structure.metadata
+        metadata = to_tag(dict(raw_nbt.get('Metadata', {})))
+        metadata.update({
+            'Name': String(md.name or ''),
+            'Author': String(md.author or ''),
+            'Description': String(getattr(md, 'description', None) or ''),
+            'RegionCount': Int(totals['count']),
+            'TotalBlocks': Int(totals['blocks']),
+            'TotalVolume': Int(totals['volume']),
+            'EnclosingSize': Compound({k: Int(v) for k, v in enclosing._asdict().items()}),
+            'TimeModified': Long(int(time.time() * 1000)),
+        })
+        metadata.setdefault('TimeCreated', metadata['TimeModified'])
+        _write_named(f, 'Metadata', metadata)
+        write_numeric(BYTE, _END, f)
@@ -1,8 +1,18 @@
+import math
 import re
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from statistics import NormalDist
+from typing import Iterable
 
-from litematica_tools.storage.shared_storage import Region, BlockState, Structure, ItemStack
-from litematica_tools.utils import ItemCounter
+import numpy as np
+
+from litematica_tools.storage.shared_storage import Region, BlockState, Structure, ItemStack, Vec3d
+from litematica_tools.progress import Progress
+from litematica_tools.spatial_index import SpatialIndex
+from litematica_tools.utils import ItemCounter, EstimatedItemCounter
 from .config import CONFIG
 from .structure_parser import NBTFile
 
@@ -21,18 +31,27 @@ class MatConfig:
     entity_items: bool = True
 
     def __post_init__(self, *n, **kw):
+        # Copies, so changing one config doesn't change the defaults of others
         if 'ignored_blocks' not in kw:
-            self.ignored_blocks = CONFIG.ignored_blocks
+            self.ignored_blocks = list(CONFIG.ignored_blocks)
         if 'block_items' not in kw:
-            self.block_items = CONFIG.block_items
+            self.block_items = dict(CONFIG.block_items)
         if 'excluded_names' not in kw:
-            self.excluded_names = CONFIG.excluded_display_names
+            self.excluded_names = list(CONFIG.excluded_display_names)
 
 
 class MaterialList:
-    def __init__(self, structure: Structure, config: MatConfig = MatConfig()):
+    """
+    Counts blocks, container items and entities of a structure.
+
+    Separate MaterialLists can run in parallel threads, see material_lists().
+    Cached results (block_count, item_count, entity_count) are only stored once complete,
+    so sharing one instance between threads may compute a list twice, but never exposes a partial one.
+    """
+
+    def __init__(self, structure: Structure, config: MatConfig = None):
         self.structure = structure
-        self.config = config
+        self.config = config if config is not None else MatConfig()
         self._block_list = None
         self._item_list = None
         self._entity_list = None
@@ -52,21 +71,144 @@ class MaterialList:
     def block_count(self):
         self._block_list = None
 
-    def list_blocks(self, region: Region = None) -> ItemCounter:
-        self._block_list = ItemCounter()
+    def list_blocks(self, region: Region = None, sample: float = None, time_budget: float = None,
+                    confidence: float = 0.95, window: int = 4096, chunk_size: int = None,
+                    progress: Progress = None) -> ItemCounter:
+        """
+        Counts blocks exactly by default.
+        Setting sample or time_budget estimates the counts from evenly spread windows of blocks instead,
+        the result is then an EstimatedItemCounter and isn't cached in block_count.
+        Blocks that no sampled window contains are missing from an estimate, so rare blocks (a single chest)
+        are often left out, and intervals only exist for listed items.
+        Regions of only a few windows give wide intervals, use a smaller window for small regions.
+
+        :param region: Count only this region.
+        :param sample: Fraction of windows to decode, from 0 to 1.
+        :param time_budget: Seconds to spend decoding. With sample set as well, stops at whichever comes first.
+        :param confidence: Confidence level of the estimate intervals.
+        :param window: Amount of consecutive blocks decoded at once.
+        :param chunk_size: Decode exact counts in chunks of this many blocks instead of whole regions.
+        :param progress: Counts decoded blocks as the 'count' stage.
+        """
         if region is None:
             regions = list(self.structure.regions.values())
         else:
             regions = [region]
+        if sample is not None or time_budget is not None:
+            return self._estimate_blocks(regions, sample, time_budget, confidence, window, progress)
 
+        if progress is not None:
+            progress.start('count', sum(r.block_array_size for r in regions))
+        out = ItemCounter()
         for r in regions:
-            palette = self._process_palette(r.palette)
-            ignored_ids = [i for i, v in enumerate(r.palette) if v.name in self.config.ignored_blocks]
-            for i, v in enumerate(r.block_iterator()):
-                if v in ignored_ids:
-                    continue
-                self._block_list.extend(palette[v])
-        return self._block_list
+            self.count_histogram(r.palette, r.get_block_histogram(chunk_size=chunk_size, progress=progress), out)
+        self._block_list = out
+        return out
+
+    def list_blocks_in_box(self, low: Vec3d | tuple, high: Vec3d | tuple, region: Region = None) -> ItemCounter:
+        """
+        Same as list_blocks(), but only for blocks inside a box.
+        Uses the region's sections (built on first use), so empty parts of the box cost almost nothing.
+
+        :param low: Minimum block corner of the box, relative to the region.
+        :param high: Maximum block corner of the box (inclusive).
+        :param region: Region to search. By default, the first region of the structure.
+        """
+        if region is None:
+            region = next(iter(self.structure.regions.values()))
+        return self.count_histogram(region.palette, region.get_box_histogram(low, high), ItemCounter())
+
+    def count_histogram(self, palette: list, histogram: np.ndarray, out: ItemCounter) -> ItemCounter:
+        """
+        Adds materials of counted blocks to a list, applying the config (ignored blocks, block to item mapping).
+        :param palette: BlockState() entries the histogram is indexed by.
+        :param histogram: Amount of blocks of each palette entry.
+        :param out: Counter receiving the materials.
+        :return: out
+        """
+        # Only palette entries that are actually used get processed
+        used = np.flatnonzero(histogram)
+        entries = self._process_palette([palette[i] for i in used])
+        for entry, amount in zip(entries, histogram[used].tolist()):
+            for k, v in entry.items():
+                out.append(k, v * amount)
+        return out
+
+    def _estimate_blocks(self, regions: list[Region], sample: float, time_budget: float, confidence: float,
+                         window: int, progress: Progress = None) -> EstimatedItemCounter:
+        # Low discrepancy order: every prefix of it covers the whole region evenly
+        golden = (math.sqrt(5) - 1) / 2
+        rng = np.random.default_rng()
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        total_size = sum(r.block_array_size for r in regions)
+        start_time = time.perf_counter()
+
+        if progress is not None:
+            # The amount of sampled blocks depends on the time budget
+            progress.start('count')
+        totals: dict[str, float] = {}
+        variances: dict[str, float] = {}
+        sampled = 0
+        passed = 0
+        for r in regions:
+            size = r.block_array_size
+            passed += size
+            if size == 0:
+                continue
+            # Time budget is split between regions by their size
+            deadline = None if time_budget is None else start_time + time_budget * passed / total_size
+            windows = -(-size // window)
+            limit = windows if sample is None else max(1, math.ceil(sample * windows))
+            order = np.argsort((np.arange(windows) * golden + rng.random()) % 1)[:limit]
+
+            histograms, sizes = [], []
+            for w in order.tolist():
+                if deadline is not None and histograms and time.perf_counter() > deadline:
+                    break
+                scan_range = range(w * window, min((w + 1) * window, size))
+                histograms.append(r.get_block_histogram(scan_range))
+                sizes.append(len(scan_range))
+                if progress is not None:
+                    progress.advance(len(scan_range))
+
+            items, weights = self._palette_weights(r.palette)
+            counts = np.array(histograms) @ weights
+            sizes = np.array(sizes)
+            n = len(sizes)
+            ratio = counts.sum(axis=0) / sizes.sum()
+            # Ratio estimator over windows, with finite population correction
+            if n == windows:
+                variance = np.zeros(len(items))
+            elif n > 1:
+                residuals = counts - np.outer(sizes, ratio)
+                variance = windows ** 2 * (1 - n / windows) * residuals.var(axis=0, ddof=1) / n
+            else:
+                variance = np.full(len(items), np.inf)
+
+            for i, item in enumerate(items):
+                totals[item] = totals.get(item, 0) + ratio[i] * size
+                variances[item] = variances.get(item, 0) + variance[i]
+            sampled += int(sizes.sum())
+
+        out = EstimatedItemCounter({i: round(v) for i, v in totals.items() if round(v) > 0})
+        out.intervals = {i: (max(0.0, float(totals[i] - z * math.sqrt(variances[i]))),
+                             float(totals[i] + z * math.sqrt(variances[i]))) for i in out}
+        out.confidence = confidence
+        out.sample_fraction = sampled / total_size if total_size else 1.0
+        return out
+
+    def _palette_weights(self, palette: list) -> tuple[list[str], np.ndarray]:
+        """
+        :return: Item names and a matrix with amounts of each item per palette entry.
+        """
+        entries = self._process_palette(palette)
+        items = list(dict.fromkeys(k for e in entries for k in e))
+        index = {v: i for i, v in enumerate(items)}
+        weights = np.zeros((len(palette), len(items)))
+        for i, e in enumerate(entries):
+            for k, v in e.items():
+                weights[i, index[k]] = v
+        return items, weights
 
     def _process_palette(self, palette: list) -> list[dict[str, int]]:
         proc_palette = [{}] * len(palette)
@@ -115,20 +257,26 @@ class MaterialList:
     def item_count(self):
         self._item_list = None
 
-    def list_items(self, region: Region = None) -> ItemCounter:
-        def filter_names(item_stack: ItemStack) -> bool:
-            if item_stack.display_name is None:
-                return True
-            for i in self.config.excluded_names:
-                if re.search(i, item_stack.display_name):
-                    return False
+    def _filter_names(self, item_stack: ItemStack) -> bool:
+        if item_stack.display_name is None:
             return True
+        for i in self.config.excluded_names:
+            if re.search(i, item_stack.display_name):
+                return False
+        return True
 
+    def list_items(self, region: Region = None, progress: Progress = None) -> ItemCounter:
+        """
+        :param progress: Counts searched containers as the 'items' stage.
+        """
         if region is None:
             regions = list(self.structure.regions.values())
         else:
             regions = [region]
 
+        if progress is not None:
+            progress.start('items', sum(len(r.tile_entities) + len(r.entities) * self.config.entity_items
+                                        for r in regions))
         # Extract all items from all regions
         item_stack_list = []
         for r in regions:
@@ -137,15 +285,32 @@ class MaterialList:
             if self.config.entity_items:
                 for i in r.entities:
                     item_stack_list.extend(i.rec_inventory)
+            if progress is not None:
+                progress.advance(len(r.tile_entities) + len(r.entities) * self.config.entity_items)
 
         # Filter items by display name
-        self._item_list = ItemCounter()
-        item_stack_list = filter(filter_names, item_stack_list)
+        out = ItemCounter()
+        item_stack_list = filter(self._filter_names, item_stack_list)
         for i in item_stack_list:
-            self._item_list.append(i.name, i.count)
+            out.append(i.name, i.count)
         # self._item_list = ItemCounter({i.name: i.count for i in filter(
         #     lambda item: any(re.search(m, item.display_name) for m in self.config.excluded_names), item_stack_list)})
-        return self._item_list
+        self._item_list = out
+        return out
+
+    def list_items_in_box(self, low: Vec3d | tuple, high: Vec3d | tuple, region: Region = None) -> ItemCounter:
+        """
+        Same as list_items(), but only for containers inside a box.
+        Uses the region's SpatialIndex, built on first use (and parsing the region if it was loaded with init=False).
+        Box corners are the same as in list_blocks_in_box().
+
+        :param region: Region to search. By default, the first region of the structure.
+        """
+        if region is None:
+            region = next(iter(self.structure.regions.values()))
+        index = SpatialIndex.of(region, entities=self.config.entity_items, item_filter=self._filter_names,
+                                filter_key=tuple(self.config.excluded_names))
+        return index.item_count(low, high)
 
     @property
     def entity_count(self):
@@ -165,22 +330,49 @@ class MaterialList:
             regions = [region]
 
         # Extract all entities from all regions
-        self._entity_list = ItemCounter()
+        out = ItemCounter()
         for r in regions:
             for i in r.entities:
-                self._entity_list.append(i.id, 1)
-        return self._entity_list
+                out.append(i.id, 1)
+        self._entity_list = out
+        return out
 
     @property
     def total_count(self):
         return self.block_count + self.item_count + self.entity_count
 
-    def composite_list(self, blocks: bool, items: bool, entities: bool) -> ItemCounter:
+    def composite_list(self, blocks: bool, items: bool, entities: bool, progress: Progress = None) -> ItemCounter:
+        """
+        :param progress: Handed to list_blocks() and list_items() when their lists aren't cached yet.
+        """
         out = ItemCounter()
         if blocks:
-            out.extend(self.block_count)
+            out.extend(self._block_list if self._block_list is not None else self.list_blocks(progress=progress))
         if items:
-            out.extend(self.item_count)
+            out.extend(self._item_list if self._item_list is not None else self.list_items(progress=progress))
         if entities:
             out.extend(self.entity_count)
         return out
+
+
+def material_lists(sources: Iterable[str | os.PathLike | Structure], blocks: bool = True, items: bool = False,
+                   entities: bool = False, max_workers: int = None, config: MatConfig = None) -> list[ItemCounter]:
+    """
+    Thread pool mode: loads and counts several structures at once, one MaterialList per worker.
+    The item registry and configs are shared safely between workers.
+
+    Block decoding and counting run in numpy, which releases the GIL, so they overlap with parsing in other threads.
+
+    :param sources: File paths or already loaded structures.
+    :param max_workers: Amount of threads. Defaults to the amount of CPUs.
+    :param config: Config shared by all workers (not modified).
+    :return: Composite lists, in the same order as sources.
+    """
+    config = config if config is not None else MatConfig()
+
+    def count(source) -> ItemCounter:
+        structure = source if isinstance(source, Structure) else NBTFile(os.fspath(source))
+        return MaterialList(structure, config).composite_list(blocks=blocks, items=items, entities=entities)
+
+    with ThreadPoolExecutor(max_workers or os.cpu_count(), thread_name_prefix='litematica_tools') as pool:
+        return list(pool.map(count, sources))
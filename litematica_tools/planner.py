@@ -0,0 +1,351 @@
+import copy
+import io
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+import numpy as np
+
+from litematica_tools.errors import OperationCancelled
+from litematica_tools.material_list import MaterialList, MatConfig
+from litematica_tools.progress import Progress
+from litematica_tools.storage import Region
+from litematica_tools.storage.bit_array import required_bits, index_dtype
+from litematica_tools.storage.decompression import DecompressionStats, open_inflated
+from litematica_tools.storage.shared_storage import GZIP_MAGIC
+from litematica_tools.structure_parser import NBTFile
+from litematica_tools.utils import ItemCounter
+
+MEMORY = 'memory'
+CHUNKED = 'chunked'
+MULTIPROCESS = 'multiprocess'
+
+# Blocks decoded at once by the chunked strategies, lowered to fit the memory budget
+CHUNK_BLOCKS = 1 << 22
+MIN_CHUNK_BLOCKS = 1 << 16
+# Regions with fewer blocks aren't worth sending to another process, they are counted by the parent
+MULTIPROCESS_BLOCKS = 1 << 25
+# Rough python object size of one block entry in .nbt block lists
+NBT_BLOCK_BYTES = 600
+# Lists longer than this are only counted by the header reader
+_LIST_LIMIT = 4096
+
+_ARRAY_ITEMS = {7: 1, 11: 4, 12: 8}
+_SCALARS = {1: '>b', 2: '>h', 3: '>i', 4: '>q', 5: '>f', 6: '>d'}
+
+
+@dataclass
+class ArrayInfo:
+    """
+    Placeholder for an array tag skipped by the header reader.
+    """
+    length: int = field(default=0)
+    item_size: int = field(default=1)
+
+
+@dataclass
+class ListInfo:
+    """
+    Placeholder for a list tag too long to be kept by the header reader.
+    """
+    length: int = field(default=0)
+
+
+class _HeaderReader:
+    """
+    Reads NBT structure without materializing arrays and long lists, so big files can be inspected
+    with constant memory.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._skip_buffer = bytearray(1 << 16)
+
+    def _read(self, size: int) -> bytes:
+        data = self._stream.read(size)
+        if len(data) != size:
+            raise EOFError('Unexpected end of NBT data')
+        return data
+
+    def _skip(self, size: int):
+        while size > 0:
+            read = self._stream.readinto(memoryview(self._skip_buffer)[:min(size, len(self._skip_buffer))])
+            if not read:
+                raise EOFError('Unexpected end of NBT data')
+            size -= read
+
+    def _string(self) -> str:
+        return self._read(struct.unpack('>H', self._read(2))[0]).decode('utf-8', errors='replace')
+
+    def root(self) -> dict:
+        tag = self._read(1)[0]
+        if tag != 10:
+            raise ValueError('NBT root is not a compound')
+        self._string()
+        return self._payload(10)
+
+    def _payload(self, tag: int):
+        if tag in _SCALARS:
+            fmt = _SCALARS[tag]
+            return struct.unpack(fmt, self._read(struct.calcsize(fmt)))[0]
+        if tag in _ARRAY_ITEMS:
+            length = struct.unpack('>i', self._read(4))[0]
+            self._skip(length * _ARRAY_ITEMS[tag])
+            return ArrayInfo(length, _ARRAY_ITEMS[tag])
+        if tag == 8:
+            return self._string()
+        if tag == 9:
+            item_tag = self._read(1)[0]
+            length = struct.unpack('>i', self._read(4))[0]
+            if length <= _LIST_LIMIT:
+                return [self._payload(item_tag) for _ in range(length)]
+            for _ in range(length):
+                self._payload(item_tag)
+            return ListInfo(length)
+        if tag == 10:
+            out = {}
+            while (child := self._read(1)[0]) != 0:
+                name = self._string()
+                out[name] = self._payload(child)
+            return out
+        raise ValueError(f'Unknown NBT tag: {tag}')
+
+
+@dataclass
+class RegionInfo:
+    name: str = field(default=None)
+    volume: int = field(default=0)
+    palette_size: int = field(default=0)
+    # Bytes of block data as stored in the file
+    stored_bytes: int = field(default=0)
+
+
+@dataclass
+class HeaderInfo:
+    """
+    What a structure file holds, read without loading it.
+    """
+    file_format: str = field(default=None)
+    compressed_size: int = field(default=0)
+    decompressed_size: int = field(default=0)
+    total_volume: int = field(default=0)
+    region_count: int = field(default=0)
+    regions: list[RegionInfo] = field(default_factory=list)
+
+    @classmethod
+    def from_root(cls, root: dict, compressed_size: int = 0, decompressed_size: int = 0) -> 'HeaderInfo':
+        temp = cls()
+        temp.compressed_size = compressed_size
+        temp.decompressed_size = decompressed_size
+        if 'Regions' in root and 'Metadata' in root:
+            temp.file_format = 'litematic'
+            for name, r in root['Regions'].items():
+                size = r.get('Size', {})
+                palette = r.get('BlockStatePalette', [])
+                states = r.get('BlockStates', ArrayInfo())
+                temp.regions.append(RegionInfo(name, abs(size.get('x', 0) * size.get('y', 0) * size.get('z', 0)),
+                                               _length(palette), states.length * states.item_size))
+        elif 'Width' in root and 'Height' in root and 'Length' in root:
+            temp.file_format = 'schem'
+            palette_size = root.get('PaletteMax', len(root.get('Palette', {})))
+            data = root.get('BlockData', ArrayInfo())
+            temp.regions.append(RegionInfo(None, root['Width'] * root['Height'] * root['Length'], palette_size,
+                                           data.length))
+        elif 'palette' in root and 'blocks' in root:
+            temp.file_format = 'nbt'
+            blocks = _length(root['blocks'])
+            temp.regions.append(RegionInfo(None, blocks, _length(root['palette']), blocks * NBT_BLOCK_BYTES))
+        else:
+            raise ValueError('Unable to detect structure format from NBT tags')
+
+        metadata = root.get('Metadata', {})
+        temp.total_volume = metadata.get('TotalVolume') or sum(i.volume for i in temp.regions)
+        temp.region_count = metadata.get('RegionCount') or len(temp.regions)
+        return temp
+
+
+def _length(value) -> int:
+    return value.length if isinstance(value, ListInfo) else len(value)
+
+
+def read_header(file_path: str | os.PathLike) -> HeaderInfo:
+    """
+    Reads sizes and palettes of a structure file, skipping block data.
+    The file is decompressed while reading, with constant memory.
+    """
+    stats = DecompressionStats()
+    with open(file_path, 'rb') as f:
+        stream = io.BufferedReader(f)
+        if stream.peek(2)[:2] == GZIP_MAGIC:
+            stream = open_inflated(stream, stats)
+        root = _HeaderReader(stream).root()
+    compressed_size = os.path.getsize(file_path)
+    return HeaderInfo.from_root(root, compressed_size, stats.decompressed or compressed_size)
+
+
+def available_memory() -> int:
+    """
+    :return: Physical memory in bytes, or 4 GB if it can't be determined.
+    """
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return 4 << 30
+
+
+@dataclass
+class ExecutionPlan:
+    """
+    Strategy chosen by plan():
+    - memory: load and count everything at once, lowest overhead
+    - chunked: decode blocks in chunks of chunk_size, keeping only packed data in memory
+    - multiprocess: like chunked, with big regions counted in parallel worker processes
+    """
+    file_path: str = field(default=None)
+    strategy: str = field(default=MEMORY)
+    reason: str = field(default=None)
+    memory_budget: int = field(default=0)
+    estimated_memory: int = field(default=0)
+    chunk_size: int = field(default=None)
+    workers: int = field(default=1)
+    header: HeaderInfo = field(default=None)
+
+    def __str__(self):
+        out = f'{self.strategy} ({self.reason}), estimated {self.estimated_memory / 1e6:.0f} MB ' \
+              f'of {self.memory_budget / 1e6:.0f} MB budget'
+        if self.chunk_size:
+            out += f', chunks of {self.chunk_size} blocks'
+        if self.workers > 1:
+            out += f', {self.workers} workers'
+        return out
+
+
+def _estimate_memory(header: HeaderInfo, chunk_size: int = None) -> int:
+    """
+    Rough peak memory: the inflated file and its block data parsed in full by nbtlib, plus decoded palette indices.
+    """
+    total = header.decompressed_size or header.compressed_size
+    for r in header.regions:
+        item_size = index_dtype(required_bits(max(r.palette_size, 1))).itemsize
+        # Schematic block data is decoded in full while parsing
+        parsed = r.volume * item_size if header.file_format == 'schem' else 0
+        decoded = r.volume if chunk_size is None else min(r.volume, chunk_size)
+        # Decoding creates a few temporary arrays of 8 byte offsets per chunk
+        total += r.stored_bytes + parsed + decoded * (16 + (0 if parsed else item_size))
+    return total
+
+
+def plan(file_path: str | os.PathLike, memory_budget: int = None, max_workers: int = None) -> ExecutionPlan:
+    """
+    Picks how to count a structure file based on its header.
+
+    :param memory_budget: Bytes the counting may use. Defaults to half of the physical memory.
+    :param max_workers: Limit of worker processes. Defaults to the amount of CPUs.
+    """
+    temp = ExecutionPlan()
+    temp.file_path = os.fspath(file_path)
+    temp.memory_budget = memory_budget if memory_budget is not None else available_memory() // 2
+    # Small files are planned the same way, as well compressed ones inflate far beyond any fixed ratio
+    temp.header = read_header(file_path)
+    temp.estimated_memory = _estimate_memory(temp.header)
+    if temp.estimated_memory <= temp.memory_budget:
+        temp.strategy = MEMORY
+        temp.reason = 'fits the memory budget'
+        return temp
+
+    # Largest chunk that keeps the estimate within the budget
+    stored = _estimate_memory(temp.header, 0)
+    per_block = max(_estimate_memory(temp.header, 1) - stored, 1)
+    temp.chunk_size = int(min(CHUNK_BLOCKS, max(MIN_CHUNK_BLOCKS, (temp.memory_budget - stored) // per_block)))
+    temp.estimated_memory = _estimate_memory(temp.header, temp.chunk_size)
+    cpus = max_workers or os.cpu_count() or 1
+    big_regions = [i for i in temp.header.regions if i.volume >= MULTIPROCESS_BLOCKS]
+    if temp.header.file_format != 'nbt' and cpus > 1 and len(big_regions) > 1:
+        temp.strategy = MULTIPROCESS
+        temp.workers = min(cpus, len(big_regions))
+        temp.reason = f'{len(big_regions)} big regions'
+        # Every worker holds a copy of its region's packed data and one chunk
+        temp.estimated_memory += sum(sorted((i.stored_bytes for i in big_regions), reverse=True)[:temp.workers])
+    else:
+        temp.strategy = CHUNKED
+        temp.reason = 'exceeds the memory budget'
+    if temp.estimated_memory > temp.memory_budget:
+        temp.reason += ', still over budget when chunked'
+    return temp
+
+
+def _light_copy(region: Region) -> Region:
+    # Only what decoding needs, so workers don't receive the whole region NBT
+    temp = copy.copy(region)
+    temp.region_nbt = None
+    temp.tile_entities = None
+    temp.entities = None
+    temp.sections = None
+    temp.spatial_indexes = {}
+    return temp
+
+
+def _region_histogram(region: Region, chunk_size: int) -> np.ndarray:
+    return region.get_block_histogram(chunk_size=chunk_size)
+
+
+def execute(execution_plan: ExecutionPlan, blocks: bool = True, items: bool = False, entities: bool = False,
+            config: MatConfig = None, progress: Progress = None) -> ItemCounter:
+    """
+    Counts materials of the planned file with the chosen strategy.
+    :param progress: Follows loading and counting.
+    With the multiprocess strategy, regions counted by workers are reported and cancelled once per region.
+    :return: Same as MaterialList.composite_list().
+    """
+    structure = NBTFile(execution_plan.file_path, progress=progress)
+    mat_list = MaterialList(structure, config)
+    if execution_plan.strategy == MEMORY:
+        return mat_list.composite_list(blocks=blocks, items=items, entities=entities, progress=progress)
+
+    out = ItemCounter()
+    if blocks:
+        regions = list(mat_list.structure.regions.values())
+        if progress is not None:
+            progress.start('count', sum(r.block_array_size for r in regions))
+        if execution_plan.strategy == MULTIPROCESS:
+            histograms = [None] * len(regions)
+            with ProcessPoolExecutor(execution_plan.workers) as pool:
+                futures = {i: pool.submit(_region_histogram, _light_copy(r), execution_plan.chunk_size)
+                           for i, r in enumerate(regions) if r.volume >= MULTIPROCESS_BLOCKS}
+                try:
+                    # Small regions are counted here while the workers run
+                    for i, r in enumerate(regions):
+                        if i not in futures:
+                            histograms[i] = r.get_block_histogram(chunk_size=execution_plan.chunk_size,
+                                                                  progress=progress)
+                    for i, future in futures.items():
+                        histograms[i] = future.result()
+                        if progress is not None:
+                            progress.advance(regions[i].block_array_size)
+                except OperationCancelled:
+                    for future in futures.values():
+                        future.cancel()
+                    raise
+        else:
+            histograms = [i.get_block_histogram(chunk_size=execution_plan.chunk_size, progress=progress)
+                          for i in regions]
+        for r, histogram in zip(regions, histograms):
+            mat_list.count_histogram(r.palette, histogram, out)
+    if items:
+        out.extend(mat_list.list_items(progress=progress))
+    if entities:
+        out.extend(mat_list.entity_count)
+    return out
+
+
+def count_materials(file_path: str | os.PathLike, blocks: bool = True, items: bool = False, entities: bool = False,
+                    memory_budget: int = None, config: MatConfig = None,
+                    progress: Progress = None) -> tuple[ItemCounter, ExecutionPlan]:
+    """
+    plan() and execute() in one call.
+    :return: Material list and the plan that was used.
+    """
+    execution_plan = plan(file_path, memory_budget)
+    return execute(execution_plan, blocks, items, entities, config, progress), execution_plan
@@ -0,0 +1,238 @@
+import os
+import sys
+import time
+import tracemalloc
+import types
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from litematica_tools.material_list import MaterialList, MatConfig
+from litematica_tools.storage import Structure, load_nbt
+from litematica_tools.structure_parser import detect_structure_class
+from litematica_tools.utils import ItemCounter
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS isn't reported there
+    resource = None
+
+
+def current_rss() -> int | None:
+    """
+    :return: Resident set size of the process in bytes, None where /proc isn't available.
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss() -> int | None:
+    """
+    :return: Highest resident set size the process reached so far in bytes, None if unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@dataclass
+class StageMemory:
+    """
+    Memory use of one pipeline stage.
+
+    - traced: int (bytes allocated by Python and numpy at the end of the stage)
+    - traced_peak: int (highest traced amount during the stage)
+    - rss: int (resident set size at the end of the stage, None if unknown)
+    - peak_rss: int (process peak resident set size so far, None if unknown)
+    - top: list ((allocation site, bytes) that grew the most during the stage)
+    """
+    name: str = field(default=None)
+    seconds: float = field(default=0.0)
+    traced: int = field(default=0)
+    traced_peak: int = field(default=0)
+    rss: int = field(default=None)
+    peak_rss: int = field(default=None)
+    top: list = field(default_factory=list)
+
+
+def _mb(value: int | None) -> str:
+    return '-' if value is None else f'{value / 1e6:.1f}'
+
+
+def _deep_size(obj, seen: set) -> int:
+    """
+    Size of an object and everything it references that isn't in seen yet. Classes, modules and functions are skipped.
+    """
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, np.ndarray):
+            # Views report only their header, the data belongs to the base
+            if o.base is not None:
+                stack.append(o.base)
+        elif isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif hasattr(o, '__dict__'):
+            stack.append(vars(o))
+    return total
+
+
+def retained_sizes(structure: Structure) -> dict[str, int]:
+    """
+    Approximate memory kept by each part of a structure, in bytes.
+    Objects reachable from several parts count towards the first one listed, e.g. tile entity NBT
+    shared with the raw NBT counts as raw NBT while it is kept.
+    """
+    regions = list(structure.regions.values())
+    seen = set()
+    parts = {
+        'raw nbt': [structure.raw_nbt] + [r.region_nbt for r in regions],
+        'block data': [(r.block_states, r.sections) for r in regions],
+        'palettes': [r.palette for r in regions],
+        'tile entities and items': [r.tile_entities for r in regions],
+        'entities': [r.entities for r in regions],
+    }
+    return {k: _deep_size(v, seen) for k, v in parts.items()}
+
+
+class MemoryProfile:
+    """
+    Records memory use per stage with tracemalloc and the process resident set size.
+
+    Tracing slows Python allocations down noticeably, timings of a profiled run aren't representative.
+    """
+
+    def __init__(self, top: int = 5):
+        """
+        :param top: Amount of allocation sites listed per stage. 0 skips the snapshots, which are slow for big files.
+        """
+        self.top = top
+        self.stages: list[StageMemory] = []
+        # Sizes of structure parts before and after release_nbt(), filled by profile_memory()
+        self.retained: dict[str, int] = {}
+        self.released: dict[str, int] = {}
+        self._own_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracing = True
+
+    def stop(self):
+        if self._own_tracing:
+            tracemalloc.stop()
+            self._own_tracing = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        # Allocations of the profiler itself aren't reported
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                                          tracemalloc.Filter(False, __file__)])
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Measures the code run inside the with block as one stage.
+        """
+        self.start()
+        before = self._snapshot() if self.top else None
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        yield
+        temp = StageMemory()
+        temp.name = name
+        temp.seconds = time.perf_counter() - start
+        temp.traced, temp.traced_peak = tracemalloc.get_traced_memory()
+        temp.rss = current_rss()
+        temp.peak_rss = peak_rss()
+        if self.top:
+            grown = [i for i in self._snapshot().compare_to(before, 'lineno') if i.size_diff > 0]
+            temp.top = [(str(i.traceback), i.size_diff) for i in grown[:self.top]]
+        self.stages.append(temp)
+
+    def __str__(self):
+        out = [f'{"stage":<14} {"seconds":>8} {"traced MB":>10} {"peak MB":>9} {"RSS MB":>8} {"peak RSS MB":>12}']
+        for i in self.stages:
+            out.append(f'{i.name:<14} {i.seconds:>8.3f} {_mb(i.traced):>10} {_mb(i.traced_peak):>9} '
+                       f'{_mb(i.rss):>8} {_mb(i.peak_rss):>12}')
+        for i in self.stages:
+            if i.top:
+                out.append(f'\nlargest allocations of {i.name}:')
+                out.extend(f'  {_mb(size):>8} MB  {site}' for site, size in i.top)
+        if self.retained:
+            out.append('\nretained by the structure (MB):')
+            for k, v in self.retained.items():
+                after = f' -> {_mb(self.released[k])}' if k in self.released else ''
+                out.append(f'  {k:<24} {_mb(v):>8}{after}')
+            if self.released:
+                saved = sum(self.retained.values()) - sum(self.released.values())
+                out.append(f'  release_nbt() saved {_mb(saved)} MB')
+        return '\n'.join(out)
+
+
+def profile_memory(file_path: str | os.PathLike, blocks: bool = True, items: bool = False, entities: bool = False,
+                   release_nbt: bool = False, top: int = 5,
+                   config: MatConfig = None) -> tuple[ItemCounter, Structure, MemoryProfile]:
+    """
+    Loads and counts a structure file stage by stage, recording memory use of each stage:
+    load (decompress and parse NBT), unpack (convert tags to python objects), parse regions (palettes and block data),
+    inventories (tile entities, entities and their items), release nbt (optional) and counting.
+    Tags are always unpacked, since counting reads block properties as python objects.
+
+    :param release_nbt: Drop raw NBT after parsing, see Structure.release_nbt(), reporting the savings.
+    :param top: Amount of allocation sites listed per stage.
+    :return: Composite material list, the loaded structure and the profile.
+    """
+    profile = MemoryProfile(top)
+    try:
+        with profile.stage('load'):
+            with open(file_path, 'rb') as f:
+                nbt = load_nbt(f, unpack=False)
+        with profile.stage('unpack'):
+            nbt = nbt.unpack()
+
+        with profile.stage('parse regions'):
+            structure = detect_structure_class(nbt).from_nbt(nbt, init=False)
+            structure.name = os.path.basename(file_path)
+            # Only the structure keeps the NBT from here on, so release_nbt() can free it
+            del nbt
+            for r in structure.regions.values():
+                r.parse_metadata()
+                r.parse_block_data()
+        with profile.stage('inventories'):
+            for r in structure.regions.values():
+                r.parse_tile_entities()
+                r.parse_entities()
+
+        profile.retained = retained_sizes(structure)
+        if release_nbt:
+            with profile.stage('release nbt'):
+                structure.release_nbt()
+            profile.released = retained_sizes(structure)
+
+        with profile.stage('counting'):
+            mat_list = MaterialList(structure, config).composite_list(blocks=blocks, items=items, entities=entities)
+    finally:
+        profile.stop()
+    return mat_list, structure, profile
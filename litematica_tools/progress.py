@@ -0,0 +1,110 @@
+import io
+import threading
+import time
+from typing import BinaryIO, Callable
+
+from litematica_tools.errors import OperationCancelled
+
+# Blocks counted between progress updates when no chunk size is given
+COUNT_CHUNK_SIZE = 1 << 22
+
+
+class Progress:
+    """
+    Progress reporting and cooperative cancellation for loading and counting.
+
+    Pass one to NBTFile/Structure.from_file(), MaterialList.list_blocks() or list_items().
+    Work is split into stages ('load', 'parse', 'count', 'items'), each reported as done out of total units
+    (compressed bytes, regions, blocks, containers). The total is None when it isn't known in advance.
+    Stages check the token between chunks, so cancel() from another thread (or the callback) stops the work
+    with OperationCancelled at the next chunk. Nothing is checked when no token is passed.
+    """
+
+    def __init__(self, callback: Callable[[str, int, int | None], None] = None, interval: float = 0.1,
+                 timeout: float = None):
+        """
+        :param callback: Called with the stage, units done and total units.
+        :param interval: Minimum seconds between callback calls within a stage. The end of a stage is always reported.
+        :param timeout: Seconds after which the work is cancelled.
+        """
+        self.callback = callback
+        self.interval = interval
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.stage: str = None
+        self.done = 0
+        self.total: int = None
+        self._cancelled = threading.Event()
+        self._reason = 'Cancelled'
+        self._last_report = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str = 'Cancelled'):
+        """
+        Requests the work to stop. Safe to call from any thread.
+        """
+        self._reason = reason
+        self._cancelled.set()
+
+    def check(self):
+        """
+        :raises OperationCancelled: If cancelled or past the timeout.
+        """
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.cancel(f'Timed out during {self.stage or "startup"}')
+        if self._cancelled.is_set():
+            raise OperationCancelled(f'{self._reason} ({self.stage}: {self.done}/{self.total})')
+
+    def start(self, stage: str, total: int = None):
+        """
+        Begins a new stage, reporting it with nothing done yet.
+        """
+        self.stage = stage
+        self.done = 0
+        self.total = total
+        self._last_report = 0.0
+        self.advance(0)
+
+    def advance(self, amount: int = 1):
+        """
+        Marks units of the current stage as done, then checks for cancellation.
+        """
+        self.done += amount
+        self.check()
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if now - self._last_report >= self.interval or (amount and self.done == self.total):
+            self._last_report = now
+            self.callback(self.stage, self.done, self.total)
+
+
+class ProgressReader(io.RawIOBase):
+    """
+    Raw stream reporting bytes read from another stream as the 'load' stage.
+    """
+
+    def __init__(self, stream: BinaryIO, progress: Progress):
+        self._stream = stream
+        self._progress = progress
+        total = None
+        if hasattr(stream, 'seekable') and stream.seekable():
+            position = stream.tell()
+            total = stream.seek(0, io.SEEK_END) - position
+            stream.seek(position)
+        progress.start('load', total)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        if hasattr(self._stream, 'readinto'):
+            size = self._stream.readinto(buffer) or 0
+        else:
+            data = self._stream.read(len(buffer))
+            size = len(data)
+            buffer[:size] = data
+        self._progress.advance(size)
+        return size
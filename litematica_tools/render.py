@@ -0,0 +1,185 @@
+import os
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+import numpy as np
+
+from litematica_tools.config import CONFIG
+from litematica_tools.storage import Region, Structure, BlockState, Vec3d
+
+AIR_BLOCKS = {'minecraft:air', 'minecraft:cave_air', 'minecraft:void_air', 'minecraft:structure_void'}
+# Layers decoded at once while searching columns from the top
+LAYER_BATCH = 16
+
+
+@dataclass
+class TopDownMap:
+    """
+    Highest non-air block of every column, rows are Z (north on top) and columns are X.
+
+    - heights: np.ndarray (int32, Y of the top block, -1 for empty columns)
+    - colors: np.ndarray (uint8 RGB of the top block)
+    - origin: Vec3d (minimum corner, heights are relative to its Y)
+    """
+    heights: np.ndarray = field(default=None)
+    colors: np.ndarray = field(default=None)
+    origin: Vec3d = field(default=None)
+
+    def shaded(self, strength: float = 0.15) -> np.ndarray:
+        """
+        :return: Colors darkened or lightened by the height step to the north neighbor, like in-game maps.
+        """
+        heights = self.heights.astype(np.int64)
+        step = np.zeros_like(heights)
+        step[1:] = np.sign(heights[1:] - heights[:-1])
+        step[self.heights < 0] = 0
+        factor = 1 + strength * step
+        return np.clip(self.colors * factor[..., None], 0, 255).astype(np.uint8)
+
+    def heightmap(self) -> np.ndarray:
+        """
+        :return: Heights scaled to grayscale (uint8), empty columns are black.
+        """
+        filled = self.heights >= 0
+        if not filled.any():
+            return np.zeros(self.heights.shape, np.uint8)
+        low, high = self.heights[filled].min(), self.heights[filled].max()
+        out = (self.heights - low + 1) * (255 / (high - low + 1))
+        return np.where(filled, out, 0).astype(np.uint8)
+
+
+def block_color(block_state: BlockState) -> tuple[int, int, int]:
+    """
+    Color from the block_colors config table, then block_color_keywords, then a stable color made from the name.
+    """
+    name = str(block_state.name)
+    color = CONFIG.block_colors.get(name)
+    if color is None:
+        short = name.split(':')[-1]
+        color = next((v for k, v in CONFIG.block_color_keywords if k in short), None)
+    if color is None:
+        value = zlib.crc32(name.encode()) & 0xFFFFFF
+        return tuple(64 + (value >> i & 0xFF) // 2 for i in (16, 8, 0))
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+
+def palette_colors(palette: list[BlockState]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    :return: RGB table and air mask, indexed by palette index.
+    """
+    colors = np.array([block_color(i) for i in palette] or np.zeros((0, 3)), np.uint8).reshape(-1, 3)
+    air = np.array([str(i.name) in AIR_BLOCKS for i in palette], bool)
+    return colors, air
+
+
+def top_blocks(region: Region) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the highest non-air block of every column.
+    Layers are decoded from the top in batches, stopping once every column is covered.
+
+    :return: Palette indices and Y of the top blocks, shaped as z, x (-1 for empty columns).
+    """
+    size = abs(region.size)
+    _, air = palette_colors(region.palette)
+    # Out of palette indices (structure voids of .nbt files) count as air
+    air = np.append(air, True)
+    top = np.zeros((size.z, size.x), np.int64)
+    heights = np.full((size.z, size.x), -1, np.int32)
+
+    for y1 in range(size.y, 0, -LAYER_BATCH):
+        y0 = max(0, y1 - LAYER_BATCH)
+        blocks = region.get_block_layers(y0, y1, fill=len(region.palette))
+        solid = ~air[np.minimum(blocks, len(air) - 1)]
+
+        # Highest solid layer of the batch, for columns that are still empty
+        found = solid.any(axis=0) & (heights < 0)
+        if found.any():
+            offset = (y1 - y0 - 1) - np.argmax(solid[::-1], axis=0)
+            heights[found] = (y0 + offset)[found]
+            top[found] = np.take_along_axis(blocks, offset[None], axis=0)[0][found]
+        if (heights >= 0).all():
+            break
+    return top, heights
+
+
+def render_region(region: Region) -> TopDownMap:
+    top, heights = top_blocks(region)
+    colors, _ = palette_colors(region.palette)
+    colors = np.concatenate((colors, np.zeros((1, 3), np.uint8)))
+    out = colors[np.minimum(top, len(colors) - 1)]
+    out[heights < 0] = 0
+    return TopDownMap(heights=heights, colors=out, origin=region.get_bounds()[0])
+
+
+def render(structure: Structure) -> TopDownMap:
+    """
+    Top-down map of all regions merged into one image, higher blocks win where regions overlap.
+    """
+    regions = list(structure.regions.values())
+    bounds = [r.get_bounds() for r in regions]
+    low = Vec3d(*(min(i) for i in zip(*(b[0] for b in bounds))))
+    high = Vec3d(*(max(i) for i in zip(*(b[1] for b in bounds))))
+
+    heights = np.full((high.z - low.z + 1, high.x - low.x + 1), -1, np.int32)
+    colors = np.zeros(heights.shape + (3,), np.uint8)
+    for r in regions:
+        part = render_region(r)
+        offset = part.origin - low
+        rows = slice(offset.z, offset.z + part.heights.shape[0])
+        columns = slice(offset.x, offset.x + part.heights.shape[1])
+        part_heights = np.where(part.heights >= 0, part.heights + offset.y, -1)
+        higher = part_heights > heights[rows, columns]
+        heights[rows, columns][higher] = part_heights[higher]
+        colors[rows, columns][higher] = part.colors[higher]
+    return TopDownMap(heights=heights, colors=colors, origin=low)
+
+
+def _scaled(image: np.ndarray, scale: int) -> np.ndarray:
+    if scale == 1:
+        return image
+    return image.repeat(scale, axis=0).repeat(scale, axis=1)
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """
+    :param image: uint8 array shaped as (height, width) for grayscale or (height, width, 3) for RGB.
+    """
+    height, width = image.shape[:2]
+    color_type = 2 if image.ndim == 3 else 0
+    # Every row starts with filter type 0 (none)
+    rows = np.concatenate((np.zeros((height, 1), np.uint8), image.reshape(height, -1)), axis=1)
+    header = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header) +
+            _png_chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)) + _png_chunk(b'IEND', b''))
+
+
+def encode_ppm(image: np.ndarray) -> bytes:
+    """
+    :param image: uint8 array shaped as (height, width) for grayscale (PGM) or (height, width, 3) for RGB (PPM).
+    """
+    height, width = image.shape[:2]
+    magic = b'P6' if image.ndim == 3 else b'P5'
+    return magic + f'\n{width} {height}\n255\n'.encode() + np.ascontiguousarray(image).tobytes()
+
+
+def save_image(image: np.ndarray, target: str | os.PathLike | BinaryIO, file_format: str = None, scale: int = 1):
+    """
+    :param file_format: 'png' or 'ppm'. Defaults to the target file extension.
+    :param scale: Pixels per block.
+    """
+    if file_format is None:
+        file_format = os.path.splitext(target)[1].lstrip('.').lower() if isinstance(target, (str, os.PathLike)) \
+            else 'png'
+    image = _scaled(image, scale)
+    data = encode_ppm(image) if file_format in ('ppm', 'pgm') else encode_png(image)
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, 'wb') as f:
+            f.write(data)
+    else:
+        target.write(data)
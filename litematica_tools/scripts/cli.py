@@ -1,13 +1,15 @@
-import csv
-import io
 import json
+from contextlib import contextmanager
 
-from click import group, echo, option, argument, Choice
-from ..material_list import MaterialList
-from ..schematic_parser import NBTFile
+from click import group, echo, option, argument, open_file, Choice, ClickException
+from ..client import DEFAULT_ADDRESS, DaemonClient
+from ..errors import DaemonException
 
-item_name = "Item"
-total_name = "Total"
+# Parsing modules are imported by the commands using them,
+# so the daemon client doesn't pay for numpy and nbtlib on every call
+
+# Same as export.WRITERS, listed here so the export module is only imported when writing
+OUTPUT_FORMATS = ['basic', 'json', 'csv', 'ascii', 'jsonl', 'npz']
 
 
 # Root command
@@ -19,64 +21,225 @@ def cli():
 
 # Define as command
 @cli.command('list')
-@argument('file')
+@argument('files', nargs=-1, required=True)
 # Which categories to list
 @option('--blocks/--no-blocks', '-b/-B', 'blocks', default=False, help='Include blocks.')
 @option('--inventories/--no-inventories', '-i/-I', 'inventories', default=False, help='Include inventory contents.')
 @option('--entities/--no-entities', '-e/-E', 'entities', default=False, help='Include entities.')
 # Output formatting option
 @option('--format', '-f', 'formatting', default='basic',
-        type=Choice(['basic', 'json', 'csv', 'ascii'], case_sensitive=False), help='Output format.')
-def list_schem(file, blocks, inventories, entities, formatting):
-    """Options for counting and listing schematic contents."""
+        type=Choice(OUTPUT_FORMATS, case_sensitive=False), help='Output format.')
+@option('--output', '-o', 'output', default=None, help='File to write to instead of stdout. Required for npz.')
+@option('--stats', 'stats', is_flag=True, default=False, help='Print decompression throughput to stderr.')
+@option('--memory-budget', 'memory_budget', default=None, type=int,
+        help='Memory limit in MB. Picks a chunked or multiprocess strategy for files that exceed it.')
+@option('--progress', 'show_progress', is_flag=True, default=False, help='Print progress to stderr.')
+@option('--timeout', 'timeout', default=None, type=float, help='Give up after this many seconds.')
+@option('--memory-profile', 'memory_profile', is_flag=True, default=False,
+        help='Print memory use of each loading stage to stderr.')
+@option('--release-nbt', 'release_nbt', is_flag=True, default=False,
+        help='Drop raw NBT after parsing to save memory.')
+def list_schem(files, blocks, inventories, entities, formatting, output, stats, memory_budget, show_progress,
+               timeout, memory_profile, release_nbt):
+    """Options for counting and listing schematic contents. Lists of several files are written one by one."""
+    from ..errors import OperationCancelled
+    from ..material_list import MaterialList
+    from ..progress import Progress
+    from ..structure_parser import NBTFile
+
     if not (blocks or inventories or entities):
         blocks = True
+    progress = None
+    if show_progress or timeout is not None:
+        progress = Progress(print_progress if show_progress else None, interval=0.5, timeout=timeout)
+
+    with open_writer(formatting, output, len(files) > 1) as writer:
+        for file in files:
+            try:
+                if memory_profile:
+                    from ..profiling import profile_memory
+
+                    mat_list, _, profile = profile_memory(file, blocks, inventories, entities,
+                                                          release_nbt=release_nbt)
+                    echo(f'Memory profile of {file}:\n{profile}', err=True)
+                elif memory_budget is not None:
+                    from ..planner import count_materials
+
+                    mat_list, execution_plan = count_materials(file, blocks, inventories, entities,
+                                                               memory_budget << 20, progress=progress)
+                    echo(f'Plan: {execution_plan}', err=True)
+                else:
+                    structure = NBTFile(file, progress=progress)
+                    if stats:
+                        echo(structure.load_stats, err=True)
+                    if release_nbt:
+                        structure.release_nbt()
+                    mat_list = MaterialList(structure).composite_list(blocks=blocks, items=inventories,
+                                                                      entities=entities, progress=progress)
+            except OperationCancelled as e:
+                raise ClickException(str(e))
+            writer.write(mat_list, file)
+
+
+@cli.command('convert')
+@argument('source')
+@argument('target')
+@option('--format', '-f', 'file_format', default=None,
+        type=Choice(['litematic', 'schem', 'nbt'], case_sensitive=False),
+        help='Output format. Defaults to the target file extension.')
+def convert_schem(source, target, file_format):
+    """Convert a schematic to another format."""
+    from ..converter import convert
+    from ..structure_parser import NBTFile
+
+    convert(NBTFile(source, unpack=False), target, file_format)
+
+
+@cli.command('diff')
+@argument('schematic')
+@argument('build')
+@option('--offset', 'offset', nargs=3, type=int, default=(0, 0, 0), help='X Y Z added to build positions.')
+@option('--exact', 'exact', is_flag=True, default=False, help='Blocks with other properties count as wrong.')
+@option('--wrong', 'show_wrong', is_flag=True, default=False,
+        help='List blocks to remove from the build instead of remaining materials.')
+@option('--format', '-f', 'formatting', default='basic',
+        type=Choice(OUTPUT_FORMATS, case_sensitive=False), help='Output format.')
+@option('--output', '-o', 'output', default=None, help='File to write to instead of stdout. Required for npz.')
+def diff_schem(schematic, build, offset, exact, show_wrong, formatting, output):
+    """List materials still missing from a build, given a capture of it (any supported format)."""
+    from ..diff import material_delta
+    from ..structure_parser import NBTFile
+
+    delta = material_delta(NBTFile(schematic), NBTFile(build), offset, match_properties=exact)
+    echo(f'Placed {delta.placed} of {delta.required} blocks ({delta.completion:.1%})', err=True)
+    with open_writer(formatting, output) as writer:
+        writer.write(delta.wrong if show_wrong else delta.remaining)
+
 
-    mat_list = MaterialList(NBTFile(file)).composite_list(blocks=blocks, items=inventories, entities=entities)
-
-    echo(format_list(mat_list, formatting))
-
-
-def format_list(mat_list, formatting):
-    out = ''
-    match formatting:
-        case 'basic':
-            for k, v in mat_list.items():
-                out += f'{k}: {v}\n'
-        case 'json':
-            out = json.dumps(mat_list, indent=4)
-        case 'csv':
-            output = io.StringIO()
-            writer = csv.writer(output, quoting=csv.QUOTE_NONNUMERIC)
-            writer.writerow((item_name, total_name))
-            writer.writerows([(k, v) for k, v in mat_list.items()])
-            out = output.getvalue()
-        case 'ascii':
-            out = format_ascii(mat_list)
-    return out
-
-
-def format_ascii(mat_list):
-    max_name_len = max(max([len(i) for i in mat_list.keys()]), len(item_name))
-    max_amount_len = max(max([len(str(i)) for i in mat_list.values()]), len(total_name))
-
-    def make_row(key, value):
-        return '| {key}{key_spaces} | {value}{value_spaces} |\n'.format(
-            key=key,
-            value=value,
-            key_spaces=' ' * (max_name_len - len(key)),
-            value_spaces=' ' * (max_amount_len - len(str(value)))
-        )
-
-    divider = '+{dashes_left}+{dashes_right}+\n'.format(
-        dashes_left='-' * (max_name_len + 2),
-        dashes_right='-' * (max_amount_len + 2)
-    )
-    header = divider + make_row(item_name, total_name) + divider
-
-    out = header
-    for k, v in mat_list.items():
-        out += make_row(k, v)
-    out += header
-
-    return out
+@cli.command('render')
+@argument('file')
+@argument('output')
+@option('--heightmap', 'heightmap', default=None, help='Also save a grayscale heightmap to this file.')
+@option('--scale', '-s', 'scale', default=1, show_default=True, help='Pixels per block.')
+@option('--shade/--no-shade', 'shade', default=True, help='Shade by height differences, like in-game maps.')
+def render_schem(file, output, heightmap, scale, shade):
+    """Render a top-down map of a schematic to PNG or PPM, by the output file extension."""
+    from ..render import render, save_image
+    from ..structure_parser import NBTFile
+
+    top_down = render(NBTFile(file))
+    save_image(top_down.shaded() if shade else top_down.colors, output, scale=scale)
+    if heightmap is not None:
+        save_image(top_down.heightmap(), heightmap, scale=scale)
+
+
+@cli.command('library')
+@argument('paths', nargs=-1, required=True)
+@option('--store', '-s', 'store', default=None,
+        help='Directory keeping region results between runs. By default, nothing is saved.')
+@option('--format', '-f', 'formatting', default='basic',
+        type=Choice(OUTPUT_FORMATS, case_sensitive=False), help='Output format.')
+@option('--output', '-o', 'output', default=None, help='File to write to instead of stdout. Required for npz.')
+def library_report(paths, store, formatting, output):
+    """Count blocks of all schematics in files and directories, once per unique region."""
+    from ..library import RegionLibrary
+
+    library = RegionLibrary(store)
+    with open_writer(formatting, output) as writer:
+        writer.write(library.report(paths))
+    echo(f'Regions counted: {library.computed}, reused: {library.reused}, unreadable files: {library.failed}',
+         err=True)
+
+
+@cli.command('index')
+@argument('paths', nargs=-1, required=True)
+@option('--db', 'db', default='litematica_index.db', show_default=True, help='Index database file.')
+@option('--prune/--no-prune', 'prune', default=True, help='Remove deleted files from the index.')
+def build_index(paths, db, prune):
+    """Index schematics in files and directories, refreshing modified ones."""
+    from ..search_index import SearchIndex
+
+    with SearchIndex(db) as index:
+        stats = index.refresh(paths, prune)
+    echo(', '.join(f'{k}: {v}' for k, v in stats.items()))
+
+
+@cli.command('search')
+@argument('name')
+@option('--db', 'db', default='litematica_index.db', show_default=True, help='Index database file.')
+@option('--category', '-c', 'category', default='blocks', type=Choice(['blocks', 'items', 'entities']),
+        help='What the name refers to.')
+@option('--min', 'min_count', default=1, show_default=True, help='Minimum amount in a file.')
+@option('--max', 'max_count', default=None, type=int, help='Maximum amount in a file.')
+def search_index(name, db, category, min_count, max_count):
+    """Find indexed schematics containing a block, item or entity. Accepts * and ? wildcards."""
+    from ..search_index import SearchIndex
+
+    with SearchIndex(db) as index:
+        for path, count in index.find(name, category, min_count, max_count):
+            echo(f'{path}: {count}')
+
+
+@cli.command('serve')
+@option('--address', '-a', 'address', default=DEFAULT_ADDRESS, show_default=True,
+        help='Address to listen on: host:port or unix:/path/to/socket.')
+@option('--cache-size', 'cache_size', default=32, show_default=True, help='Amount of structures kept loaded.')
+def serve_daemon(address, cache_size):
+    """Run a daemon keeping configs and loaded structures warm."""
+    from ..daemon import Daemon
+
+    echo(f'Listening on {address}')
+    Daemon(max_structures=cache_size).serve(address)
+
+
+@cli.command('query')
+@argument('command', type=Choice(['list', 'metadata', 'stats', 'ping', 'invalidate', 'shutdown']))
+@argument('files', nargs=-1)
+@option('--address', '-a', 'address', default=DEFAULT_ADDRESS, show_default=True, help='Address of the daemon.')
+@option('--blocks/--no-blocks', '-b/-B', 'blocks', default=False, help='Include blocks.')
+@option('--inventories/--no-inventories', '-i/-I', 'inventories', default=False, help='Include inventory contents.')
+@option('--entities/--no-entities', '-e/-E', 'entities', default=False, help='Include entities.')
+@option('--format', '-f', 'formatting', default='basic',
+        type=Choice(OUTPUT_FORMATS, case_sensitive=False), help='Output format of material lists.')
+@option('--output', '-o', 'output', default=None,
+        help='File to write material lists to instead of stdout. Required for npz.')
+def query_daemon(command, files, address, blocks, inventories, entities, formatting, output):
+    """Send a request to a running daemon. Accepts several files, all sent over one connection."""
+    try:
+        with DaemonClient(address) as client:
+            if command == 'list':
+                with open_writer(formatting, output, len(files) > 1) as writer:
+                    for file in files or [None]:
+                        result = client.request(command, file=file, blocks=blocks, items=inventories,
+                                                entities=entities)
+                        writer.write(result, file)
+                return
+            for file in files or [None]:
+                params = {'file': file} if file is not None else {}
+                result = client.request(command, **params)
+                if result is not None:
+                    echo(json.dumps(result, indent=4))
+    except DaemonException as e:
+        raise ClickException(str(e))
+
+
+def print_progress(stage, done, total):
+    if total:
+        echo(f'{stage}: {done}/{total} ({done / total:.0%})', err=True)
+    else:
+        echo(f'{stage}: {done}', err=True)
+
+
+@contextmanager
+def open_writer(formatting, output, multiple=False):
+    """Writer of the format, to the output file or stdout. Pass multiple when writing lists of several files."""
+    from ..export import get_writer
+
+    if formatting == 'npz':
+        if output is None:
+            raise ClickException('The npz format is binary and needs an --output file.')
+        with get_writer(formatting, output, multiple) as writer:
+            yield writer
+        return
+    with open_file(output or '-', 'w') as stream, get_writer(formatting, stream, multiple) as writer:
+        yield writer
@@ -0,0 +1,171 @@
+import logging
+import os
+import sqlite3
+import time
+from typing import Iterable
+
+from litematica_tools.material_list import MaterialList, MatConfig
+from litematica_tools.structure_parser import NBTFile, find_structure_files
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    format TEXT,
+    name TEXT,
+    author TEXT,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS blocks (file_id INTEGER NOT NULL, name TEXT NOT NULL, count INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS items (file_id INTEGER NOT NULL, name TEXT NOT NULL, count INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS entities (file_id INTEGER NOT NULL, name TEXT NOT NULL, count INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS blocks_name ON blocks (name, count);
+CREATE INDEX IF NOT EXISTS items_name ON items (name, count);
+CREATE INDEX IF NOT EXISTS entities_name ON entities (name, count);
+CREATE INDEX IF NOT EXISTS blocks_file ON blocks (file_id);
+CREATE INDEX IF NOT EXISTS items_file ON items (file_id);
+CREATE INDEX IF NOT EXISTS entities_file ON entities (file_id);
+"""
+CATEGORIES = ('blocks', 'items', 'entities')
+
+
+def _full_name(name: str) -> str:
+    return name if ':' in name or name.startswith('*') else 'minecraft:' + name
+
+
+class SearchIndex:
+    """
+    SQLite index of block, item and entity totals of many schematics,
+    answering which files contain something without opening them.
+
+    - blocks: amount of each block id over all regions (every palette name is listed, unused ones with 0)
+    - items: items stored in containers, as in MaterialList.list_items()
+    - entities: amount of each entity id
+    """
+
+    def __init__(self, db_path: str | os.PathLike = ':memory:', config: MatConfig = None):
+        """
+        :param db_path: Index database file, created if missing.
+        :param config: Material list config used for item totals.
+        """
+        self.db_path = db_path
+        self.config = config or MatConfig()
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def refresh(self, paths: Iterable[str | os.PathLike], prune: bool = True) -> dict[str, int]:
+        """
+        Indexes new and modified files (by modification time and size) under the given paths.
+
+        :param paths: Files and directories, searched recursively.
+        :param prune: Remove files that no longer exist from the index.
+        :return: Amount of 'added', 'updated', 'unchanged', 'removed' and 'failed' files.
+        Missing or unreadable files count as failed.
+        """
+        stats = dict.fromkeys(('added', 'updated', 'unchanged', 'removed', 'failed'), 0)
+        known = {path: (file_id, mtime, size) for file_id, path, mtime, size in
+                 self.connection.execute('SELECT id, path, mtime_ns, size FROM files')}
+
+        for path in find_structure_files(paths):
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                logging.warning(f'Unable to index {path}: {e}')
+                stats['failed'] += 1
+                continue
+            if path in known and known[path][1:] == (stat.st_mtime_ns, stat.st_size):
+                stats['unchanged'] += 1
+                continue
+            try:
+                self._index_file(path, stat, known.get(path, (None,))[0])
+            except Exception as e:
+                logging.warning(f'Unable to index {path}: {e}')
+                stats['failed'] += 1
+                continue
+            stats['updated' if path in known else 'added'] += 1
+
+        if prune:
+            for path, (file_id, _, _) in known.items():
+                if not os.path.exists(path):
+                    self._remove(file_id)
+                    stats['removed'] += 1
+        self.connection.commit()
+        return stats
+
+    def _index_file(self, path: str, stat: os.stat_result, file_id: int = None):
+        structure = NBTFile(path)
+        mat_list = MaterialList(structure, self.config)
+
+        blocks = {}
+        for r in structure.regions.values():
+            for entry, amount in zip(r.palette, r.get_block_histogram().tolist()):
+                blocks[str(entry.name)] = blocks.get(str(entry.name), 0) + amount
+        counts = {'blocks': blocks, 'items': mat_list.list_items(), 'entities': mat_list.list_entities()}
+
+        with self.connection:
+            if file_id is not None:
+                self._remove(file_id)
+            metadata = structure.metadata
+            file_id = self.connection.execute(
+                'INSERT INTO files (path, mtime_ns, size, format, name, author, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (path, stat.st_mtime_ns, stat.st_size, type(structure).__name__.lower(),
+                 metadata.name, metadata.author, time.time())).lastrowid
+            for category, values in counts.items():
+                self.connection.executemany(f'INSERT INTO {category} (file_id, name, count) VALUES (?, ?, ?)',
+                                            [(file_id, str(k), int(v)) for k, v in values.items()])
+
+    def _remove(self, file_id: int):
+        for category in CATEGORIES:
+            self.connection.execute(f'DELETE FROM {category} WHERE file_id = ?', (file_id,))
+        self.connection.execute('DELETE FROM files WHERE id = ?', (file_id,))
+
+    def find(self, name: str, category: str = 'blocks', min_count: int = 1,
+             max_count: int = None) -> list[tuple[str, int]]:
+        """
+        :param name: Block, item or entity id. The 'minecraft:' namespace may be left out.
+        Wildcards (* and ?) match several ids, their amounts are summed, e.g. '*shulker_box'.
+        :param category: 'blocks', 'items' or 'entities'.
+        :param min_count: Minimum amount in a file. Set to 0 to include blocks only present in palettes.
+        :param max_count: Optional maximum amount in a file.
+        :return: Paths of matching files with their amounts, most first.
+        """
+        if category not in CATEGORIES:
+            raise ValueError(f'Unknown category: {category}')
+        operator = 'GLOB' if '*' in name or '?' in name else '='
+        query = f'SELECT f.path, SUM(c.count) FROM {category} c JOIN files f ON f.id = c.file_id ' \
+                f'WHERE c.name {operator} ? GROUP BY f.id HAVING SUM(c.count) >= ?'
+        params = [_full_name(name), min_count]
+        if max_count is not None:
+            query += ' AND SUM(c.count) <= ?'
+            params.append(max_count)
+        return self.connection.execute(query + ' ORDER BY 2 DESC, f.path', params).fetchall()
+
+    def counts(self, path: str | os.PathLike, category: str = 'blocks') -> dict[str, int]:
+        """
+        :return: Indexed amounts of a single file.
+        """
+        if category not in CATEGORIES:
+            raise ValueError(f'Unknown category: {category}')
+        rows = self.connection.execute(f'SELECT c.name, c.count FROM {category} c JOIN files f ON f.id = c.file_id '
+                                       f'WHERE f.path = ? ORDER BY c.count DESC', (os.path.abspath(path),))
+        return dict(rows.fetchall())
+
+    def totals(self, category: str = 'blocks') -> dict[str, int]:
+        """
+        :return: Amounts summed over all indexed files.
+        """
+        if category not in CATEGORIES:
+            raise ValueError(f'Unknown category: {category}')
+        rows = self.connection.execute(f'SELECT name, SUM(count) FROM {category} GROUP BY name ORDER BY 2 DESC')
+        return dict(rows.fetchall())
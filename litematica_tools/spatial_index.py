@@ -0,0 +1,142 @@
+import itertools
+import math
+from typing import Callable, Hashable, Iterable
+
+import numpy as np
+
+from litematica_tools.storage import Region, Container, ItemStack, Vec3d
+from litematica_tools.utils import ItemCounter
+
+
+class SpatialIndex:
+    """
+    Uniform grid over positioned objects (tile entities, entities) of a region.
+
+    Objects are sorted by grid cell, so a query only looks at cells that touch the requested area:
+    small boxes look their cells up by coordinates, boxes spanning more cells than are occupied scan the occupied ones.
+    Cells that lie completely inside a box are taken as a whole, using item totals precomputed per cell,
+    only objects of cells on the border get compared one by one.
+
+    Boxes use inclusive block coordinates relative to the region: a point belongs to the box
+    when low <= point < high + 1, so entities standing inside a block are counted with it.
+    """
+
+    def __init__(self, objects: Iterable[Container], cell_size: int = 16,
+                 item_filter: Callable[[ItemStack], bool] = None):
+        """
+        :param objects: Objects with a position attribute.
+        :param cell_size: Edge length of a grid cell in blocks.
+        :param item_filter: Tells whether an item stack should be included in item totals.
+        Only used while building, the index doesn't keep it.
+        """
+        self.objects = list(objects)
+        self.cell_size = cell_size
+
+        self._positions = np.array([i.position for i in self.objects], dtype=np.float64).reshape(-1, 3)
+        cells = np.floor(self._positions / cell_size).astype(np.int64)
+        self._cells, inverse = np.unique(cells, axis=0, return_inverse=True)
+        self._order = np.argsort(inverse.ravel(), kind='stable')
+        self._bounds = np.searchsorted(inverse.ravel()[self._order], np.arange(len(self._cells) + 1))
+        self._cell_ids = {tuple(c): i for i, c in enumerate(self._cells.tolist())}
+
+        self._object_items = [self._count_items(i, item_filter) for i in self.objects]
+        self._cell_items = []
+        for i in range(len(self._cells)):
+            total = ItemCounter()
+            for k in self._order[self._bounds[i]:self._bounds[i + 1]].tolist():
+                total.extend(self._object_items[k])
+            self._cell_items.append(total)
+
+    @classmethod
+    def of(cls, region: Region, cell_size: int = 16, entities: bool = True,
+           item_filter: Callable[[ItemStack], bool] = None, filter_key: Hashable = None) -> 'SpatialIndex':
+        """
+        Index over tile entities (and entities) of a region, built on first use and cached in region.spatial_indexes.
+        Regions loaded with init=False are parsed first.
+        :param entities: Include entities, not only tile entities.
+        :param filter_key: Settings item_filter depends on, e.g. excluded names. The cache is keyed by them instead
+        of the callable, indexes with a filter but no key aren't cached.
+        """
+        key = cell_size, entities, filter_key
+        if key in region.spatial_indexes and (item_filter is None or filter_key is not None):
+            return region.spatial_indexes[key]
+        region.parse_missing()
+        objects = list(region.tile_entities)
+        if entities:
+            objects.extend(region.entities)
+        index = cls(objects, cell_size, item_filter)
+        if item_filter is None or filter_key is not None:
+            region.spatial_indexes[key] = index
+        return index
+
+    @staticmethod
+    def _count_items(container: Container, item_filter: Callable[[ItemStack], bool]) -> ItemCounter:
+        out = ItemCounter()
+        for i in container.rec_inventory:
+            if item_filter is None or item_filter(i):
+                out.append(i.name, i.count)
+        return out
+
+    def _select(self, low: np.ndarray, high: np.ndarray) -> tuple[list[int], np.ndarray]:
+        """
+        :return: Indices of cells completely inside the box and objects from cells crossing its border.
+        """
+        first = np.floor(low / self.cell_size).astype(np.int64)
+        last = np.ceil(high / self.cell_size).astype(np.int64) - 1
+        if (last < first).any():
+            return [], np.empty(0, np.int64)
+
+        if math.prod((last - first + 1).tolist()) <= len(self._cells):
+            keys = itertools.product(*(range(a, b + 1) for a, b in zip(first.tolist(), last.tolist())))
+            cells = np.array([self._cell_ids[i] for i in keys if i in self._cell_ids], np.int64)
+        else:
+            cells = np.flatnonzero(((self._cells >= first) & (self._cells <= last)).all(axis=1))
+        cell_low = self._cells[cells] * self.cell_size
+        inside = ((cell_low >= low) & (cell_low + self.cell_size <= high)).all(axis=1)
+        return cells[inside].tolist(), self._cell_objects(cells[~inside].tolist())
+
+    def _cell_objects(self, cells: list[int]) -> np.ndarray:
+        return np.concatenate([self._order[self._bounds[i]:self._bounds[i + 1]] for i in cells]
+                              or [np.empty(0, np.int64)])
+
+    def query_box(self, low: Vec3d | tuple, high: Vec3d | tuple) -> list[Container]:
+        """
+        :param low: Minimum block corner of the box.
+        :param high: Maximum block corner of the box (inclusive).
+        :return: Objects inside the box.
+        """
+        low = np.asarray(low, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64) + 1
+        cells, candidates = self._select(low, high)
+        points = self._positions[candidates]
+        matched = candidates[((points >= low) & (points < high)).all(axis=1)]
+        return [self.objects[i] for i in np.concatenate((self._cell_objects(cells), matched)).tolist()]
+
+    def query_radius(self, center: Vec3d | tuple, radius: float) -> list[Container]:
+        """
+        :return: Objects within the given distance from the center point.
+        """
+        center = np.asarray(center, dtype=np.float64)
+        # Cells inside the bounding box can still have corners outside the sphere, so every object gets checked
+        cells, candidates = self._select(center - radius, center + radius + 1)
+        candidates = np.concatenate((self._cell_objects(cells), candidates))
+        distance = ((self._positions[candidates] - center) ** 2).sum(axis=1)
+        return [self.objects[i] for i in candidates[distance <= radius * radius].tolist()]
+
+    def item_count(self, low: Vec3d | tuple, high: Vec3d | tuple) -> ItemCounter:
+        """
+        Box corners are the same as in query_box().
+        :return: Total items stored in containers inside the box.
+        """
+        low = np.asarray(low, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64) + 1
+        cells, candidates = self._select(low, high)
+        points = self._positions[candidates]
+        matched = candidates[((points >= low) & (points < high)).all(axis=1)]
+
+        out = ItemCounter()
+        for i in cells:
+            out.extend(self._cell_items[i])
+        for i in matched.tolist():
+            out.extend(self._object_items[i])
+        return out
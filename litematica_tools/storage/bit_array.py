@@ -0,0 +1,183 @@
+import numpy as np
+
+# Entries processed at once, small enough for temporary arrays to stay in CPU cache.
+# Must be a multiple of 64, so every chunk starts at the beginning of a long.
+CHUNK_SIZE = 1 << 14
+
+
+def required_bits(palette_size: int) -> int:
+    """
+    :param palette_size: Amount of entries in the palette.
+    :return: Bit span Litematica uses for a palette of that size (never less than 2).
+    """
+    return max(2, int.bit_length(palette_size - 1))
+
+
+def index_dtype(bit_span: int) -> np.dtype:
+    """
+    :return: Smallest unsigned dtype that fits palette indices of the given bit span.
+    """
+    if bit_span <= 8:
+        return np.dtype(np.uint8)
+    if bit_span <= 16:
+        return np.dtype(np.uint16)
+    return np.dtype(np.uint32)
+
+
+def _read_entries(words: np.ndarray, offset: np.ndarray, bit_span: int) -> np.ndarray:
+    """
+    :param words: Packed values as uint64, followed by an extra zero,
+    so entries at the end can read the next value unconditionally.
+    :param offset: Bit offsets of the entries (uint64), modified in place.
+    """
+    word = offset >> np.uint64(6)
+    offset &= np.uint64(63)
+    value = words[word] >> offset
+    # Two shifts, so entries starting at a long boundary shift the next value out entirely
+    value |= (words[word + np.uint64(1)] << np.uint64(1)) << (np.uint64(63) - offset)
+    return value & np.uint64((1 << bit_span) - 1)
+
+
+def _padded_words(longs: np.ndarray, start: int = 0, stop: int = None) -> np.ndarray:
+    return np.append(np.asarray(longs[start:stop]).astype(np.uint64), np.uint64(0))
+
+
+def unpack_long_array(longs: np.ndarray, bit_span: int, count: int, first: int = 0) -> np.ndarray:
+    """
+    Decodes Litematica's long array, where entries are packed back to back and may span two longs.
+
+    :param longs: Packed values (any int64 or uint64 array).
+    :param bit_span: Bit length of each entry.
+    :param count: Amount of entries to decode.
+    :param first: Index of the first entry to decode.
+    :return: Flat array of palette indices.
+    """
+    out = np.empty(count, index_dtype(bit_span))
+    # Only the longs holding the requested entries get converted
+    first_word = first * bit_span >> 6
+    words = _padded_words(longs, first_word, -(-(first + count) * bit_span // 64))
+    skipped = np.uint64(first_word * 64)
+    if not words.any():
+        # Empty (all air) stretches are common and need no decoding
+        out.fill(0)
+        return out
+
+    for start in range(0, count, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, count - start)
+        offset = np.arange(first + start, first + start + size, dtype=np.uint64) * np.uint64(bit_span) - skipped
+        out[start:start + size] = _read_entries(words, offset, bit_span)
+
+    return out
+
+
+def unpack_long_array_at(longs: np.ndarray, bit_span: int, indices: np.ndarray) -> np.ndarray:
+    """
+    Same as unpack_long_array(), but decodes only the given entries.
+
+    :param indices: Indices of entries to decode.
+    :return: Palette indices in the same order as indices.
+    """
+    offset = np.asarray(indices).astype(np.uint64) * np.uint64(bit_span)
+    return _read_entries(_padded_words(longs), offset, bit_span).astype(index_dtype(bit_span))
+
+
+def pack_long_array(indices: np.ndarray, bit_span: int) -> np.ndarray:
+    """
+    Inverse of unpack_long_array().
+
+    :param indices: Flat array of palette indices.
+    :param bit_span: Bit length of each entry.
+    :return: Packed int64 array, ready to be stored as a LongArray.
+    """
+    indices = np.asarray(indices)
+    count = len(indices)
+    out = np.zeros(-(-count * bit_span // 64) + 1, np.uint64)
+
+    for start in range(0, count, CHUNK_SIZE):
+        value = indices[start:start + CHUNK_SIZE].astype(np.uint64)
+        offset = np.arange(start, start + len(value), dtype=np.uint64) * np.uint64(bit_span)
+        word = offset >> np.uint64(6)
+        offset &= np.uint64(63)
+        # Entries never overlap, so OR-ing everything that falls into the same long packs it
+        groups = np.flatnonzero(np.concatenate(([True], word[1:] != word[:-1])))
+        target = word[groups]
+        out[target] |= np.bitwise_or.reduceat(value << offset, groups)
+        out[target + np.uint64(1)] |= np.bitwise_or.reduceat((value >> np.uint64(1)) >> (np.uint64(63) - offset), groups)
+
+    return out[:-1].view(np.int64)
+
+
+def _decode_varints(data: np.ndarray) -> np.ndarray:
+    # Every byte without the continuation bit ends a value
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    group = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shift = (np.arange(len(group)) - starts[group]) * 7
+    payload = (data[:len(group)] & 0x7F).astype(np.uint32) << shift.astype(np.uint32)
+    return np.add.reduceat(payload, starts)
+
+
+def decode_varint_array(data: np.ndarray) -> np.ndarray:
+    """
+    Decodes Sponge schematic BlockData, where each palette index is stored as a varint.
+
+    :param data: Byte array with varint encoded values.
+    :return: Flat array of palette indices.
+    """
+    data = np.asarray(data).view(np.uint8)
+    last = data < 0x80
+    if last.all():
+        return data.copy()
+
+    # Decoded in slices ending at value boundaries, so temporary index arrays stay small
+    out = np.empty(np.count_nonzero(last), np.uint32)
+    start = written = 0
+    while start < len(data):
+        stop = min(start + CHUNK_SIZE * 4, len(data))
+        if stop < len(data):
+            stop = start + int(np.flatnonzero(last[start:stop])[-1]) + 1
+        values = _decode_varints(data[start:stop])
+        out[written:written + len(values)] = values
+        written += len(values)
+        start = stop
+    return out
+
+
+def compact_indices(indices: np.ndarray, palette_size: int, keep: tuple[int] = ()) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Remaps palette indices so that only used entries remain, keeping their order.
+
+    :param indices: Flat array of palette indices.
+    :param palette_size: Amount of entries in the current palette.
+    :param keep: Entries that stay in the palette even if no block uses them.
+    :return: Remapped indices and, for each entry of the new palette, its index in the old one.
+    """
+    used = np.bincount(indices, minlength=palette_size) > 0
+    used[list(keep)] = True
+    kept = np.flatnonzero(used)
+    remap = (np.cumsum(used) - 1).astype(index_dtype(int.bit_length(max(len(kept) - 1, 0))))
+    return remap[indices], kept
+
+
+def encode_varint_array(indices: np.ndarray) -> np.ndarray:
+    """
+    Inverse of decode_varint_array().
+
+    :param indices: Flat array of palette indices.
+    :return: Signed byte array, ready to be stored as a ByteArray.
+    """
+    indices = np.asarray(indices).astype(np.uint32, copy=False)
+    if len(indices) == 0 or indices.max() < 0x80:
+        return indices.astype(np.int8)
+
+    lengths = np.ones(len(indices), np.int64)
+    for bound in (1 << 7, 1 << 14, 1 << 21, 1 << 28):
+        lengths += indices >= bound
+    offsets = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), np.uint8)
+    for i in range(int(lengths.max())):
+        has_byte = lengths > i
+        byte = (indices[has_byte] >> np.uint32(7 * i)) & 0x7F
+        byte |= (lengths[has_byte] > i + 1).astype(np.uint32) << 7  # continuation bit
+        out[offsets[has_byte] + i] = byte
+    return out.view(np.int8)
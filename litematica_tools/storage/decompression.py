@@ -0,0 +1,175 @@
+import importlib
+import io
+import time
+import zlib
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import BinaryIO
+
+# zlib compatible modules, fastest first. Only ones that are installed get used.
+BACKENDS = {
+    'isal': 'isal.isal_zlib',  # python-isal (Intel ISA-L)
+    'zlib-ng': 'zlib_ng.zlib_ng',  # zlib-ng
+    'zlib': 'zlib',
+}
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+# Compressed bytes read from the stream at once
+CHUNK_SIZE = 1 << 18
+
+_backend: tuple[str, ModuleType] = None
+
+
+def available_backends() -> list[str]:
+    """
+    :return: Names of installed backends, fastest first.
+    """
+    out = []
+    for name, module in BACKENDS.items():
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            continue
+        out.append(name)
+    return out
+
+
+def set_backend(name: str = None):
+    """
+    :param name: Backend from BACKENDS. By default, the fastest installed one.
+    """
+    global _backend
+    if name is None:
+        name = available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f'Unknown decompression backend: {name}')
+    _backend = name, importlib.import_module(BACKENDS[name])
+
+
+def get_backend() -> tuple[str, ModuleType]:
+    """
+    :return: Name and module of the backend in use.
+    """
+    if _backend is None:
+        set_backend()
+    return _backend
+
+
+@dataclass
+class DecompressionStats:
+    """
+    Filled while inflating, see load_nbt().
+    """
+    backend: str = field(default=None)
+    compressed: int = field(default=0)
+    decompressed: int = field(default=0)
+    seconds: float = field(default=0.0)
+
+    @property
+    def throughput(self) -> float:
+        """
+        Decompressed megabytes per second spent inflating (parsing time excluded).
+        """
+        return self.decompressed / self.seconds / 1e6 if self.seconds else 0.0
+
+    def __str__(self):
+        return (f'{self.backend}: {self.compressed / 1e6:.1f} MB -> {self.decompressed / 1e6:.1f} MB '
+                f'in {self.seconds:.3f} s ({self.throughput:.0f} MB/s)')
+
+
+def _padding(data) -> bool:
+    # Zero bytes some tools append after the last gzip member
+    return not bytes(data).strip(b'\x00')
+
+
+def decompress(data: bytes | bytearray | memoryview, stats: DecompressionStats = None) -> bytes:
+    """
+    Inflates a whole gzip buffer, one call per member. Gives the same result as reading it through InflateReader:
+    concatenated members are joined and trailing zero padding is ignored.
+    :raises EOFError: If the data ends inside a member.
+    """
+    name, backend = get_backend()
+    start = time.perf_counter()
+    parts = []
+    rest = data
+    while True:
+        inflater = backend.decompressobj(GZIP_WBITS)
+        parts.append(inflater.decompress(rest))
+        if not inflater.eof:
+            raise EOFError('Compressed file ended before the end-of-stream marker was reached')
+        rest = inflater.unused_data
+        if _padding(rest):
+            break
+    # Returns the only part itself, without copying it
+    out = b''.join(parts)
+    if stats is not None:
+        stats.backend = name
+        stats.compressed += len(data)
+        stats.decompressed += len(out)
+        stats.seconds += time.perf_counter() - start
+    return out
+
+
+class InflateReader(io.RawIOBase):
+    """
+    Raw stream inflating gzip data from another stream, a chunk at a time.
+    Compressed chunks are read into one reusable buffer and the checksum is verified by the backend.
+    Wrap it in io.BufferedReader for the small reads of the NBT parser.
+    """
+
+    def __init__(self, stream: BinaryIO, stats: DecompressionStats = None, chunk_size: int = CHUNK_SIZE):
+        self._stream = stream
+        self._name, self._backend = get_backend()
+        self._inflater = self._backend.decompressobj(GZIP_WBITS)
+        self._buffer = bytearray(chunk_size)
+        self._pending = b''  # compressed input the inflater didn't take yet
+        self._output = memoryview(b'')  # inflated data not returned yet
+        self._eof = False
+        self.stats = stats if stats is not None else DecompressionStats()
+        self.stats.backend = self._name
+
+    def readable(self):
+        return True
+
+    def _read_chunk(self) -> bytes:
+        if hasattr(self._stream, 'readinto'):
+            size = self._stream.readinto(self._buffer)
+            return memoryview(self._buffer)[:size or 0]
+        return self._stream.read(len(self._buffer))
+
+    def readinto(self, buffer) -> int:
+        while not self._output and not self._eof:
+            data = self._pending or self._read_chunk()
+            self._pending = b''
+            if not data:
+                if not self._inflater.eof:
+                    raise EOFError('Compressed file ended before the end-of-stream marker was reached')
+                self._eof = True
+                break
+            self.stats.compressed += len(data)
+
+            start = time.perf_counter()
+            if self._inflater.eof:
+                if _padding(data):
+                    self._eof = True
+                    break
+                # Concatenated gzip members
+                self._inflater = self._backend.decompressobj(GZIP_WBITS)
+            out = self._inflater.decompress(data, len(buffer))
+            # Unconsumed input refers to the reused buffer, so it has to be copied before the next read
+            self._pending = bytes(self._inflater.unconsumed_tail or self._inflater.unused_data)
+            self.stats.seconds += time.perf_counter() - start
+            self.stats.decompressed += len(out)
+            self.stats.compressed -= len(self._pending)
+            self._output = memoryview(out)
+
+        size = min(len(buffer), len(self._output))
+        buffer[:size] = self._output[:size]
+        self._output = self._output[size:]
+        return size
+
+
+def open_inflated(stream: BinaryIO, stats: DecompressionStats = None, chunk_size: int = CHUNK_SIZE) -> BinaryIO:
+    """
+    :return: Buffered stream with the inflated contents of a gzip stream.
+    """
+    return io.BufferedReader(InflateReader(stream, stats, chunk_size), chunk_size)
@@ -0,0 +1,67 @@
+import numpy as np
+
+from litematica_tools.storage.shared_storage import BlockState, Region
+
+AIR = 'minecraft:air'
+
+
+def block_key(block_state: BlockState) -> tuple:
+    """
+    :return: Hashable name and sorted properties, equal for equal block states of any format.
+    """
+    properties = block_state.properties or {}
+    name = None if block_state.name is None else str(block_state.name)
+    return name, tuple(sorted((str(k), str(v)) for k, v in properties.items()))
+
+
+def region_blocks(region: Region, remap: np.ndarray, fill: int = 0) -> np.ndarray:
+    """
+    :param remap: Global index of each palette entry of the region, see GlobalPalette.remap().
+    :param fill: Global index for positions missing from .nbt regions, air by default.
+    :return: Region blocks in the global palette, shaped as y, z, x.
+    """
+    lookup = np.append(remap, np.array([fill], remap.dtype))
+    return lookup[region.get_block_volume(len(region.palette))]
+
+
+class GlobalPalette:
+    """
+    Palette shared by several regions, so their blocks compare as plain integers. Air is always 0.
+    Each entry of a region palette is translated once, blocks are then remapped with a lookup array.
+    """
+
+    def __init__(self):
+        self.palette = [BlockState(name=AIR)]
+        self._keys = {block_key(self.palette[0]): 0}
+
+    def __len__(self):
+        return len(self.palette)
+
+    def remap(self, palette: list[BlockState]) -> np.ndarray:
+        """
+        :return: Global index of each entry, adding new ones to the palette.
+        """
+        out = np.empty(len(palette), np.uint32)
+        for i, b in enumerate(palette):
+            key = block_key(b)
+            if key not in self._keys:
+                self._keys[key] = len(self.palette)
+                self.palette.append(BlockState(name=key[0], properties=dict(key[1]) or None))
+            out[i] = self._keys[key]
+        return out
+
+    def comparison_keys(self, match_properties: bool) -> np.ndarray:
+        """
+        :return: Value compared for each global index, the index itself or an id of the block name.
+        """
+        if match_properties:
+            return np.arange(len(self.palette), dtype=np.uint32)
+        names = {}
+        return np.array([names.setdefault(str(i.name), len(names)) for i in self.palette], np.uint32)
+
+    def name_mask(self, names) -> np.ndarray:
+        """
+        :return: Whether each global index has one of the block names.
+        """
+        names = set(names)
+        return np.array([str(i.name) in names for i in self.palette], bool)
@@ -1,4 +1,5 @@
 from litematica_tools.storage.shared_storage import *
+from litematica_tools.storage.bit_array import required_bits, unpack_long_array, unpack_long_array_at, pack_long_array
 from litematica_tools.errors import BlockOutOfBounds
 
 
@@ -17,6 +18,10 @@ class LitematicRegion(Region):
     - _bit_span: int (bit length of each entry from the palette)
     _ _items: list (all Item() objects in the region)
     """
+    parsed_tags = {'BlockStatePalette': 'palette', 'BlockStates': 'block_states',
+                   'TileEntities': 'tile_entities', 'Entities': 'entities'}
+    # Litematica expects air at index 0
+    pinned_palette = (0,)
 
     def __init__(self, *args, **kwargs):
         self._shift = None
@@ -32,7 +37,7 @@ class LitematicRegion(Region):
         self.palette = [BlockState(name=i['Name'],
                                    properties=i.get('Properties', None)) for i in self.region_nbt['BlockStatePalette']]
         self.block_states = self.region_nbt['BlockStates']
-        self._bit_span = int.bit_length(len(self.palette) - 1)
+        self._bit_span = required_bits(len(self.palette))
         self._shift = (1 << self._bit_span) - 1
 
     def parse_tile_entities(self):
@@ -42,16 +47,26 @@ class LitematicRegion(Region):
             temp.nbt = i
             temp.position = Vec3d.from_dict(i)
             self.set_inventory(temp)
-            # TODO: Uh make this work
-            # try:
-            #     temp.id = self.palette[
-            #         self.get_palette_index(
-            #             self.get_index(
-            #                 temp.position))].name
-            # except Exception as e:
-            #     logging.error(f'Attempted to get data from uninitialized palette.\nException stacktrace:{e}')
             temp.id = '#UNKNOWN'
             self.tile_entities.append(temp)
+        self._resolve_tile_entity_ids()
+
+    def _resolve_tile_entity_ids(self):
+        """
+        Sets tile entity ids to the names of blocks at their positions, since litematics don't store them.
+        Positions are looked up together, without decoding the whole region.
+        """
+        if not self.tile_entities or self.palette is None:
+            return
+        size = abs(self.size)
+        positions = np.array([i.position for i in self.tile_entities], dtype=np.int64).reshape(-1, 3)
+        inside = ((positions >= 0) & (positions < size)).all(axis=1)
+        indices = self.get_index(positions[inside].T)
+        palette_ids = unpack_long_array_at(self.block_states, self._bit_span, indices)
+        names = [i.name for i in self.palette]
+        for te, palette_id in zip((i for i, v in zip(self.tile_entities, inside.tolist()) if v), palette_ids.tolist()):
+            if palette_id < len(names):
+                te.id = names[palette_id]
 
     def parse_entities(self):
         self.entities = []
@@ -68,6 +83,8 @@ class LitematicRegion(Region):
         :param index: Index of an entry in block_states.
         :return: Index of corresponding entry in the palette.
         """
+        if self.block_states is None:
+            return self.sections.get_block_at(index)
         start_offset = index * self._bit_span  # amount of bits to skip
         start_array = start_offset >> 6  # value it reads from
         start_bit_offset = start_offset & 0x3F  # offset in the selected value
@@ -79,8 +96,8 @@ class LitematicRegion(Region):
             else:
                 end_offset = 64 - start_bit_offset
                 end_array = start_array + 1
-                palette_id = (abs(self.block_states[start_array] >> start_bit_offset) | self.block_states[
-                    end_array] << end_offset) & self._shift
+                palette_id = (self.block_states[start_array] >> start_bit_offset & (1 << end_offset) - 1 |
+                              self.block_states[end_array] << end_offset) & self._shift
         except IndexError:
             raise BlockOutOfBounds(f'Attempted to access out of bounds block at index {index}')
 
@@ -98,6 +115,9 @@ class LitematicRegion(Region):
             scan_range = range(self.volume)
         elif scan_range[0] < 0 < self.volume < scan_range[1]:
             raise BlockOutOfBounds(f'Provided range is out of bounds: {scan_range}')
+        if self.block_states is None:
+            yield from self.sections.get_block_array(scan_range).tolist()
+            return
 
         start_offset = scan_range[0] * self._bit_span
         start_array = start_offset >> 6
@@ -110,8 +130,8 @@ class LitematicRegion(Region):
             else:
                 end_offset = 64 - start_bit_offset
                 end_array = ((i + 1) * self._bit_span - 1) >> 6
-                out = (abs(self.block_states[start_array] >> start_bit_offset) | self.block_states[
-                    end_array] << end_offset) & self._shift
+                out = (self.block_states[start_array] >> start_bit_offset & (1 << end_offset) - 1 |
+                       self.block_states[end_array] << end_offset) & self._shift
 
                 start_array += 1
                 entry_end -= 64
@@ -122,22 +142,46 @@ class LitematicRegion(Region):
 
             yield out
 
-    def get_index(self, coords: list | tuple | Vec3d) -> int:
+    def get_block_array(self, scan_range: range = None) -> np.ndarray:
+        """
+        Decodes the region (or a part of it) at once with vectorized operations.
+        :param scan_range: Optional custom range. By default, equals to region volume.
+        :return: Flat array of palette indices, in the same order as block_iterator().
+        """
+        if self.block_states is None and self.sections is not None:
+            return self.sections.get_block_array(scan_range)
+        if scan_range is None:
+            return unpack_long_array(self.block_states, self._bit_span, self.volume)
+        if scan_range.start < 0 or scan_range.stop > self.volume or scan_range.step != 1:
+            raise BlockOutOfBounds(f'Provided range is out of bounds: {scan_range}')
+        return unpack_long_array(self.block_states, self._bit_span, len(scan_range), scan_range.start)
+
+    def set_block_array(self, indices: np.ndarray):
+        self.sections = None
+        self.spatial_indexes.clear()
+        self._bit_span = required_bits(len(self.palette))
+        self._shift = (1 << self._bit_span) - 1
+        self.block_states = pack_long_array(indices, self._bit_span)
+
+    def get_index(self, coords: list | tuple | Vec3d | np.ndarray) -> int | np.ndarray:
         """
         :param coords: XYZ values as list, tuple or Vec3d.
                        Values at index > 2 will be ignored.
+                       Also accepts a (3, N) array to get N indices at once.
         :return: Index of corresponding entry in block_states.
                 (Likely will be put as index param in the get_block_state)
         """
-        return (coords[1]) * self.size.x * self.size.y + (coords[2]) * self.size.x + (coords[0])
+        size = abs(self.size)
+        return (coords[1] * size.z + coords[2]) * size.x + coords[0]
 
     def get_coords(self, index: int) -> Vec3d:
         """
         :param index: Index of corresponding entry in block_states.
         :return: XYZ values as Vec3d.
         """
-        layer_size = self.size.x * self.size.z
-        return Vec3d(index % self.size.x, index // layer_size, index % layer_size // self.size.x)
+        size = abs(self.size)
+        layer_size = size.x * size.z
+        return Vec3d(index % size.x, index // layer_size, index % layer_size // size.x)
 
 
 class LitematicMetadata(Metadata):
@@ -190,22 +234,25 @@ class LitematicMetadata(Metadata):
 
 
 class Litematic(Structure):
+    region_tags = ('Regions',)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
     @classmethod
-    def from_nbt(cls, nbt: dict, init: bool = True) -> 'Litematic':
+    def from_nbt(cls, nbt: dict, init: bool = True, progress: Progress = None) -> 'Litematic':
         """
         Initialize a structure from a NBT dict.
         :param nbt: Dict of NBT data.
         :param init: Tells region parser whether to parse the regions completely.
         (Set to False if you have a big file and don't want to parse all of it)
+        :param progress: Advanced for each entry of Regions during the 'parse' stage.
         :return: Structure object.
         """
         temp = cls()
         temp.raw_nbt = nbt
         temp.parse_metadata(nbt['Metadata'])
-        temp.parse_regions(nbt['Regions'], init)
+        temp.parse_regions(nbt['Regions'], init, progress)
         return temp
 
     def parse_metadata(self, metadata_nbt):
@@ -213,5 +260,11 @@ class Litematic(Structure):
         self.metadata.version = self.raw_nbt.get('Version', None)
         self.metadata.data_version = self.raw_nbt.get('MinecraftDataVersion', None)
 
-    def parse_regions(self, regions_nbt, init: bool = True):
-        self.regions = {i: LitematicRegion.from_nbt(v, init) for i, v in regions_nbt.items()}
+    def parse_regions(self, regions_nbt, init: bool = True, progress: Progress = None):
+        if progress is not None:
+            progress.start('parse', len(regions_nbt))
+        self.regions = {}
+        for i, v in regions_nbt.items():
+            self.regions[i] = LitematicRegion.from_nbt(v, init, progress)
+            if progress is not None:
+                progress.advance()
@@ -3,6 +3,9 @@ from litematica_tools.errors import BlockOutOfBounds
 
 
 class NbtRegion(Region):
+    # Blocks are read from the list on every access and carry tile entity NBT, so they are never dropped
+    parsed_tags = {'palette': 'palette', 'entities': 'entities'}
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -23,7 +26,8 @@ class NbtRegion(Region):
             temp = TileEntity()
             temp.nbt = i['nbt']
             temp.position = Vec3d.from_list(i['pos'])
-            temp.id = '#UNKNOWN'
+            # Blocks with tile entities carry their palette index directly
+            temp.id = self.palette[i['state']].name
             self.set_inventory(temp)
             self.tile_entities.append(temp)
 
@@ -49,6 +53,49 @@ class NbtRegion(Region):
         for i in scan_range:
             yield self.get_palette_index(i)
 
+    @property
+    def block_array_size(self) -> int:
+        return len(self.region_nbt['blocks'])
+
+    def get_block_array(self, scan_range: range = None) -> np.ndarray:
+        """
+        .nbt files list blocks explicitly and skip structure voids,
+        so the array follows the order of the blocks list instead of coordinates.
+        """
+        blocks = self.region_nbt['blocks']
+        if scan_range is not None:
+            blocks = blocks[scan_range.start:scan_range.stop:scan_range.step]
+        return np.fromiter((i['state'] for i in blocks), dtype=np.uint32)
+
+    def get_block_volume(self, fill: int = 0) -> np.ndarray:
+        size = abs(self.size)
+        blocks = self.region_nbt['blocks']
+        positions = np.array([i['pos'] for i in blocks], dtype=np.int64).reshape(-1, 3)
+        out = np.full((size.y, size.z, size.x), fill, np.uint32)
+        out[positions[:, 1], positions[:, 2], positions[:, 0]] = self.get_block_array()
+        return out
+
+    def get_block_layers(self, y0: int, y1: int, fill: int = 0) -> np.ndarray:
+        # Blocks aren't stored by layer, structure block templates are small enough to scatter whole
+        return self.get_block_volume(fill)[y0:y1]
+
+    def build_sections(self, release: bool = False) -> SectionedBlocks:
+        """
+        Scatters the listed blocks to their positions and splits them into sections.
+        Positions missing from the list are marked with an index past the palette (see SectionedBlocks.void),
+        so they are never counted.
+        :param release: Ignored, the blocks list also holds tile entity NBT and is always kept.
+        """
+        void = len(self.palette)
+        self.sections = SectionedBlocks.from_array(self.get_block_volume(void), void=void)
+        return self.sections
+
+    def set_block_array(self, indices: np.ndarray):
+        self.sections = None
+        self.spatial_indexes.clear()
+        for i, v in zip(self.region_nbt['blocks'], indices.tolist()):
+            i['state'] = type(i['state'])(v)
+
 
 class NbtMetadata(Metadata):
     def __post_init__(self, *args, **kwargs):
@@ -64,27 +111,35 @@ class NbtMetadata(Metadata):
 
 
 class Nbt(Structure):
+    # The structure itself is the only region
+    region_tags = tuple(NbtRegion.parsed_tags)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
     @classmethod
-    def from_nbt(cls, nbt: dict, init: bool = True) -> 'Structure':
+    def from_nbt(cls, nbt: dict, init: bool = True, progress: Progress = None) -> 'Structure':
         """
         Initialize a structure from a NBT dict.
         :param nbt: Dict of NBT data.
         :param init: Tells region parser whether to parse the regions completely.
         (Set to False if you have a big file and don't want to parse all of it)
+        :param progress: Gets a 'parse' stage of one unit, the whole template.
         :return: Structure object.
         """
         temp = cls()
         temp.raw_nbt = nbt
         temp.parse_metadata(nbt)
-        temp.parse_regions(nbt, init)
+        temp.parse_regions(nbt, init, progress)
         return temp
 
     def parse_metadata(self, nbt):
         self.metadata = NbtMetadata.from_nbt(nbt)
         self.metadata.name = self.name
 
-    def parse_regions(self, nbt, init: bool = True):
-        self.regions = {self.name: NbtRegion.from_nbt(nbt, init)}
+    def parse_regions(self, nbt, init: bool = True, progress: Progress = None):
+        if progress is not None:
+            progress.start('parse', 1)
+        self.regions = {self.name: NbtRegion.from_nbt(nbt, init, progress)}
+        if progress is not None:
+            progress.advance()
@@ -1,8 +1,12 @@
 from litematica_tools.storage.shared_storage import *
+from litematica_tools.storage.bit_array import decode_varint_array
 from litematica_tools.errors import BlockOutOfBounds
 
 
 class SchemRegion(Region):
+    parsed_tags = {'Palette': 'palette', 'BlockData': 'block_states', 'BlockEntities': 'tile_entities',
+                   'Entities': 'entities'}
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -12,7 +16,7 @@ class SchemRegion(Region):
 
     def parse_block_data(self):
         self.palette = self._parse_palette()
-        self.block_states = self.region_nbt['BlockData']
+        self.block_states = decode_varint_array(self.region_nbt['BlockData'])
 
     def _parse_palette(self):
         def property_yoink(item: str):
@@ -53,6 +57,8 @@ class SchemRegion(Region):
             self.entities.append(temp)
 
     def get_palette_index(self, index: int) -> int:
+        if self.block_states is None:
+            return self.sections.get_block_at(index)
         return self.block_states[index]
 
     def block_iterator(self, scan_range: range = None) -> int:
@@ -60,10 +66,25 @@ class SchemRegion(Region):
             scan_range = range(self.volume)
         elif scan_range[0] < 0 < self.volume < scan_range[1]:
             raise BlockOutOfBounds(f'Provided range is out of bounds: {scan_range}')
+        if self.block_states is None:
+            yield from self.sections.get_block_array(scan_range).tolist()
+            return
 
         for i in scan_range:
             yield self.block_states[i]
 
+    def get_block_array(self, scan_range: range = None) -> np.ndarray:
+        if self.block_states is None and self.sections is not None:
+            return self.sections.get_block_array(scan_range)
+        if scan_range is None:
+            return self.block_states
+        return self.block_states[scan_range.start:scan_range.stop:scan_range.step]
+
+    def set_block_array(self, indices: np.ndarray):
+        self.sections = None
+        self.spatial_indexes.clear()
+        self.block_states = indices
+
 
 class SchemMetadata(Metadata):
     def __post_init__(self, *args, **kwargs):
@@ -79,27 +100,35 @@ class SchemMetadata(Metadata):
 
 
 class Schem(Structure):
+    # The schematic itself is the only region
+    region_tags = tuple(SchemRegion.parsed_tags)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
     @classmethod
-    def from_nbt(cls, nbt: dict, init: bool = True) -> 'Structure':
+    def from_nbt(cls, nbt: dict, init: bool = True, progress: Progress = None) -> 'Structure':
         """
         Initialize a structure from a NBT dict.
         :param nbt: Dict of NBT data.
         :param init: Tells region parser whether to parse the regions completely.
         (Set to False if you have a big file and don't want to parse all of it)
+        :param progress: Gets a 'parse' stage of one unit, the schematic being a single region.
         :return: Structure object.
         """
         temp = cls()
         temp.raw_nbt = nbt
         temp.parse_metadata(nbt)
-        temp.parse_regions(nbt, init)
+        temp.parse_regions(nbt, init, progress)
         return temp
 
     def parse_metadata(self, nbt):
         self.metadata = SchemMetadata.from_nbt(nbt)
         self.metadata.name = self.name
 
-    def parse_regions(self, nbt, init: bool = True):
-        self.regions = {self.name: SchemRegion.from_nbt(nbt, init)}
+    def parse_regions(self, nbt, init: bool = True, progress: Progress = None):
+        if progress is not None:
+            progress.start('parse', 1)
+        self.regions = {self.name: SchemRegion.from_nbt(nbt, init, progress)}
+        if progress is not None:
+            progress.advance()
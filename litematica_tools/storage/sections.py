@@ -0,0 +1,225 @@
+import numpy as np
+
+SECTION_SIZE = 16
+
+
+class SectionedBlocks:
+    """
+    Region block data split into cubic sections (16x16x16 by default).
+
+    Sections where every block uses the same palette entry are stored as that single index,
+    the rest keep a dense array of palette indices. Counting and box queries handle uniform sections
+    in O(1), so mostly empty regions cost about as much as the blocks actually placed in them.
+
+    Structure:
+    - size: tuple (x, y, z block size of the region)
+    - uniform: np.ndarray (palette index of each section, shaped as y, z, x; -1 for mixed sections)
+    - mixed: dict ((y, z, x) section -> np.ndarray of palette indices, shaped as y, z, x)
+    """
+
+    def __init__(self, size: tuple, section_size: int = SECTION_SIZE, void: int = None):
+        """
+        :param void: Index past the palette marking positions without a block (structure voids of .nbt regions).
+        Such positions are never counted or pasted.
+        """
+        self.size = tuple(size)
+        self.section_size = section_size
+        self.void = void
+        x, y, z = self.size
+        self.uniform = np.full((-(-y // section_size), -(-z // section_size), -(-x // section_size)), -1, np.int64)
+        self.mixed: dict[tuple[int, int, int], np.ndarray] = {}
+
+    @classmethod
+    def from_region(cls, region, section_size: int = SECTION_SIZE) -> 'SectionedBlocks':
+        """
+        Builds sections from a region with coordinate ordered block data (litematic, schem),
+        decoding one layer of sections at a time.
+        """
+        size = abs(region.size)
+        temp = cls(size, section_size)
+        layer = size.x * size.z
+        for sy in range(temp.uniform.shape[0]):
+            y0 = sy * section_size
+            y1 = min(y0 + section_size, size.y)
+            temp._set_layer(sy, region.get_block_array(range(y0 * layer, y1 * layer)).reshape(y1 - y0, size.z, size.x))
+        return temp
+
+    @classmethod
+    def from_array(cls, blocks: np.ndarray, section_size: int = SECTION_SIZE, void: int = None) -> 'SectionedBlocks':
+        """
+        Builds sections from palette indices shaped as y, z, x.
+        """
+        temp = cls((blocks.shape[2], blocks.shape[0], blocks.shape[1]), section_size, void)
+        for sy in range(temp.uniform.shape[0]):
+            temp._set_layer(sy, blocks[sy * section_size:(sy + 1) * section_size])
+        return temp
+
+    def _set_layer(self, sy: int, slab: np.ndarray):
+        """
+        Stores one layer of sections from its blocks, shaped as y, z, x.
+        """
+        section_size = self.section_size
+        if not slab.any():
+            self.uniform[sy] = 0
+            return
+
+        # Edge padding repeats existing values, so it never makes a section mixed
+        pad = (0, -slab.shape[1] % section_size), (0, -slab.shape[2] % section_size)
+        padded = np.pad(slab, ((0, 0),) + pad, mode='edge')
+        blocks = padded.reshape(slab.shape[0], self.uniform.shape[1], section_size, self.uniform.shape[2], section_size)
+        blocks = blocks.transpose(1, 3, 0, 2, 4).reshape(self.uniform.shape[1], self.uniform.shape[2], -1)
+        low = blocks.min(axis=2)
+        is_uniform = low == blocks.max(axis=2)
+        self.uniform[sy] = np.where(is_uniform, low.astype(np.int64), -1)
+
+        for sz, sx in zip(*np.nonzero(~is_uniform)):
+            z0, x0 = sz * section_size, sx * section_size
+            self.mixed[(sy, int(sz), int(sx))] = slab[:, z0:z0 + section_size, x0:x0 + section_size].copy()
+
+    def _section_slices(self, section: tuple[int, int, int]) -> tuple[slice, slice, slice]:
+        return tuple(slice(i * self.section_size, (i + 1) * self.section_size) for i in section)
+
+    def _section_volumes(self) -> np.ndarray:
+        x, y, z = self.size
+        edges = [np.minimum(self.section_size, length - np.arange(count) * self.section_size)
+                 for length, count in zip((y, z, x), self.uniform.shape)]
+        return edges[0][:, None, None] * edges[1][None, :, None] * edges[2][None, None, :]
+
+    @property
+    def dtype(self) -> np.dtype:
+        return next(iter(self.mixed.values())).dtype if self.mixed else np.dtype(np.uint32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.uniform.nbytes + sum(i.nbytes for i in self.mixed.values())
+
+    def histogram(self, minlength: int = 0) -> np.ndarray:
+        """
+        :return: Amount of blocks using each palette entry.
+        """
+        uniform = self.uniform >= 0
+        out = np.bincount(self.uniform[uniform], weights=self._section_volumes()[uniform],
+                          minlength=minlength).astype(np.int64)
+        for i in self.mixed.values():
+            counts = np.bincount(i.ravel(), minlength=len(out))
+            if len(counts) > len(out):
+                out = np.pad(out, (0, len(counts) - len(out)))
+            out += counts
+        return out if self.void is None else out[:self.void]
+
+    def count_box(self, low: tuple, high: tuple, minlength: int = 0) -> np.ndarray:
+        """
+        :param low: Minimum XYZ block corner, relative to the region.
+        :param high: Maximum XYZ block corner (inclusive).
+        :return: Amount of blocks using each palette entry inside the box.
+        """
+        # Work in y, z, x order and clip to the region
+        low = np.maximum([low[1], low[2], low[0]], 0)
+        high = np.minimum([high[1], high[2], high[0]], np.array(self.size)[[1, 2, 0]] - 1) + 1
+        out = np.zeros(minlength, np.int64)
+        if (high <= low).any():
+            return out
+
+        first = low // self.section_size
+        last = (high - 1) // self.section_size
+        for section in np.ndindex(*(last - first + 1)):
+            section = tuple(int(i) for i in np.add(section, first))
+            start = np.array(section) * self.section_size
+            lo = np.maximum(low, start) - start
+            hi = np.minimum(high, start + self.section_size) - start
+            palette_id = self.uniform[section]
+            if palette_id >= 0:
+                counts = np.bincount([palette_id], weights=[np.prod(hi - lo)]).astype(np.int64)
+            else:
+                block = self.mixed[section][lo[0]:hi[0], lo[1]:hi[1], lo[2]:hi[2]]
+                counts = np.bincount(block.ravel())
+            if len(counts) > len(out):
+                out = np.pad(out, (0, len(counts) - len(out)))
+            out[:len(counts)] += counts
+        return out if self.void is None else out[:self.void]
+
+    def get_block(self, x: int, y: int, z: int) -> int:
+        """
+        :return: Palette index at the position, void for positions without a block.
+        """
+        section = (y // self.section_size, z // self.section_size, x // self.section_size)
+        palette_id = self.uniform[section]
+        if palette_id >= 0:
+            return int(palette_id)
+        return int(self.mixed[section][y % self.section_size, z % self.section_size, x % self.section_size])
+
+    def get_block_at(self, index: int) -> int:
+        """
+        :param index: Flat index in y, z, x order, as used by get_block_array().
+        """
+        x, _, z = self.size
+        return self.get_block(index % x, index // (x * z), index // x % z)
+
+    def paste(self, target: np.ndarray, remap: np.ndarray = None, skip: int = 0):
+        """
+        Writes blocks into a (y, z, x) array of the region's size, leaving cells of the skipped entry
+        and voids untouched. Uniform sections of the skipped entry cost nothing.
+
+        :param remap: Optional lookup array translating palette indices.
+        :param skip: Palette index (after remapping) that is not written.
+        """
+        for section in zip(*np.nonzero(self.uniform >= 0)):
+            palette_id = self.uniform[section]
+            if palette_id == self.void:
+                continue
+            if remap is not None:
+                palette_id = remap[palette_id]
+            if palette_id != skip:
+                target[self._section_slices(section)] = palette_id
+        for section, block in self.mixed.items():
+            placed = None
+            if self.void is not None:
+                placed = block != self.void
+                block = np.where(placed, block, 0)
+            if remap is not None:
+                block = remap[block]
+            placed = block != skip if placed is None else placed & (block != skip)
+            target[self._section_slices(section)][placed] = block[placed]
+
+    def _dense_rows(self, y0: int, y1: int) -> np.ndarray:
+        """
+        :return: Palette indices of block rows y0 to y1 (exclusive), shaped as y, z, x.
+        Only the sections overlapping these rows are read.
+        """
+        x, _, z = self.size
+        section_size = self.section_size
+        dtype = self.dtype
+        out = np.empty((y1 - y0, z, x), dtype)
+        for sy in range(y0 // section_size, (y1 - 1) // section_size + 1):
+            start = sy * section_size
+            rows = slice(max(y0, start) - y0, min(y1, start + section_size) - y0)
+            local = slice(max(y0, start) - start, min(y1, start + section_size) - start)
+            layer = self.uniform[sy]
+            filled = np.repeat(np.repeat(np.maximum(layer, 0), section_size, 0), section_size, 1)[:z, :x]
+            out[rows] = filled.astype(dtype)
+            for sz, sx in zip(*np.nonzero(layer < 0)):
+                z0, x0 = sz * section_size, sx * section_size
+                out[rows, z0:z0 + section_size, x0:x0 + section_size] = self.mixed[(sy, int(sz), int(sx))][local]
+        return out
+
+    def to_dense(self) -> np.ndarray:
+        """
+        :return: All palette indices, shaped as y, z, x.
+        """
+        return self._dense_rows(0, self.size[1])
+
+    def get_block_array(self, scan_range: range = None) -> np.ndarray:
+        """
+        :param scan_range: Optional range of flat indices in y, z, x order, with a positive step.
+        Only the layers it covers are decoded.
+        :return: Flat array of palette indices.
+        """
+        if scan_range is None:
+            return self.to_dense().ravel()
+        if not scan_range:
+            return np.empty(0, self.dtype)
+        layer = self.size[0] * self.size[2]
+        y0 = scan_range.start // layer
+        offset = y0 * layer
+        rows = self._dense_rows(y0, scan_range[-1] // layer + 1).ravel()
+        return rows[scan_range.start - offset:scan_range.stop - offset:scan_range.step]
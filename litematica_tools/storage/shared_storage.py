@@ -1,13 +1,80 @@
+import io
 import os.path
 import re
+import threading
 from abc import ABC, abstractmethod
 from collections import namedtuple
 from dataclasses import dataclass, field
-from typing import ClassVar, Type, Iterable
+from typing import BinaryIO, ClassVar, Type, Iterable
 
+import numpy as np
 from nbtlib import File
 
 from litematica_tools.config import CONFIG
+from litematica_tools.progress import Progress, ProgressReader, COUNT_CHUNK_SIZE
+from litematica_tools.storage.bit_array import compact_indices
+from litematica_tools.storage.decompression import DecompressionStats, decompress, open_inflated
+from litematica_tools.storage.sections import SectionedBlocks
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class _PrefixedReader(io.RawIOBase):
+    """
+    Raw stream that returns already consumed bytes before the rest of the wrapped stream.
+    """
+
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._prefix:
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def load_nbt(source: bytes | bytearray | memoryview | BinaryIO, unpack=True,
+             stats: DecompressionStats = None, progress: Progress = None) -> dict:
+    """
+    Parse NBT data from a buffer or a binary stream. Gzipped and raw data are both accepted.
+    Inflating uses the fastest installed zlib compatible backend, see storage.decompression.
+    :param source: Buffer with the file contents or a readable binary file-like object.
+    :param unpack: Convert nbtlib tags to python objects.
+    :param stats: Optional object receiving decompression sizes and time.
+    :param progress: Counts compressed bytes read as the 'load' stage. Cancelling it aborts the read.
+    :return: Root NBT compound.
+    """
+    if progress is not None:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        source = io.BufferedReader(ProgressReader(source, progress))
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if source[:2] == GZIP_MAGIC:
+            # Inflates straight from the caller's buffer without copying it first
+            source = decompress(source, stats)
+        fileobj = io.BytesIO(source)
+    else:
+        if hasattr(source, 'peek'):
+            magic = source.peek(2)[:2]
+        elif hasattr(source, 'seekable') and source.seekable():
+            magic = source.read(2)
+            source.seek(-len(magic), io.SEEK_CUR)
+        else:
+            magic = source.read(2)
+            source = io.BufferedReader(_PrefixedReader(magic, source))
+        fileobj = open_inflated(source, stats) if magic == GZIP_MAGIC else source
+
+    nbt = File.parse(fileobj)
+    return nbt.unpack() if unpack else nbt
 
 
 class Vec3d(namedtuple('Vec3d', ['x', 'y', 'z'])):
@@ -31,6 +98,9 @@ class Vec3d(namedtuple('Vec3d', ['x', 'y', 'z'])):
     def __iadd__(self, other):
         return self._add(other)
 
+    def __sub__(self, other):
+        return Vec3d(self.x - other[0], self.y - other[1], self.z - other[2])
+
     def __abs__(self):
         return Vec3d(abs(self.x), abs(self.y), abs(self.z))
 
@@ -76,25 +146,27 @@ class Item:
     name: str
     stack_size: int = field(default=64)
     _all_items: ClassVar[dict] = field(default={}, init=False)
+    # Guards registry writes, so threads looking up a new name at once all get the same Item
+    _lock: ClassVar[threading.Lock] = threading.Lock()
 
     @staticmethod
-    def _generate_item(name: str):
+    def _generate_item(name: str) -> 'Item':
         stack = 64
         if name in CONFIG.qstackables:
             stack = 16
         elif name in CONFIG.unstackables:
             stack = 1
-        item = Item(name, stack)
-        Item._all_items.update({name: item})
+        with Item._lock:
+            return Item._all_items.setdefault(name, Item(name, stack))
 
     def __class_getitem__(cls, name: str):
         if name == '*':
             return cls._all_items
-        elif name in cls._all_items:
-            return cls._all_items[name]
+        item = cls._all_items.get(name)
+        if item is not None:
+            return item
         elif re.search(r'\w+:\w+', name) and not re.search(r'[A-Z]', name):
-            Item._generate_item(name)
-            return cls._all_items[name]
+            return Item._generate_item(name)
         else:
             raise KeyError(f'Invalid item name: {name}')
 
@@ -134,15 +206,26 @@ class Region(ABC):
     position: Vec3d = field(default=None)
     size: Vec3d = field(default=None)
     volume: int = field(default=None)
+    unused_palette: list = field(default=None)
+    sections: SectionedBlocks = field(default=None)
+    # SpatialIndex.of() results, cleared when block data or entities change
+    spatial_indexes: dict = field(default_factory=dict, repr=False, compare=False)
+
+    # Region NBT tags turned into attributes by parsing (tag -> attribute), see release_nbt()
+    parsed_tags = {}
+    # Palette entries compact_palette() keeps in place even when unused
+    pinned_palette = ()
 
     @classmethod
-    def from_nbt(cls, region_nbt: dict, init=True) -> 'Region':
+    def from_nbt(cls, region_nbt: dict, init=True, progress: Progress = None) -> 'Region':
         temp = cls()
         temp.region_nbt = region_nbt
 
         if init:
             temp.parse_metadata()
             temp.parse_block_data()
+            if progress is not None:
+                progress.check()
             temp.parse_tile_entities()
             temp.parse_entities()
 
@@ -164,6 +247,18 @@ class Region(ABC):
     def parse_entities(self):
         pass
 
+    def parse_missing(self):
+        """
+        Parses whatever a region loaded with init=False doesn't have yet.
+        """
+        if self.palette is None:
+            self.parse_metadata()
+            self.parse_block_data()
+        if self.tile_entities is None:
+            self.parse_tile_entities()
+        if self.entities is None:
+            self.parse_entities()
+
     @abstractmethod
     def get_palette_index(self, index: int) -> int:
         pass
@@ -172,6 +267,136 @@ class Region(ABC):
     def block_iterator(self, scan_range: range = None) -> Iterable[int]:
         pass
 
+    @property
+    def block_array_size(self) -> int:
+        """
+        Length of get_block_array() for the whole region.
+        """
+        return self.volume
+
+    def get_block_array(self, scan_range: range = None) -> np.ndarray:
+        """
+        :param scan_range: Optional custom range. By default, equals to region volume.
+        :return: Flat array of palette indices, in block_iterator() order.
+        """
+        if scan_range is None:
+            scan_range = range(self.volume)
+        return np.fromiter(self.block_iterator(scan_range), dtype=np.uint32, count=len(scan_range))
+
+    def get_bounds(self) -> tuple[Vec3d, Vec3d]:
+        """
+        :return: Minimum and maximum corners of the region, inclusive. Litematic sizes can be negative.
+        """
+        position = self.position or Vec3d(0, 0, 0)
+        end = Vec3d(*(p + s - 1 if s > 0 else p + s + 1 for p, s in zip(position, self.size)))
+        return Vec3d(*map(min, position, end)), Vec3d(*map(max, position, end))
+
+    def get_block_histogram(self, scan_range: range = None, chunk_size: int = None,
+                            progress: Progress = None) -> np.ndarray:
+        """
+        :param scan_range: Optional custom range. By default, equals to region volume.
+        :param chunk_size: Decode at most this many blocks at once, limiting memory use on big regions.
+        :param progress: Advanced after each chunk. Chunks default to COUNT_CHUNK_SIZE blocks when it's given.
+        :return: Amount of blocks using each palette entry.
+        """
+        if scan_range is None and self.sections is not None:
+            out = self.sections.histogram(len(self.palette))
+            if progress is not None:
+                progress.advance(self.block_array_size)
+            return out
+        if progress is not None and chunk_size is None:
+            chunk_size = COUNT_CHUNK_SIZE
+        if chunk_size is None:
+            return np.bincount(self.get_block_array(scan_range), minlength=len(self.palette))
+
+        if scan_range is None:
+            scan_range = range(self.block_array_size)
+        out = np.zeros(len(self.palette), np.int64)
+        for start in range(scan_range.start, scan_range.stop, chunk_size):
+            chunk = range(start, min(start + chunk_size, scan_range.stop))
+            out += np.bincount(self.get_block_array(chunk), minlength=len(self.palette))[:len(out)]
+            if progress is not None:
+                progress.advance(len(chunk))
+        return out
+
+    def get_box_histogram(self, low: tuple, high: tuple) -> np.ndarray:
+        """
+        :param low: Minimum XYZ block corner, relative to the region.
+        :param high: Maximum XYZ block corner (inclusive).
+        :return: Amount of blocks inside the box using each palette entry.
+        """
+        if self.sections is None:
+            self.build_sections()
+        return self.sections.count_box(low, high, len(self.palette))
+
+    def build_sections(self, release: bool = False) -> SectionedBlocks:
+        """
+        Splits block data into 16x16x16 sections, storing sections filled with a single block as one index.
+        Histograms and box queries use the sections afterwards.
+        :param release: Drop packed block data (also from the region NBT), keeping only the sections.
+        Saves memory for mostly empty regions, block access then goes through the sections.
+        :return: Created sections, also stored in sections.
+        """
+        self.sections = SectionedBlocks.from_region(self)
+        if release:
+            self.block_states = None
+            # The NBT tag holds the same data, and raw_nbt shares the region NBT
+            for k, v in self.parsed_tags.items():
+                if v == 'block_states' and self.region_nbt is not None:
+                    self.region_nbt.pop(k, None)
+        return self.sections
+
+    def get_block_volume(self, fill: int = 0) -> np.ndarray:
+        """
+        :param fill: Palette index of positions without a block (structure voids of .nbt regions).
+        :return: Palette indices of the whole region, shaped as y, z, x.
+        """
+        size = abs(self.size)
+        return self.get_block_array().reshape(size.y, size.z, size.x)
+
+    def get_block_layers(self, y0: int, y1: int, fill: int = 0) -> np.ndarray:
+        """
+        Same as get_block_volume(), but only decodes the layers from y0 up to y1 (exclusive).
+        """
+        size = abs(self.size)
+        layer = size.x * size.z
+        return self.get_block_array(range(y0 * layer, y1 * layer)).reshape(y1 - y0, size.z, size.x)
+
+    def release_nbt(self):
+        """
+        Drops the region NBT tags that were parsed into attributes (see parsed_tags).
+        Tags that are never parsed, e.g. pending block ticks, are kept so writers can still copy them.
+        """
+        kept = {}
+        for k, v in self.region_nbt.items():
+            attribute = self.parsed_tags.get(k)
+            if attribute is None or getattr(self, attribute) is None:
+                kept[k] = v
+        self.region_nbt = kept
+        self.spatial_indexes.clear()
+
+    @abstractmethod
+    def set_block_array(self, indices: np.ndarray):
+        """
+        Replaces block data with new palette indices, encoding them in the region's format.
+        Implementations also drop sections and spatial_indexes built from the old data.
+        :param indices: Flat array in get_block_array() order.
+        """
+        pass
+
+    def compact_palette(self) -> list[BlockState]:
+        """
+        Removes palette entries that no block uses and remaps block data to the dense palette.
+        :return: Removed entries, also stored in unused_palette.
+        """
+        indices, kept = compact_indices(self.get_block_array(), len(self.palette), keep=self.pinned_palette)
+        kept_set = set(kept.tolist())
+        self.unused_palette = [v for i, v in enumerate(self.palette) if i not in kept_set]
+        if self.unused_palette:
+            self.palette = [self.palette[i] for i in kept]
+            self.set_block_array(indices)
+        return self.unused_palette
+
     @staticmethod
     def set_inventory(container: 'Container', nbt=None):
         # Passing custom nbt tag to start reading from
@@ -219,19 +444,76 @@ class Structure(ABC):
     regions: dict = field(default=None)
     raw_nbt: dict = field(default=None)
     name: str = field(default=None)
+    load_stats: DecompressionStats = field(default=None)
+
+    # Tags of raw_nbt holding region data, dropped by release_nbt()
+    region_tags = ()
 
     @classmethod
-    def from_file(cls, file_path: str, unpack=True, init=True) -> 'Structure':
+    def from_file(cls, file_path: str, unpack=True, init=True, compact=False, progress: Progress = None) -> 'Structure':
         with open(file_path, 'rb') as f:
-            nbt = File.load(f, gzipped=True).unpack() if unpack \
-                else File.load(f, gzipped=True)
-        temp = cls.from_nbt(nbt, init)
-        temp.name = os.path.basename(file_path)
+            return cls.from_fileobj(f, unpack, init, name=os.path.basename(file_path), compact=compact,
+                                    progress=progress)
+
+    @classmethod
+    def from_fileobj(cls, fileobj: BinaryIO, unpack=True, init=True, name: str = None,
+                     compact=False, progress: Progress = None) -> 'Structure':
+        """
+        Initialize a structure from an opened binary file-like object with NBT data.
+        The data is decompressed while reading, so non-seekable streams (sockets, uploads) work as well.
+        :param fileobj: Object with a read() method, positioned at the start of the data.
+        :param unpack: Convert nbtlib tags to python objects.
+        :param init: Tells region parser whether to parse the regions completely.
+        :param name: Name of the structure, used in place of a file name.
+        :param compact: Remove unused palette entries after parsing, see compact_palettes().
+        :param progress: Receives the 'load' and 'parse' stages.
+        :return: Structure object.
+        """
+        stats = DecompressionStats()
+        temp = cls.from_nbt(load_nbt(fileobj, unpack, stats, progress), init, progress)
+        temp.name = name
+        temp.load_stats = stats
+        if compact and init:
+            temp.compact_palettes()
         return temp
 
+    @classmethod
+    def from_bytes(cls, data: bytes | bytearray | memoryview, unpack=True, init=True, name: str = None,
+                   compact=False, progress: Progress = None) -> 'Structure':
+        """
+        Initialize a structure from an already read buffer of NBT data.
+        See from_fileobj() for parameters.
+        """
+        return cls.from_fileobj(data, unpack, init, name, compact, progress)
+
+    def compact_palettes(self) -> dict[str, list[BlockState]]:
+        """
+        Runs Region.compact_palette() on every region.
+        :return: Removed palette entries of each region.
+        """
+        return {i: v.compact_palette() for i, v in self.regions.items()}
+
+    def build_sections(self, release=False) -> dict[str, SectionedBlocks]:
+        """
+        Runs Region.build_sections() on every region.
+        """
+        return {i: v.build_sections(release) for i, v in self.regions.items()}
+
+    def release_nbt(self):
+        """
+        Drops region data from raw_nbt and the parsed tags of regions, see Region.release_nbt().
+        The remaining tags (e.g. litematic Metadata and Version) are small and kept for writers.
+        Unparsed regions (loaded with init=False) keep their NBT, as they still need it.
+        """
+        if self.raw_nbt is not None:
+            self.raw_nbt = {k: v for k, v in self.raw_nbt.items() if k not in self.region_tags}
+        for r in self.regions.values():
+            if r.palette is not None:
+                r.release_nbt()
+
     @classmethod
     @abstractmethod
-    def from_nbt(cls, nbt: dict, init=True) -> 'Structure':
+    def from_nbt(cls, nbt: dict, init=True, progress: Progress = None) -> 'Structure':
         pass
 
     @abstractmethod
@@ -245,5 +527,5 @@ class Structure(ABC):
         pass
 
     @abstractmethod
-    def parse_regions(self, nbt, init: bool = True):
+    def parse_regions(self, nbt, init: bool = True, progress: Progress = None):
         pass
@@ -1,16 +1,108 @@
 import os
-from litematica_tools.storage import Litematic, Schem, Nbt
+from typing import BinaryIO, Iterable, Type
+
+from litematica_tools.storage import Litematic, Schem, Nbt, Structure, load_nbt
+from litematica_tools.storage.decompression import DecompressionStats
 from litematica_tools.errors import FileException
+from litematica_tools.progress import Progress
+
+FILE_FORMATS: dict[str, Type[Structure]] = {
+    '.litematic': Litematic,
+    '.schem': Schem,
+    '.nbt': Nbt,
+}
+
+
+def get_structure_class(file_format: str) -> Type[Structure]:
+    """
+    :param file_format: File extension, with or without the leading dot.
+    :return: Structure class that parses the format.
+    """
+    if not file_format.startswith('.'):
+        file_format = '.' + file_format
+    if file_format not in FILE_FORMATS:
+        raise FileException(f'Provided not supported file format: {file_format}')
+    return FILE_FORMATS[file_format]
+
+
+def find_structure_files(paths: Iterable[str | os.PathLike]) -> list[str]:
+    """
+    :param paths: Files and directories, searched recursively for supported formats.
+    :return: Absolute paths of structure files.
+    """
+    out = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if not os.path.isdir(path):
+            out.append(path)
+            continue
+        for root, _, files in os.walk(path):
+            out.extend(os.path.join(root, i) for i in sorted(files) if os.path.splitext(i)[1] in FILE_FORMATS)
+    return out
+
+
+def detect_structure_class(nbt: dict) -> Type[Structure]:
+    """
+    Picks the structure class by the root NBT tags instead of the file name.
+    :param nbt: Root NBT compound.
+    :return: Structure class that parses the data.
+    """
+    if 'Regions' in nbt and 'Metadata' in nbt:
+        return Litematic
+    if 'Width' in nbt and 'Height' in nbt and 'Length' in nbt:
+        return Schem
+    if 'palette' in nbt and 'blocks' in nbt:
+        return Nbt
+    raise FileException(f'Unable to detect structure format from NBT tags: {", ".join(nbt.keys())}')
 
 
 class NBTFile:
-    def __new__(cls, file_path: str, unpack: bool = True, init: bool = True):
-        file_format = os.path.splitext(file_path)[1]
-        if file_format == '.litematic':
-            return Litematic.from_file(file_path, unpack, init)
-        elif file_format == '.schem':
-            return Schem.from_file(file_path, unpack, init)
-        elif file_format == '.nbt':
-            return Nbt.from_file(file_path, unpack, init)
+    def __new__(cls, file_path: str, unpack: bool = True, init: bool = True, compact: bool = False,
+                progress: Progress = None):
+        with open(file_path, 'rb') as f:
+            return cls.from_fileobj(f, unpack=unpack, init=init, name=os.path.basename(file_path), compact=compact,
+                                    progress=progress)
+
+    @staticmethod
+    def from_fileobj(fileobj: BinaryIO, *, file_format: str = None, unpack: bool = True, init: bool = True,
+                     name: str = None, compact: bool = False, progress: Progress = None) -> Structure:
+        """
+        Same as NBTFile(), but reads an opened binary file-like object. Non-seekable streams are supported.
+        Options are keyword-only, since file_format sits where Structure.from_fileobj() takes unpack.
+        :param file_format: Optional file extension to skip format detection.
+        :param progress: See Structure.from_fileobj().
+        """
+        stats = DecompressionStats()
+        nbt = load_nbt(fileobj, unpack, stats, progress)
+        temp = NBTFile.from_nbt(nbt, file_format=file_format, init=init, name=name, compact=compact,
+                                progress=progress)
+        temp.load_stats = stats
+        return temp
+
+    @staticmethod
+    def from_bytes(data: bytes | bytearray | memoryview, *, file_format: str = None, unpack: bool = True,
+                   init: bool = True, name: str = None, compact: bool = False,
+                   progress: Progress = None) -> Structure:
+        """
+        Same as NBTFile(), but reads an already read buffer.
+        :param file_format: Optional file extension to skip format detection.
+        """
+        return NBTFile.from_fileobj(data, file_format=file_format, unpack=unpack, init=init, name=name,
+                                    compact=compact, progress=progress)
+
+    @staticmethod
+    def from_nbt(nbt: dict, *, file_format: str = None, init: bool = True, name: str = None,
+                 compact: bool = False, progress: Progress = None) -> Structure:
+        """
+        Initialize a structure of the detected format from parsed NBT data.
+        :param compact: Remove unused palette entries, see Structure.compact_palettes().
+        """
+        if file_format is None:
+            structure_class = detect_structure_class(nbt)
         else:
-            raise FileException(f'Provided not supported file format: {file_format}')
+            structure_class = get_structure_class(file_format)
+        temp = structure_class.from_nbt(nbt, init, progress)
+        temp.name = name
+        if compact and init:
+            temp.compact_palettes()
+        return temp
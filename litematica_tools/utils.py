@@ -50,17 +50,19 @@ class ItemCounter(dict):
 
     @property
     def stacks(self) -> 'ItemCounter':
-        if self._stacks.keys() != self.keys():
-            for i, v in self.items():
-                self._stacks[i] = self.get_stacks(i, v)
-        return self._stacks
+        stacks = self._stacks
+        if stacks.keys() != self.keys():
+            stacks = {i: self.get_stacks(i, v) for i, v in list(self.items())}
+            self._stacks = stacks
+        return stacks
 
     @property
     def names(self) -> 'ItemCounter':
-        if self._names.keys() != self.keys():
-            for i, v in self.items():
-                self._names[i] = self.localise(i)
-        return self._names
+        names = self._names
+        if names.keys() != self.keys():
+            names = {i: self.localise(i) for i in list(self.keys())}
+            self._names = names
+        return names
 
     @staticmethod
     def get_stacks(item: str, count: int) -> tuple:
@@ -80,3 +82,26 @@ class ItemCounter(dict):
             return CONFIG.name_references[item]
         logging.warning(f'Localisation missing for {item}, attempting to parse from name.')
         return ' '.join([i.capitalize() for i in item.split('_')])
+
+
+class EstimatedItemCounter(ItemCounter):
+    """
+    ItemCounter with values extrapolated from a sample.
+
+    - intervals: dict (item -> (low, high) confidence interval of the total)
+    - confidence: float (confidence level of the intervals)
+    - sample_fraction: float (part of the blocks that was decoded)
+    """
+
+    def __init__(self, *args, **kw):
+        super(EstimatedItemCounter, self).__init__(*args, **kw)
+        self.intervals: dict[str, tuple[float, float]] = {}
+        self.confidence: float = None
+        self.sample_fraction: float = None
+
+    def sort(self, reverse=True) -> 'EstimatedItemCounter':
+        out = EstimatedItemCounter(super().sort(reverse))
+        out.intervals = self.intervals
+        out.confidence = self.confidence
+        out.sample_fraction = self.sample_fraction
+        return out
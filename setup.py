@@ -24,7 +24,12 @@ setup(
     python_requires=">=3.10",
     entry_points={},
     install_requires=[
-        "nbtlib"
+        "nbtlib",
+        "numpy"
     ],
+    extras_require={
+        # Faster gzip inflation, picked up automatically when installed
+        "fast": ["isal"]
+    },
     include_package_data=True
 )
@@ -0,0 +1,91 @@
+import io
+
+import numpy as np
+import pytest
+from nbtlib import Byte, Compound, Int, List, String
+
+from litematica_tools.converter import FlatStructure, to_litematic, save_schem, save_nbt
+from litematica_tools.litematic_writer import save_litematic
+from litematica_tools.storage import BlockState, TileEntity, Entity, Vec3d, Litematic, Schem, Nbt
+
+PALETTE = [
+    BlockState(name='minecraft:air'),
+    BlockState(name='minecraft:stone'),
+    BlockState(name='minecraft:chest', properties={'facing': 'north'}),
+    BlockState(name='minecraft:oak_planks'),
+    BlockState(name='minecraft:oak_stairs', properties={'facing': 'east'}),
+]
+CHEST = Vec3d(1, 2, 3)
+
+
+def _items(*stacks) -> List:
+    return List[Compound]([Compound({'Slot': Byte(i), 'id': String(k), 'Count': Byte(v)})
+                           for i, (k, v) in enumerate(stacks)])
+
+
+def make_flat(size: Vec3d = Vec3d(17, 20, 18), seed: int = 0) -> FlatStructure:
+    """
+    Volume crossing section borders on every axis: a stone floor, random planks and stairs above it,
+    air on top and a chest with items.
+    """
+    rng = np.random.default_rng(seed)
+    blocks = np.zeros((size.y, size.z, size.x), np.uint32)
+    blocks[:2] = 1
+    blocks[2:size.y // 2] = rng.choice([0, 3, 4], size=(size.y // 2 - 2, size.z, size.x), p=[0.6, 0.3, 0.1])
+    blocks[CHEST.y, CHEST.z, CHEST.x] = 2
+
+    chest = TileEntity()
+    chest.nbt = {'Items': _items(('minecraft:diamond', 5), ('minecraft:stone', 64))}
+    chest.position = CHEST
+    chest.id = 'minecraft:chest'
+    minecart = Entity()
+    minecart.nbt = {'Items': _items(('minecraft:oak_planks', 3))}
+    minecart.position = Vec3d(4.5, 3.0, 4.5)
+    minecart.id = 'minecraft:chest_minecart'
+    return FlatStructure(palette=list(PALETTE), blocks=blocks, tile_entities=[chest], entities=[minecart],
+                         name='test', author='tester', data_version=3465)
+
+
+def _saved(writer, flat: FlatStructure) -> bytes:
+    buf = io.BytesIO()
+    writer(flat, buf)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def flat() -> FlatStructure:
+    return make_flat()
+
+
+@pytest.fixture
+def litematic_bytes(flat) -> bytes:
+    structure = to_litematic(flat)
+    region = structure.regions['test']
+    region.region_nbt['PendingBlockTicks'] = [Compound({'Block': String('minecraft:stone'), 'Time': Int(1),
+                                                        'x': Int(0), 'y': Int(0), 'z': Int(0)})]
+    return _saved(lambda f, buf: save_litematic(structure, buf), flat)
+
+
+@pytest.fixture
+def litematic(litematic_bytes) -> Litematic:
+    return Litematic.from_bytes(litematic_bytes, name='test')
+
+
+@pytest.fixture
+def schem_bytes(flat) -> bytes:
+    return _saved(save_schem, flat)
+
+
+@pytest.fixture
+def schem(schem_bytes) -> Schem:
+    return Schem.from_bytes(schem_bytes, name='test')
+
+
+@pytest.fixture
+def nbt_bytes(flat) -> bytes:
+    return _saved(save_nbt, flat)
+
+
+@pytest.fixture
+def nbt_structure(nbt_bytes) -> Nbt:
+    return Nbt.from_bytes(nbt_bytes, name='test')
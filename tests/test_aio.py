@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import threading
+
+from litematica_tools.aio import AsyncLoader, AsyncMaterialList
+from litematica_tools.material_list import MaterialList
+from litematica_tools.storage import Litematic
+
+
+def test_job_outliving_its_loop(caplog):
+    started, finish = threading.Event(), threading.Event()
+    loader = AsyncLoader(max_concurrency=1)
+
+    def job():
+        started.set()
+        finish.wait(5)
+
+    async def main():
+        task = asyncio.create_task(loader.run(job))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        task.cancel()
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(main())
+        finish.set()
+        loader.shutdown(wait=True)
+    assert not caplog.records
+
+
+def test_concurrency_slots_are_released():
+    async def main():
+        async with AsyncLoader(max_concurrency=2) as loader:
+            return await asyncio.gather(*(loader.run(pow, i, 2) for i in range(8)))
+
+    assert asyncio.run(main()) == [i * i for i in range(8)]
+
+
+def test_loader_reused_across_loops():
+    loader = AsyncLoader(max_concurrency=1)
+
+    async def count():
+        # Two jobs for one slot, so the second one waits on the semaphore
+        return await asyncio.gather(*(loader.run(pow, i, 2) for i in range(2)))
+
+    try:
+        assert asyncio.run(count()) == asyncio.run(count()) == [0, 1]
+    finally:
+        loader.shutdown()
+
+
+def test_material_list_shuts_down_own_loader(litematic_bytes):
+    structure = Litematic.from_bytes(litematic_bytes)
+
+    async def main():
+        async with AsyncMaterialList(structure) as mat_list:
+            counts = await mat_list.block_count()
+        return mat_list, counts
+
+    mat_list, counts = asyncio.run(main())
+    assert counts == MaterialList(structure).block_count
+    assert mat_list.loader._executor is None
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from litematica_tools.storage import BlockState
+from litematica_tools.storage.bit_array import (required_bits, pack_long_array, unpack_long_array, unpack_long_array_at,
+                                                compact_indices, encode_varint_array, decode_varint_array)
+
+
+@pytest.mark.parametrize('palette_size', [1, 2, 5, 17, 300, 70000])
+def test_pack_roundtrip(palette_size):
+    bit_span = required_bits(palette_size)
+    assert bit_span >= 2 and 1 << bit_span >= palette_size
+    indices = np.random.default_rng(palette_size).integers(0, palette_size, 1000, dtype=np.uint32)
+    packed = pack_long_array(indices, bit_span)
+    assert packed.dtype == np.int64
+    assert len(packed) == -(-len(indices) * bit_span // 64)
+    assert np.array_equal(unpack_long_array(packed, bit_span, len(indices)), indices)
+    assert np.array_equal(unpack_long_array(packed, bit_span, 100, 450), indices[450:550])
+    picked = np.array([999, 0, 513, 64])
+    assert np.array_equal(unpack_long_array_at(packed, bit_span, picked), indices[picked])
+
+
+def test_entries_span_longs():
+    # 5 bit entries cross long boundaries every few values
+    indices = np.arange(32, dtype=np.uint32).repeat(4)
+    packed = pack_long_array(indices, 5)
+    assert np.array_equal(unpack_long_array(packed, 5, len(indices)), indices)
+
+
+def test_varint_roundtrip():
+    indices = np.array([0, 1, 127, 128, 300, 16383, 16384, 70000], dtype=np.uint32)
+    assert np.array_equal(decode_varint_array(encode_varint_array(indices)), indices)
+
+
+def test_compact_indices_keeps_order():
+    indices, kept = compact_indices(np.array([3, 3, 1, 5], dtype=np.uint32), 6, keep=(0,))
+    assert kept.tolist() == [0, 1, 3, 5]
+    assert indices.tolist() == [2, 2, 1, 3]
+
+
+def test_compact_palette_keeps_litematic_air(litematic, schem):
+    region = litematic.regions['test']
+    region.palette.append(BlockState(name='minecraft:dirt'))
+    # Air is left unused, but has to stay at index 0
+    region.set_block_array(np.full(region.volume, 3, np.uint32))
+    assert [i.name for i in region.compact_palette()] == ['minecraft:stone', 'minecraft:chest',
+                                                         'minecraft:oak_stairs', 'minecraft:dirt']
+    assert [i.name for i in region.palette] == ['minecraft:air', 'minecraft:oak_planks']
+    assert (region.get_block_array() == 1).all()
+
+    region = next(iter(schem.regions.values()))
+    region.set_block_array(np.full(region.volume, 3, np.uint32))
+    region.compact_palette()
+    assert [i.name for i in region.palette] == ['minecraft:oak_planks']
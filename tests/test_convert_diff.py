@@ -0,0 +1,72 @@
+import io
+
+import numpy as np
+
+from litematica_tools.converter import flatten, to_litematic, convert
+from litematica_tools.diff import material_delta
+from litematica_tools.material_list import MaterialList
+from litematica_tools.storage import Litematic, Schem, Nbt, BlockState
+from litematica_tools.storage.global_palette import GlobalPalette, block_key
+
+
+def _counts(structure) -> dict:
+    return MaterialList(structure).composite_list(blocks=True, items=True, entities=True)
+
+
+def test_block_key_ignores_property_order():
+    a = BlockState(name='minecraft:oak_stairs', properties={'facing': 'east', 'half': 'top'})
+    b = BlockState(name='minecraft:oak_stairs', properties={'half': 'top', 'facing': 'east'})
+    assert block_key(a) == block_key(b)
+    palette = GlobalPalette()
+    assert palette.remap([a, BlockState(name='minecraft:air'), b]).tolist() == [1, 0, 1]
+    assert len(palette) == 2
+
+
+def test_flatten_formats_agree(flat, litematic, schem, nbt_structure):
+    for structure in (litematic, schem, nbt_structure):
+        flattened = flatten(structure)
+        names = np.array([str(i.name) for i in flattened.palette])
+        assert np.array_equal(names[flattened.blocks], np.array([str(i.name) for i in flat.palette])[flat.blocks])
+        assert [i.id for i in flattened.tile_entities] == ['minecraft:chest']
+
+
+def test_convert_roundtrip(litematic):
+    expected = _counts(litematic)
+    for file_format, structure_class in (('litematic', Litematic), ('schem', Schem), ('nbt', Nbt)):
+        buf = io.BytesIO()
+        convert(litematic, buf, file_format)
+        assert _counts(structure_class.from_bytes(buf.getvalue(), name='test')) == expected, file_format
+
+
+def test_delta_of_complete_build(litematic, schem, nbt_structure):
+    for build in (litematic, schem, nbt_structure):
+        delta = material_delta(litematic, build)
+        assert delta.missing == 0 and delta.completion == 1.0
+        assert not delta.remaining and not delta.wrong
+
+
+def test_delta_of_partial_build(flat, litematic):
+    blocks = flat.blocks.copy()
+    stone = blocks == 1
+    blocks[0] = 0
+    # Stairs facing another way still count as placed unless properties are compared
+    flat.palette[4] = BlockState(name='minecraft:oak_stairs', properties={'facing': 'west'})
+    flat.blocks = blocks
+    build = to_litematic(flat)
+
+    delta = material_delta(litematic, build)
+    assert delta.missing == int(stone[0].sum())
+    assert delta.remaining == {'minecraft:stone': int(stone[0].sum())}
+    assert not delta.wrong
+
+    exact = material_delta(litematic, build, match_properties=True)
+    stairs = int((flat.blocks == 4).sum())
+    assert exact.missing == int(stone[0].sum()) + stairs
+    assert exact.wrong == {'minecraft:oak_stairs': stairs}
+
+
+def test_delta_offset(flat, litematic):
+    build = to_litematic(flat)
+    build.regions['test'].position = build.regions['test'].position - (0, 1, 0)
+    assert material_delta(litematic, build, offset=(0, 1, 0)).missing == 0
+    assert material_delta(litematic, build).missing > 0
@@ -0,0 +1,61 @@
+import gc
+import threading
+
+import numpy as np
+
+from litematica_tools.converter import FlatStructure, save_schem
+from litematica_tools.daemon import Daemon
+from litematica_tools.material_list import MaterialList
+from litematica_tools.storage import BlockState, Litematic
+
+
+def test_concurrent_requests(tmp_path, litematic_bytes):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'{i}.litematic'
+        path.write_bytes(litematic_bytes)
+        paths.append(str(path))
+    expected = dict(MaterialList(Litematic.from_bytes(litematic_bytes)).composite_list(
+        blocks=True, items=True, entities=False).sort())
+
+    daemon = Daemon(max_structures=2)
+    results, errors = [], []
+
+    def run(path):
+        try:
+            results.append(daemon.handle({'command': 'list', 'file': path, 'blocks': True, 'items': True}))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(p,)) for p in paths * 4]
+    for i in threads:
+        i.start()
+    for i in threads:
+        i.join()
+    assert not errors
+    assert all(i == expected for i in results) and len(results) == 12
+    stats = daemon.handle({'command': 'stats'})
+    assert stats['requests'] == 13 and stats['cached_structures'] == 2
+
+
+def test_interned_palettes(tmp_path, litematic_bytes):
+    for i in range(2):
+        (tmp_path / f'{i}.litematic').write_bytes(litematic_bytes)
+    daemon = Daemon()
+    first, second = (daemon.cache.get(str(tmp_path / f'{i}.litematic')).structure for i in range(2))
+    assert all(a is b for a, b in zip(first.regions['test'].palette, second.regions['test'].palette))
+    assert daemon.handle({'command': 'stats'})['interned_block_states'] == len(first.regions['test'].palette)
+
+
+def test_interned_palettes_follow_evictions(tmp_path, litematic_bytes):
+    (tmp_path / 'a.litematic').write_bytes(litematic_bytes)
+    dirt = FlatStructure(palette=[BlockState(name='minecraft:air'), BlockState(name='minecraft:dirt')],
+                         blocks=np.ones((2, 2, 2), np.uint32))
+    save_schem(dirt, str(tmp_path / 'b.schem'))
+
+    daemon = Daemon(max_structures=1)
+    daemon.cache.get(str(tmp_path / 'a.litematic'))
+    # Loading the schematic evicts the litematic, only air and dirt are still referenced
+    daemon.cache.get(str(tmp_path / 'b.schem'))
+    gc.collect()
+    assert daemon.handle({'command': 'stats'})['interned_block_states'] == 2
@@ -0,0 +1,47 @@
+import gzip
+import io
+import os
+
+import pytest
+
+from litematica_tools.storage.decompression import DecompressionStats, InflateReader, decompress, open_inflated
+
+DATA = os.urandom(1 << 12) * 64
+
+
+def _read(data: bytes, chunk_size: int, read_size: int = 1000) -> bytes:
+    reader = InflateReader(io.BytesIO(data), chunk_size=chunk_size)
+    out = bytearray()
+    while chunk := reader.read(read_size):
+        out += chunk
+    return bytes(out)
+
+
+@pytest.mark.parametrize('chunk_size', [7, 1 << 10, 1 << 18])
+def test_chunked_reads(chunk_size):
+    compressed = gzip.compress(DATA)
+    assert _read(compressed, chunk_size) == DATA
+    stats = DecompressionStats()
+    with open_inflated(io.BytesIO(compressed), stats, chunk_size) as f:
+        assert f.read() == DATA
+    assert (stats.compressed, stats.decompressed) == (len(compressed), len(DATA))
+
+
+@pytest.mark.parametrize('chunk_size', [7, 1 << 18])
+def test_multiple_members(chunk_size):
+    compressed = gzip.compress(DATA[:1000]) + gzip.compress(DATA[1000:]) + b'\x00' * 16
+    assert _read(compressed, chunk_size) == DATA
+    assert decompress(compressed) == DATA
+    stats = DecompressionStats()
+    decompress(compressed, stats)
+    assert stats.decompressed == len(DATA)
+
+
+# Cut inside the header, inside the first member and inside the trailer of the second one
+@pytest.mark.parametrize('cut', [5, 100, -3])
+def test_truncated(cut):
+    truncated = (gzip.compress(DATA[:1000]) + gzip.compress(DATA[1000:]))[:cut]
+    with pytest.raises(EOFError):
+        _read(truncated, 1 << 10)
+    with pytest.raises(EOFError):
+        decompress(truncated)
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+
+import numpy as np
+import pytest
+
+from litematica_tools.export import ListWriter, get_writer
+
+LISTS = {'a.litematic': {'minecraft:stone': 70, 'minecraft:chest': 1}, 'b.schem': {}, 'c.nbt': {'minecraft:dirt': 2}}
+
+
+def _written(formatting: str, lists: dict, multiple: bool) -> str:
+    stream = io.StringIO()
+    with get_writer(formatting, stream, multiple) as writer:
+        for source, mat_list in lists.items():
+            writer.write(mat_list, source)
+    return stream.getvalue()
+
+
+def test_list_writer_is_abstract():
+    with pytest.raises(TypeError):
+        ListWriter(io.StringIO())
+
+
+def test_json_single_matches_dumps():
+    mat_list = LISTS['a.litematic']
+    assert _written('json', {'a.litematic': mat_list}, False) == json.dumps(mat_list, indent=4) + '\n'
+    assert _written('json', {'b.schem': {}}, False) == '{}\n'
+
+
+def test_json_multiple_is_one_document():
+    out = _written('json', LISTS, True)
+    assert json.loads(out) == LISTS
+    assert out == json.dumps(LISTS, indent=4) + '\n'
+
+
+def test_csv_header_once():
+    rows = list(csv.reader(io.StringIO(_written('csv', LISTS, True))))
+    assert rows[0] == ['Source', 'Item', 'Total']
+    assert len(rows) == 1 + sum(len(i) for i in LISTS.values())
+    assert rows[1] == ['a.litematic', 'minecraft:stone', '70']
+    rows = list(csv.reader(io.StringIO(_written('csv', {'a.litematic': LISTS['a.litematic']}, False))))
+    assert rows == [['Item', 'Total'], ['minecraft:stone', '70'], ['minecraft:chest', '1']]
+
+
+def test_jsonl_and_npz_rows(tmp_path):
+    rows = [json.loads(i) for i in _written('jsonl', LISTS, True).splitlines()]
+    assert [(i['source'], i['item'], i['count']) for i in rows] == [
+        ('a.litematic', 'minecraft:stone', 70), ('a.litematic', 'minecraft:chest', 1), ('c.nbt', 'minecraft:dirt', 2)]
+    assert rows[0]['stacks'] == [0, 1, 6]
+
+    target = tmp_path / 'out.npz'
+    with get_writer('npz', str(target), True) as writer:
+        for source, mat_list in LISTS.items():
+            writer.write(mat_list, source)
+    data = np.load(target)
+    assert data['item'].tolist() == [i['item'] for i in rows]
+    assert data['count'].tolist() == [70, 1, 2]
+    assert data['stacks'].shape == (3, 3)
+    assert data['source'].tolist() == ['a.litematic', 'a.litematic', 'c.nbt']
@@ -0,0 +1,42 @@
+from litematica_tools.library import RegionLibrary, region_digest
+from litematica_tools.material_list import MaterialList
+from litematica_tools.storage import Litematic, Vec3d
+
+
+def test_digest_includes_size(litematic_bytes):
+    region = Litematic.from_bytes(litematic_bytes).regions['test']
+    digest = region_digest(region)
+    assert region_digest(Litematic.from_bytes(litematic_bytes).regions['test']) == digest
+    region.size = Vec3d(18, 20, 17)
+    assert region_digest(region) != digest
+
+
+def test_library_reuses_copies(tmp_path, litematic_bytes):
+    for i in range(3):
+        (tmp_path / f'{i}.litematic').write_bytes(litematic_bytes)
+    library = RegionLibrary(tmp_path / 'store')
+    report = library.report([tmp_path])
+    assert (library.computed, library.reused) == (1, 2)
+    counts = MaterialList(Litematic.from_bytes(litematic_bytes)).list_blocks()
+    assert report == {k: v * 3 for k, v in counts.items()}
+
+    library = RegionLibrary(tmp_path / 'store')
+    library.report([tmp_path])
+    assert (library.computed, library.reused) == (0, 3)
+
+
+def test_library_skips_missing_files(tmp_path, litematic_bytes):
+    (tmp_path / 'a.litematic').write_bytes(litematic_bytes)
+    library = RegionLibrary()
+    report = library.report([tmp_path / 'a.litematic', tmp_path / 'missing.litematic'])
+    assert library.failed == 1 and library.computed == 1
+    assert report == MaterialList(Litematic.from_bytes(litematic_bytes)).list_blocks().sort()
+
+
+def test_library_skips_corrupt_files(tmp_path, litematic_bytes):
+    (tmp_path / 'a.litematic').write_bytes(litematic_bytes)
+    (tmp_path / 'b.litematic').write_bytes(b'garbage data here')
+    library = RegionLibrary()
+    report = library.report([tmp_path])
+    assert library.failed == 1 and library.computed == 1
+    assert report == MaterialList(Litematic.from_bytes(litematic_bytes)).list_blocks().sort()
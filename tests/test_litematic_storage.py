@@ -0,0 +1,38 @@
+import io
+
+import numpy as np
+
+from litematica_tools.converter import FlatStructure, to_litematic
+from litematica_tools.litematic_writer import save_litematic
+from litematica_tools.storage import BlockState, Litematic, TileEntity, Vec3d
+
+from conftest import _items
+
+
+def _tile_entity(position: Vec3d) -> TileEntity:
+    temp = TileEntity()
+    temp.nbt = {'Items': _items(('minecraft:diamond', 1))}
+    temp.position = position
+    return temp
+
+
+def test_tile_entity_ids_from_blocks():
+    palette = [BlockState(name='minecraft:air'), BlockState(name='minecraft:chest', properties={'facing': 'north'}),
+               BlockState(name='minecraft:barrel', properties={'facing': 'up'}), BlockState(name='minecraft:stone')]
+    # Wide enough for every palette index to span two longs somewhere
+    blocks = np.full((3, 5, 40), 3, np.uint32)
+    chest, barrel, stone = Vec3d(0, 0, 0), Vec3d(37, 2, 4), Vec3d(21, 1, 3)
+    blocks[chest.y, chest.z, chest.x] = 1
+    blocks[barrel.y, barrel.z, barrel.x] = 2
+    flat = FlatStructure(palette=palette, blocks=blocks, name='test',
+                         tile_entities=[_tile_entity(i) for i in (chest, barrel, stone)])
+    structure = to_litematic(flat)
+    # Litematica doesn't store ids, they have to come from the blocks
+    for i in structure.regions['test'].region_nbt['TileEntities']:
+        i.pop('id', None)
+    buf = io.BytesIO()
+    save_litematic(structure, buf)
+
+    region = Litematic.from_bytes(buf.getvalue()).regions['test']
+    ids = {i.position: i.id for i in region.tile_entities}
+    assert ids == {chest: 'minecraft:chest', barrel: 'minecraft:barrel', stone: 'minecraft:stone'}
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from litematica_tools.material_list import MaterialList
+from litematica_tools.utils import EstimatedItemCounter
+
+
+@pytest.fixture
+def seeded(monkeypatch):
+    # Window order starts at a random offset, fixed here so the estimates are repeatable
+    default_rng = np.random.default_rng
+    seeds = iter(range(1000))
+    monkeypatch.setattr(np.random, 'default_rng', lambda seed=None: default_rng(next(seeds)))
+
+
+@pytest.mark.parametrize('sample', [0.3, 0.6])
+def test_estimate_intervals(litematic, seeded, sample):
+    exact = MaterialList(litematic).list_blocks()
+    for _ in range(20):
+        estimate = MaterialList(litematic).list_blocks(sample=sample, window=64, confidence=0.999)
+        assert isinstance(estimate, EstimatedItemCounter)
+        for item, (low, high) in estimate.intervals.items():
+            assert low <= exact[item] <= high, item
+            assert low <= estimate[item] <= high
+        # Common blocks are always found, rare ones may be missing
+        assert {'minecraft:stone', 'minecraft:oak_planks'} <= estimate.keys() <= exact.keys()
+
+
+def test_sample_fraction(litematic, seeded):
+    size = litematic.regions['test'].block_array_size
+    windows = -(-size // 64)
+    for sample in (0.1, 0.5, 0.9):
+        estimate = MaterialList(litematic).list_blocks(sample=sample, window=64)
+        # Whole windows are decoded, the last one may be shorter
+        expected = np.ceil(sample * windows) / windows
+        assert abs(estimate.sample_fraction - expected) <= 64 / size
+
+
+def test_full_sample_is_exact(litematic):
+    exact = MaterialList(litematic).list_blocks()
+    estimate = MaterialList(litematic).list_blocks(sample=1.0, window=100)
+    assert estimate.sample_fraction == 1.0
+    assert dict(estimate) == dict(exact)
+    assert all(low == pytest.approx(exact[i]) == high for i, (low, high) in estimate.intervals.items())
@@ -0,0 +1,75 @@
+import gzip
+
+import numpy as np
+
+from litematica_tools import planner
+from litematica_tools.converter import FlatStructure, to_litematic
+from litematica_tools.litematic_writer import save_litematic
+from litematica_tools.material_list import MaterialList
+from litematica_tools.planner import plan, execute, read_header, MEMORY, CHUNKED, MULTIPROCESS
+from litematica_tools.storage import BlockState, Litematic, Vec3d
+
+from conftest import make_flat, PALETTE
+
+
+def _save(structure: Litematic, path) -> str:
+    save_litematic(structure, str(path))
+    return str(path)
+
+
+def _uniform_litematic(path, size: int = 192) -> str:
+    flat = FlatStructure(palette=[BlockState(name='minecraft:air'), BlockState(name='minecraft:stone')],
+                         blocks=np.ones((size, size, size), np.uint32), name='cube')
+    return _save(to_litematic(flat), path)
+
+
+def _two_region_litematic(path) -> str:
+    structure = to_litematic(make_flat(), 'big')
+    structure.regions['small'] = to_litematic(make_flat(Vec3d(5, 6, 7), seed=1), 'small').regions['small']
+    return _save(structure, path)
+
+
+def test_header(tmp_path, litematic_bytes):
+    path = tmp_path / 'test.litematic'
+    path.write_bytes(litematic_bytes)
+    header = read_header(path)
+    assert header.file_format == 'litematic'
+    assert header.regions[0].volume == 17 * 20 * 18
+    assert header.regions[0].palette_size == len(PALETTE)
+    assert header.decompressed_size == len(gzip.decompress(litematic_bytes))
+
+    raw = tmp_path / 'raw.litematic'
+    raw.write_bytes(gzip.decompress(litematic_bytes))
+    assert read_header(raw).regions == header.regions
+
+
+def test_small_compressible_file_checks_budget(tmp_path):
+    path = _uniform_litematic(tmp_path / 'cube.litematic')
+    execution_plan = plan(path, memory_budget=1 << 20)
+    # A few kilobytes on disk, megabytes of block data
+    assert execution_plan.header.compressed_size < 1 << 16
+    assert execution_plan.estimated_memory > 1 << 20
+    assert execution_plan.strategy == CHUNKED
+    assert plan(path).strategy == MEMORY
+
+
+def test_strategies_match(tmp_path):
+    path = _two_region_litematic(tmp_path / 'two.litematic')
+    expected = MaterialList(Litematic.from_file(path)).composite_list(blocks=True, items=True, entities=True)
+    for budget in (None, 1 << 10):
+        assert execute(plan(path, budget), True, True, True) == expected
+
+
+def test_multiprocess_keeps_small_regions(tmp_path, monkeypatch):
+    path = _two_region_litematic(tmp_path / 'two.litematic')
+    expected = MaterialList(Litematic.from_file(path)).composite_list(blocks=True, items=False, entities=False)
+    sent = []
+    light_copy = planner._light_copy
+    monkeypatch.setattr(planner, '_light_copy', lambda r: sent.append(r.volume) or light_copy(r))
+    monkeypatch.setattr(planner, 'MULTIPROCESS_BLOCKS', 17 * 20 * 18)
+    execution_plan = plan(path, 1 << 10)
+    execution_plan.strategy = MULTIPROCESS
+    execution_plan.workers = 2
+    execution_plan.chunk_size = 1000
+    assert execute(execution_plan) == expected
+    assert sent == [17 * 20 * 18]
@@ -0,0 +1,34 @@
+import tracemalloc
+
+from litematica_tools.material_list import MaterialList
+from litematica_tools.profiling import profile_memory
+from litematica_tools.storage import Litematic
+
+
+def test_profile_reports_every_stage(tmp_path, litematic_bytes):
+    path = tmp_path / 'test.litematic'
+    path.write_bytes(litematic_bytes)
+    mat_list, structure, profile = profile_memory(path, items=True, entities=True, release_nbt=True, top=2)
+
+    expected = MaterialList(Litematic.from_bytes(litematic_bytes)).composite_list(blocks=True, items=True,
+                                                                                  entities=True)
+    assert mat_list == expected
+    assert structure.name == 'test.litematic'
+    names = [i.name for i in profile.stages]
+    assert names == ['load', 'unpack', 'parse regions', 'inventories', 'release nbt', 'counting']
+    assert all(i.seconds >= 0 and i.traced_peak >= i.traced > 0 for i in profile.stages)
+    assert all(len(i.top) <= 2 for i in profile.stages)
+    assert profile.retained.keys() == profile.released.keys()
+    assert sum(profile.released.values()) < sum(profile.retained.values())
+    report = str(profile)
+    assert all(i in report for i in names) and 'release_nbt() saved' in report
+    # Tracing started by the profile is stopped again
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_without_optional_stages(tmp_path, litematic_bytes):
+    path = tmp_path / 'test.litematic'
+    path.write_bytes(litematic_bytes)
+    _, _, profile = profile_memory(path, top=0)
+    assert [i.name for i in profile.stages] == ['load', 'unpack', 'parse regions', 'inventories', 'counting']
+    assert not profile.released and all(not i.top for i in profile.stages)
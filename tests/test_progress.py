@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from litematica_tools.errors import OperationCancelled
+from litematica_tools.material_list import MaterialList
+from litematica_tools.progress import Progress
+from litematica_tools.structure_parser import NBTFile
+
+
+def test_callbacks(litematic_bytes):
+    calls = []
+    progress = Progress(lambda *args: calls.append(args), interval=0)
+    structure = NBTFile.from_bytes(litematic_bytes, progress=progress)
+    MaterialList(structure).composite_list(blocks=True, items=True, entities=False, progress=progress)
+
+    stages = list(dict.fromkeys(i[0] for i in calls))
+    assert stages == ['load', 'parse', 'count', 'items']
+    last = {stage: (done, total) for stage, done, total in calls}
+    assert last['load'] == (len(litematic_bytes), len(litematic_bytes))
+    assert last['count'] == (17 * 20 * 18, 17 * 20 * 18)
+    assert last['items'][0] == last['items'][1]
+
+
+def test_cancel_from_callback(litematic):
+    def callback(stage, done, total):
+        if done:
+            progress.cancel('Stopped')
+
+    progress = Progress(callback, interval=0)
+    with pytest.raises(OperationCancelled, match='Stopped'):
+        MaterialList(litematic).list_blocks(chunk_size=1000, progress=progress)
+    assert progress.cancelled and progress.done < progress.total
+
+
+def test_cancelled_before_start(litematic_bytes):
+    progress = Progress()
+    progress.cancel()
+    with pytest.raises(OperationCancelled):
+        NBTFile.from_bytes(litematic_bytes, progress=progress)
+
+
+def test_timeout(litematic):
+    progress = Progress(timeout=0)
+    time.sleep(0.01)
+    with pytest.raises(OperationCancelled, match='Timed out'):
+        MaterialList(litematic).list_blocks(progress=progress)
@@ -0,0 +1,47 @@
+import io
+
+import numpy as np
+
+from litematica_tools.litematic_writer import save_litematic
+from litematica_tools.material_list import MaterialList
+from litematica_tools.storage import Litematic
+
+
+def _roundtrip(structure: Litematic) -> Litematic:
+    buf = io.BytesIO()
+    save_litematic(structure, buf)
+    buf.seek(0)
+    return Litematic.from_fileobj(buf)
+
+
+def test_release_keeps_counts(litematic, schem, nbt_structure):
+    for structure in (litematic, schem, nbt_structure):
+        before = MaterialList(structure).composite_list(blocks=True, items=True, entities=True)
+        structure.release_nbt()
+        after = MaterialList(structure).composite_list(blocks=True, items=True, entities=True)
+        assert before == after
+
+
+def test_release_drops_parsed_tags(litematic, schem):
+    litematic.release_nbt()
+    assert 'Regions' not in litematic.raw_nbt
+    assert 'BlockStates' not in litematic.regions['test'].region_nbt
+    schem.release_nbt()
+    assert 'BlockData' not in schem.raw_nbt
+    assert all('BlockData' not in r.region_nbt for r in schem.regions.values())
+
+
+def test_save_released_litematic(litematic):
+    expected = _roundtrip(litematic)
+    litematic.release_nbt()
+    saved = _roundtrip(litematic)
+
+    assert saved.metadata.name == expected.metadata.name == 'test'
+    assert saved.metadata.author == expected.metadata.author == 'tester'
+    assert saved.metadata.data_version == expected.metadata.data_version
+    region, expected_region = saved.regions['test'], expected.regions['test']
+    assert [i.id for i in region.tile_entities] == [i.id for i in expected_region.tile_entities]
+    assert region.tile_entities[0].nbt['Items'] == expected_region.tile_entities[0].nbt['Items']
+    assert [i.id for i in region.entities] == [i.id for i in expected_region.entities]
+    assert len(region.region_nbt['PendingBlockTicks']) == 1
+    assert np.array_equal(region.get_block_array(), expected_region.get_block_array())
@@ -0,0 +1,93 @@
+import io
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from litematica_tools.render import TopDownMap, top_blocks, render, palette_colors, encode_png, encode_ppm, \
+    save_image
+
+
+def _expected_top(blocks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    solid = blocks != 0
+    heights = np.where(solid.any(axis=0), blocks.shape[0] - 1 - np.argmax(solid[::-1], axis=0), -1)
+    top = np.take_along_axis(blocks, np.maximum(heights, 0)[None], axis=0)[0]
+    return np.where(heights >= 0, top, 0), heights
+
+
+@pytest.mark.parametrize('fixture', ['litematic', 'schem', 'nbt_structure'])
+def test_top_blocks(request, flat, fixture):
+    # An empty column, and a block above the first layer batch (columns are 20 blocks high)
+    flat.blocks[:, 0, 0] = 0
+    flat.blocks[17, 5, 5] = 1
+    region = next(iter(request.getfixturevalue(fixture).regions.values()))
+    top, heights = top_blocks(region)
+    expected_top, expected_heights = _expected_top(flat.blocks)
+    assert heights[0, 0] == -1 and heights[5, 5] == 17
+    assert (heights == expected_heights).all()
+    # Palettes differ between formats, so the top blocks are compared by name
+    names = np.array([str(i.name) for i in region.palette] + ['minecraft:air'])
+    expected_names = np.array([str(i.name) for i in flat.palette])[expected_top]
+    filled = expected_heights >= 0
+    assert (names[top][filled] == expected_names[filled]).all()
+
+
+def test_render_colors(litematic):
+    region = litematic.regions['test']
+    top_down = render(litematic)
+    top, heights = top_blocks(region)
+    colors, _ = palette_colors(region.palette)
+    assert (top_down.heights == heights).all()
+    assert (top_down.colors == colors[top]).all()
+    assert top_down.shaded().shape == top_down.colors.shape
+
+
+def test_heightmap():
+    heights = np.array([[-1, 0], [2, 4]], np.int32)
+    top_down = TopDownMap(heights=heights, colors=np.zeros((2, 2, 3), np.uint8))
+    heightmap = top_down.heightmap()
+    assert heightmap[0, 0] == 0
+    assert 0 < heightmap[0, 1] < heightmap[1, 0] < heightmap[1, 1] == 255
+    empty = TopDownMap(heights=np.full((2, 2), -1, np.int32))
+    assert not empty.heightmap().any()
+
+
+def _png_chunks(data: bytes) -> dict[bytes, bytes]:
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    out, position = {}, 8
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        assert struct.unpack('>I', data[position + 8 + length:position + 12 + length])[0] == zlib.crc32(kind + body)
+        out[kind] = body
+        position += 12 + length
+    return out
+
+
+@pytest.mark.parametrize('shape', [(3, 5), (3, 5, 3)])
+def test_png(shape):
+    image = np.arange(np.prod(shape), dtype=np.uint8).reshape(shape)
+    chunks = _png_chunks(encode_png(image))
+    width, height, depth, color_type = struct.unpack('>IIBB', chunks[b'IHDR'][:10])
+    assert (width, height, depth, color_type) == (5, 3, 8, 2 if len(shape) == 3 else 0)
+    rows = np.frombuffer(zlib.decompress(chunks[b'IDAT']), np.uint8).reshape(3, -1)
+    assert not rows[:, 0].any()
+    assert (rows[:, 1:] == image.reshape(3, -1)).all()
+    assert b'IEND' in chunks
+
+
+def test_ppm_and_scale(tmp_path):
+    image = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+    assert encode_ppm(image) == b'P6\n3 2\n255\n' + image.tobytes()
+    assert encode_ppm(image[..., 0]).startswith(b'P5\n3 2\n255\n')
+
+    save_image(image, tmp_path / 'map.ppm', scale=2)
+    data = (tmp_path / 'map.ppm').read_bytes()
+    assert data.startswith(b'P6\n6 4\n255\n')
+    scaled = np.frombuffer(data[len(b'P6\n6 4\n255\n'):], np.uint8).reshape(4, 6, 3)
+    assert (scaled[::2, ::2] == image).all() and (scaled[1::2, 1::2] == image).all()
+
+    buf = io.BytesIO()
+    save_image(image, buf)
+    assert buf.getvalue() == encode_png(image)
@@ -0,0 +1,17 @@
+import os
+
+from litematica_tools.search_index import SearchIndex
+
+
+def test_refresh_reports_missing_paths(tmp_path, litematic_bytes):
+    path = tmp_path / 'a.litematic'
+    path.write_bytes(litematic_bytes)
+    with SearchIndex() as index:
+        stats = index.refresh([path, tmp_path / 'missing.litematic'])
+        assert stats['added'] == 1 and stats['failed'] == 1
+        assert index.find('diamond', 'items') == [(str(path), 5)]
+        assert index.refresh([tmp_path])['unchanged'] == 1
+
+        os.remove(path)
+        assert index.refresh([tmp_path])['removed'] == 1
+        assert index.find('stone') == []
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from litematica_tools.storage.sections import SectionedBlocks
+
+
+def test_sections_match_dense(flat):
+    sections = SectionedBlocks.from_array(flat.blocks)
+    assert np.array_equal(sections.to_dense(), flat.blocks)
+    assert np.array_equal(sections.histogram(5), np.bincount(flat.blocks.ravel(), minlength=5))
+    # Mostly empty top and the stone floor are stored as single indices
+    assert (sections.uniform >= 0).any() and sections.mixed
+
+
+@pytest.mark.parametrize('scan_range', [range(0, 10), range(250, 900), range(17 * 18 * 3 + 5, 17 * 18 * 19, 7),
+                                        range(5, 5)])
+def test_sections_block_array_range(flat, scan_range):
+    sections = SectionedBlocks.from_array(flat.blocks)
+    expected = flat.blocks.ravel()[scan_range.start:scan_range.stop:scan_range.step]
+    assert np.array_equal(sections.get_block_array(scan_range), expected)
+
+
+def test_box_histogram(litematic, schem, nbt_structure, flat):
+    low, high = (2, 1, 3), (15, 12, 16)
+    box = flat.blocks[low[1]:high[1] + 1, low[2]:high[2] + 1, low[0]:high[0] + 1]
+    expected = np.bincount(box.ravel(), minlength=5)
+    for region in (next(iter(i.regions.values())) for i in (litematic, schem, nbt_structure)):
+        counts = dict(zip([i.name for i in region.palette], region.get_box_histogram(low, high).tolist()))
+        for i, name in enumerate(['minecraft:air', 'minecraft:stone', 'minecraft:chest', 'minecraft:oak_planks']):
+            # .nbt regions leave air out as structure voids
+            if name != 'minecraft:air' or type(region).__name__ != 'NbtRegion':
+                assert counts.get(name, 0) == expected[i], (type(region).__name__, name)
+
+
+def test_nbt_sections_use_positions(nbt_structure, flat):
+    region = next(iter(nbt_structure.regions.values()))
+    before = region.get_block_histogram()
+    region.build_sections()
+    assert np.array_equal(region.get_block_histogram(), before)
+    volume = region.sections.to_dense()
+    placed = volume != region.sections.void
+    names = np.array([str(i.name) for i in region.palette])
+    assert np.array_equal(placed, flat.blocks != 0)
+    assert (names[volume[placed]] == 'minecraft:stone').sum() == (flat.blocks == 1).sum()
+
+
+def test_release_block_data(litematic, schem):
+    for structure, tag in ((litematic, 'BlockStates'), (schem, 'BlockData')):
+        region = next(iter(structure.regions.values()))
+        blocks = region.get_block_array()
+        first = [region.get_palette_index(i) for i in range(0, region.volume, 97)]
+        region.build_sections(release=True)
+        assert region.block_states is None
+        assert tag not in region.region_nbt
+        assert np.array_equal(region.get_block_array(), blocks)
+        assert np.array_equal(region.get_block_array(range(300, 700)), blocks[300:700])
+        assert list(region.block_iterator(range(300, 700))) == blocks[300:700].tolist()
+        assert [region.get_palette_index(i) for i in range(0, region.volume, 97)] == first
+
+
+def test_sampling_reads_only_needed_layers(monkeypatch):
+    blocks = np.zeros((40, 64, 64), np.uint32)
+    blocks[:, ::3, ::5] = 1
+    blocks[::7] = 2
+    sections = SectionedBlocks.from_array(blocks)
+    decoded = []
+    dense_rows = sections._dense_rows
+    monkeypatch.setattr(sections, '_dense_rows', lambda y0, y1: decoded.append((y0, y1)) or dense_rows(y0, y1))
+
+    layer = 64 * 64
+    flat = blocks.ravel()
+    for start in range(0, blocks.size - 1000, blocks.size // 16):
+        decoded.clear()
+        scan_range = range(start, start + 1000)
+        assert (sections.get_block_array(scan_range) == flat[start:start + 1000]).all()
+        # One layer, or two when the range crosses a layer border
+        assert decoded == [(start // layer, (start + 999) // layer + 1)]
\ No newline at end of file
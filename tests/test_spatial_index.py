@@ -0,0 +1,82 @@
+import gc
+import weakref
+
+import numpy as np
+import pytest
+
+from litematica_tools.material_list import MaterialList
+from litematica_tools.spatial_index import SpatialIndex
+from litematica_tools.storage import Entity, Litematic, Vec3d
+
+from conftest import CHEST
+
+
+def _points(count: int = 500, seed: int = 0) -> list[Entity]:
+    out = []
+    for i, position in enumerate(np.random.default_rng(seed).uniform(-40, 200, (count, 3)).tolist()):
+        temp = Entity()
+        temp.position = Vec3d(*position)
+        temp.id = str(i)
+        out.append(temp)
+    return out
+
+
+@pytest.mark.parametrize('low, high', [((0, 0, 0), (15, 15, 15)), ((3, -7, 20), (40, 5, 33)),
+                                       ((-100, -100, -100), (300, 300, 300)), ((50, 50, 50), (49, 80, 80))])
+def test_query_box_matches_scan(low, high):
+    objects = _points()
+    index = SpatialIndex(objects, cell_size=8)
+    expected = {i.id for i in objects if all(a <= p < b + 1 for a, p, b in zip(low, i.position, high))}
+    assert {i.id for i in index.query_box(low, high)} == expected
+
+
+def test_query_radius_matches_scan():
+    objects = _points()
+    index = SpatialIndex(objects, cell_size=8)
+    center, radius = (60, 70, 80), 25.5
+    expected = {i.id for i in objects if sum((a - b) ** 2 for a, b in zip(i.position, center)) <= radius ** 2}
+    assert {i.id for i in index.query_radius(center, radius)} == expected
+
+
+def test_items_in_box(litematic):
+    mat_list = MaterialList(litematic)
+    assert mat_list.list_items_in_box(CHEST, CHEST) == {'minecraft:diamond': 5, 'minecraft:stone': 64}
+    assert mat_list.list_items_in_box((0, 0, 0), (16, 19, 17)) == mat_list.list_items()
+    assert mat_list.list_items_in_box((10, 10, 10), (16, 19, 17)) == {}
+
+
+def test_items_in_box_unparsed(litematic_bytes):
+    structure = Litematic.from_bytes(litematic_bytes, init=False)
+    region = next(iter(structure.regions.values()))
+    assert region.tile_entities is None
+    assert MaterialList(structure).list_items_in_box(CHEST, CHEST) == {'minecraft:diamond': 5,
+                                                                        'minecraft:stone': 64}
+    assert SpatialIndex.of(region) is SpatialIndex.of(region)
+
+
+def test_index_cache(litematic):
+    region = litematic.regions['test']
+    first = MaterialList(litematic)
+    first.list_items_in_box(CHEST, CHEST)
+    # Lists with the same settings share the index, which doesn't keep them alive
+    MaterialList(litematic).list_items_in_box(CHEST, CHEST)
+    assert len(region.spatial_indexes) == 1
+    first = weakref.ref(first)
+    gc.collect()
+    assert first() is None
+
+    excluding = MaterialList(litematic)
+    excluding.config.excluded_names = ['.*']
+    excluding.list_items_in_box(CHEST, CHEST)
+    assert len(region.spatial_indexes) == 2
+
+    # A filter without a key can't be told apart from others, so it isn't cached
+    SpatialIndex.of(region, item_filter=lambda i: True)
+    assert len(region.spatial_indexes) == 2
+
+    region.compact_palette()
+    region.set_block_array(region.get_block_array())
+    assert region.spatial_indexes == {}
+    SpatialIndex.of(region)
+    litematic.release_nbt()
+    assert region.spatial_indexes == {}
@@ -0,0 +1,72 @@
+import gzip
+import io
+
+import pytest
+
+from litematica_tools.errors import FileException
+from litematica_tools.material_list import MaterialList
+from litematica_tools.storage import Litematic, Schem, Nbt
+from litematica_tools.structure_parser import NBTFile
+
+
+class _NonSeekable(io.RawIOBase):
+    """
+    Stream without seek() and peek(), like a socket or an upload.
+    """
+
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        # Short reads, so nothing relies on getting everything at once
+        data = self._data.read(min(len(buffer), 100))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _blocks(structure) -> dict:
+    return dict(MaterialList(structure).block_count)
+
+
+@pytest.fixture
+def expected(litematic) -> dict:
+    return _blocks(litematic)
+
+
+@pytest.mark.parametrize('wrap', [bytes, bytearray, memoryview])
+def test_buffers(litematic_bytes, expected, wrap):
+    structure = NBTFile.from_bytes(wrap(litematic_bytes), name='test')
+    assert isinstance(structure, Litematic) and structure.name == 'test'
+    assert _blocks(structure) == expected
+
+
+def test_streams(litematic_bytes, expected):
+    assert _blocks(NBTFile.from_fileobj(io.BytesIO(litematic_bytes))) == expected
+    assert _blocks(NBTFile.from_fileobj(_NonSeekable(litematic_bytes))) == expected
+
+
+def test_raw_nbt(litematic_bytes, expected):
+    raw = gzip.decompress(litematic_bytes)
+    assert _blocks(NBTFile.from_bytes(raw)) == expected
+    assert _blocks(NBTFile.from_fileobj(io.BytesIO(raw))) == expected
+    assert _blocks(NBTFile.from_fileobj(_NonSeekable(raw))) == expected
+
+
+def test_format_detection(litematic_bytes, schem_bytes, nbt_bytes):
+    assert isinstance(NBTFile.from_bytes(litematic_bytes), Litematic)
+    assert isinstance(NBTFile.from_bytes(schem_bytes), Schem)
+    assert isinstance(NBTFile.from_bytes(nbt_bytes), Nbt)
+    # An explicit format skips detection
+    assert isinstance(NBTFile.from_bytes(schem_bytes, file_format='schem'), Schem)
+    with pytest.raises(FileException):
+        NBTFile.from_bytes(gzip.compress(b'\x0a\x00\x00\x00'))
+
+
+def test_options_are_keyword_only(litematic_bytes):
+    with pytest.raises(TypeError):
+        NBTFile.from_bytes(litematic_bytes, False)
+    structure = NBTFile.from_bytes(litematic_bytes, unpack=False, init=False)
+    assert isinstance(structure, Litematic)